@@ -1,7 +1,8 @@
 # app.py (CLEAN + FIXED + FULL PSYCHOLOGICAL INTERPRETATION SUPPORT)
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import jwt
@@ -10,25 +11,62 @@ from functools import wraps
 import traceback
 import json
 import os
+import threading
+import base64
+import hashlib
+import time
 
 # --- AI analysis utilities ---
-from utils.analyzer_upgraded import analyze_dream
+from utils.analyzer_upgraded import (analyze_dream, analyze_dreams, reanalyze_dream, warmup, SYMBOL_INDEX_HOLDER,
+                                     ANALYSIS_VERSION, STAGE_VERSIONS, BASELINE_STAGE_VERSION)
+from utils.model_registry import memory_report, model_status
+from utils.ner_and_utils import degraded_tiers
+from utils.job_queue import JobQueue, start_workers
+from utils.analysis_store import (ANALYSIS_SECTIONS, SENTENCE_SECTIONS, AnalysisBlob, encode_analysis,
+                                  symbol_index, parse_symbol_index)
+from utils import metrics
+from utils.sqlite_profile import engine_options, install_pragmas
+from utils.migrations import MigrationRunner
+from utils.reanalysis import run_concurrently, record_progress, REANALYSIS_BATCH_SIZE, REANALYSIS_CONCURRENCY
 
 # ---------------------------------------
 # CONFIG
 # ---------------------------------------
 SECRET_KEY = "CHANGE_THIS_TO_A_RANDOM_SECRET"
+# shared secret for /admin endpoints (disabled when unset)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+# poll the symbol dictionary for changes every N seconds (0 = off)
+SYMBOL_INDEX_RELOAD_INTERVAL = float(os.environ.get("SYMBOL_INDEX_RELOAD_INTERVAL", "0"))
+# load models in the background at startup instead of on the first /add_dream
+# (models are otherwise loaded lazily; gunicorn users can call warmup() in post_fork)
+ANALYSIS_WARMUP = os.environ.get("ANALYSIS_WARMUP", "0") == "1"
+# analyse new dreams in background worker processes (0 = inline, inside the request)
+ANALYSIS_ASYNC = os.environ.get("ANALYSIS_ASYNC", "1") == "1"
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", "2"))
+# unauthenticated Prometheus endpoint at /metrics; metrics are per process, so with
+# ANALYSIS_ASYNC the stage timings live in the worker processes, not the web server
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# /dreams/import: dreams analysed and inserted together (and committed) per chunk,
+# longest accepted NDJSON line, and most dreams accepted in one request
+DREAM_IMPORT_CHUNK_SIZE = int(os.environ.get("DREAM_IMPORT_CHUNK_SIZE", "64"))
+DREAM_IMPORT_MAX_LINE_BYTES = int(os.environ.get("DREAM_IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+DREAM_IMPORT_MAX_DREAMS = int(os.environ.get("DREAM_IMPORT_MAX_DREAMS", "10000"))
 
 app = Flask(__name__)
 CORS(app)
 
 # Database setup
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dreams.db")
+db_path = os.environ.get("DREAMS_DB") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "dreams.db")
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 
 db = SQLAlchemy(app)
 
+# Durable analysis job queue (separate SQLite file, survives restarts)
+queue_db_path = os.environ.get("ANALYSIS_QUEUE_DB") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_jobs.db")
+ANALYSIS_QUEUE = JobQueue(queue_db_path)
+
 
 # ---------------------------------------
 # USER MODEL
@@ -39,12 +77,18 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # bumped on every create / update / delete of this user's dreams (change feed, ETags)
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
 
 # ---------------------------------------
 # DREAM MODEL
 # ---------------------------------------
 class Dream(db.Model):
+    # keyset pagination of a user's journal walks this index newest-first
+    __table_args__ = (db.Index("ix_dream_user_date_id", "user_id", "date", "id"),
+                      db.Index("ix_dream_user_change_seq", "user_id", "change_seq"))
+
     id = db.Column(db.Integer, primary_key=True)
 
     title = db.Column(db.String(200))
@@ -53,6 +97,8 @@ class Dream(db.Model):
     mood = db.Column(db.String(50))
     summary = db.Column(db.Text)
 
+    # Legacy per-field JSON columns: analyses now live in DreamAnalysis and these are
+    # NULL once written (or converted by scripts/migrate.py)
     themes = db.Column(db.Text)
     symbols = db.Column(db.Text)
     combined_insights = db.Column(db.Text)
@@ -62,7 +108,7 @@ class Dream(db.Model):
 
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
-    # Structured fields
+    # Structured fields (legacy, see above)
     events = db.Column(db.Text)
     entities = db.Column(db.Text)
     people = db.Column(db.Text)
@@ -74,10 +120,98 @@ class Dream(db.Model):
     emotional_arc = db.Column(db.Text)
     narrative = db.Column(db.Text)
     analysis_version = db.Column(db.String(80))
+    # pending -> done | failed (NULL on rows analysed before the job queue existed)
+    analysis_status = db.Column(db.String(20), default="done")
+    # the owner's change_seq at this dream's last write
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    analysis = db.relationship("DreamAnalysis", uselist=False, cascade="all, delete-orphan")
+
+    @property
+    def analysis_payload(self):
+        return self.analysis.payload if self.analysis is not None else None
+
+
+# ---------------------------------------
+# DREAM ANALYSIS (one compressed blob per dream, see utils/analysis_store.py)
+# ---------------------------------------
+class DreamAnalysis(db.Model):
+    __tablename__ = "dream_analysis"
+
+    dream_id = db.Column(db.Integer, db.ForeignKey('dream.id', ondelete="CASCADE"), primary_key=True)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    # symbol names in rank order ("\nmoon\nsnake\n"), readable without decoding the payload
+    symbol_index = db.Column(db.Text)
+    # STAGE_VERSIONS that produced it, canonical JSON (NULL: analysed before stage versioning)
+    stage_versions = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ---------------------------------------
+# RE-ANALYSIS BACKFILL CHECKPOINT (scripts/reanalyze.py)
+# ---------------------------------------
+class ReanalysisCheckpoint(db.Model):
+    __tablename__ = "reanalysis_checkpoint"
+
+    name = db.Column(db.String(40), primary_key=True)
+    # analyzer + stage versions this pass upgrades to; a new target restarts the pass
+    target = db.Column(db.Text, nullable=False)
+    cursor = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    remaining = db.Column(db.Integer, nullable=False, default=0)
+    dreams_per_second = db.Column(db.Float, nullable=False, default=0.0)
+    # {stage: outputs replaced} in this pass, JSON
+    stage_runs = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ---------------------------------------
+# DELETED DREAMS (tombstones for the change feed)
+# ---------------------------------------
+class DreamTombstone(db.Model):
+    __tablename__ = "dream_tombstone"
+    __table_args__ = (db.Index("ix_dream_tombstone_user_change_seq", "user_id", "change_seq"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    dream_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ---------------------------------------
+# USER SYMBOL HISTORY (recurring symbols)
+# ---------------------------------------
+class UserSymbol(db.Model):
+    """How many of a user's dreams contain a symbol, and when it last appeared."""
+    __tablename__ = "user_symbol"
+    __table_args__ = (db.UniqueConstraint("user_id", "symbol", name="uq_user_symbol"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    symbol = db.Column(db.String(200), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    last_seen = db.Column(db.DateTime)
 
 
 with app.app_context():
+    # WAL, synchronous=NORMAL, mmap and cache size on every connection (utils/sqlite_profile.py)
+    install_pragmas(db.engine)
+    fresh_db = not db.inspect(db.engine).has_table("dream")
     db.create_all()
+    # create_all() cannot change existing tables: those go through scripts/migrate.py.
+    # A database it has just built is already current. (user.email needs no index
+    # of its own: its UNIQUE constraint is backed by one.)
+    migrations = MigrationRunner(db_path)
+    if fresh_db:
+        migrations.stamp()
+    elif migrations.pending():
+        print("[app] database schema is behind: run python scripts/migrate.py "
+              f"({len(migrations.pending())} migration(s) pending)")
+    migrations.close()
+    # refresh planner statistics for tables whose indexes changed
+    db.session.execute(db.text("PRAGMA optimize"))
 
 
 # ---------------------------------------
@@ -114,6 +248,16 @@ def auth_required(f):
     return wrapper
 
 
+def admin_required(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN or request.headers.get("X-Admin-Token", "") != ADMIN_TOKEN:
+            return jsonify({"error": "Forbidden"}), 403
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
 # ---------------------------------------
 # AUTH ROUTES
 # ---------------------------------------
@@ -159,6 +303,482 @@ def login():
     })
 
 
+# ---------------------------------------
+# ANALYSIS HELPERS
+# ---------------------------------------
+def symbol_names(symbols):
+    """Distinct symbol names from an analysis symbol list or its stored JSON."""
+    if isinstance(symbols, str):
+        try:
+            symbols = json.loads(symbols)
+        except ValueError:
+            return set()
+    names = set()
+    for s in symbols or []:
+        name = s.get("symbol") if isinstance(s, dict) else s
+        if name:
+            names.add(name)
+    return names
+
+
+def recurring_lookup(user_id, own_symbols=()):
+    """
+    symbol_history callable for analyze_dream: which of the given symbols the user
+    has in other dreams. One indexed query over user_symbol; `own_symbols` (already
+    counted for the dream being re-analysed) are discounted by one.
+    """
+    own = set(own_symbols)
+
+    def lookup(names):
+        if not names:
+            return []
+        rows = UserSymbol.query.filter(UserSymbol.user_id == user_id, UserSymbol.symbol.in_(names)).all()
+        return [r.symbol for r in rows if r.count - (1 if r.symbol in own else 0) > 0]
+    return lookup
+
+
+def dream_symbol_names(dream):
+    """Symbol names of a stored dream, from its analysis blob's index or the legacy column."""
+    if dream.analysis is not None:
+        return set(parse_symbol_index(dream.analysis.symbol_index))
+    return symbol_names(dream.symbols)
+
+
+def _like_escape(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _refresh_last_seen(user_id, names):
+    """Recompute last_seen for symbols whose latest dream was removed (rare: delete or re-analysis)."""
+    for name in names:
+        row = UserSymbol.query.filter_by(user_id=user_id, symbol=name).first()
+        if row is None:
+            continue
+        indexed = "%" + _like_escape(symbol_index([name])) + "%"
+        legacy = '%"symbol": ' + _like_escape(json.dumps(name)) + '%'
+        latest = (db.session.query(Dream.date)
+                  .outerjoin(DreamAnalysis, DreamAnalysis.dream_id == Dream.id)
+                  .filter(Dream.user_id == user_id,
+                          db.or_(DreamAnalysis.symbol_index.like(indexed, escape="\\"),
+                                 Dream.symbols.like(legacy, escape="\\")))
+                  .order_by(Dream.date.desc()).first())
+        row.last_seen = latest.date if latest is not None else None
+
+
+def update_user_symbols(user_id, added=(), removed=(), seen_at=None):
+    """
+    Keep user_symbol in step with a dream's symbols: +1 for each added name, -1 for
+    each removed one (rows reaching zero are deleted). Upserts are atomic, so
+    concurrent workers on the same user do not race. Caller commits.
+    """
+    seen_at = seen_at or datetime.utcnow()
+    if added:
+        add_user_symbols(user_id, {name: (1, seen_at) for name in added})
+    if removed:
+        removed = sorted(removed)
+        stale = [r.symbol for r in UserSymbol.query.filter(
+            UserSymbol.user_id == user_id, UserSymbol.symbol.in_(removed), UserSymbol.last_seen == seen_at).all()]
+        UserSymbol.query.filter(UserSymbol.user_id == user_id, UserSymbol.symbol.in_(removed)).update(
+            {UserSymbol.count: UserSymbol.count - 1}, synchronize_session=False)
+        UserSymbol.query.filter(UserSymbol.user_id == user_id, UserSymbol.count <= 0).delete(synchronize_session=False)
+        db.session.flush()
+        _refresh_last_seen(user_id, stale)
+
+
+def add_user_symbols(user_id, counts):
+    """Upsert user_symbol rows from {name: (dreams, latest date)}. Caller commits."""
+    stmt = sqlite_insert(UserSymbol).values(
+        [{"user_id": user_id, "symbol": name, "count": n, "last_seen": seen_at}
+         for name, (n, seen_at) in sorted(counts.items())])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "symbol"],
+        set_={"count": UserSymbol.count + stmt.excluded.count,
+              "last_seen": db.func.max(db.func.coalesce(UserSymbol.last_seen, stmt.excluded.last_seen),
+                                       stmt.excluded.last_seen)})
+    db.session.execute(stmt)
+
+
+def bump_change_seq(user_id, n=1):
+    """
+    Increment the user's change counter by n and return the new value (with n > 1 the
+    caller owns the n values up to it). The UPDATE takes SQLite's write lock, so the
+    values are unique and ordered with the surrounding write. Caller commits.
+    """
+    User.query.filter_by(id=user_id).update({User.change_seq: User.change_seq + n}, synchronize_session=False)
+    return db.session.query(User.change_seq).filter_by(id=user_id).scalar()
+
+
+def stage_versions_json(versions):
+    return json.dumps(versions, sort_keys=True, separators=(",", ":")) if versions else None
+
+
+def store_analysis(dream, sections, stage_versions=None):
+    """Write analysis sections as the dream's DreamAnalysis blob and clear its legacy JSON columns."""
+    if dream.analysis is None:
+        dream.analysis = DreamAnalysis()
+    dream.analysis.payload = encode_analysis(sections, dream.content or "")
+    dream.analysis.symbol_index = symbol_index(sections.get("symbols"))
+    dream.analysis.stage_versions = stage_versions_json(stage_versions)
+    dream.analysis.updated_at = datetime.utcnow()
+    for name in ANALYSIS_SECTIONS:
+        setattr(dream, name, None)
+
+
+def analysis_fields(analysis):
+    """Analyzer output as the stored / response fields, with defaults for anything missing."""
+    emotions = analysis.get("emotions", {})
+    return {
+        "summary": analysis.get("summary", ""),
+        "emotions": emotions,
+        "themes": analysis.get("themes", []),
+        "symbols": analysis.get("symbols", []),
+        "combined_insights": analysis.get("combined_insights", []),
+        "psychological_interpretation": analysis.get("psychological_interpretation", {}),
+        "events": analysis.get("events", []),
+        "entities": analysis.get("entities", []),
+        "people": analysis.get("people", []),
+        "locations": analysis.get("locations", []),
+        "objects": analysis.get("objects", []),
+        "cause_effect": analysis.get("cause_effect", []),
+        "conflicts": analysis.get("conflicts", []),
+        "desires": analysis.get("desires", []),
+        "emotional_arc": analysis.get("emotional_arc", {}),
+        "narrative": analysis.get("narrative", {}),
+        "analysis_version": analysis.get("analysis_version", "analyzer_v5")
+    }
+
+
+def apply_analysis(dream, analysis):
+    """Copy analyzer output onto the Dream row and its analysis blob; returns the response payload."""
+    fields = analysis_fields(analysis)
+    emotions = fields["emotions"]
+    old_symbols = dream_symbol_names(dream)
+    new_symbols = symbol_names(fields["symbols"])
+    dream.mood = emotions.get("dominant", dream.mood)
+    dream.summary = fields["summary"]
+    store_analysis(dream, {name: fields[name] for name in ANALYSIS_SECTIONS}, analysis.get("stage_versions"))
+    dream.analysis_version = fields["analysis_version"]
+    dream.analysis_status = "done"
+    dream.change_seq = bump_change_seq(dream.user_id)
+    update_user_symbols(dream.user_id, added=new_symbols - old_symbols, removed=old_symbols - new_symbols,
+                        seen_at=dream.date)
+    return fields
+
+
+def analyze_and_store(dream):
+    """Run the analyzer for a saved dream and persist the results."""
+    history = recurring_lookup(dream.user_id, own_symbols=dream_symbol_names(dream))
+    analysis = analyze_dream(dream.content, symbol_history=history)
+    fields = apply_analysis(dream, analysis)
+    db.session.commit()
+    return fields
+
+
+# ---------------------------------------
+# RE-ANALYSIS BACKFILL
+# ---------------------------------------
+REANALYSIS_CHECKPOINT = "default"
+
+
+def reanalysis_target():
+    return f"{ANALYSIS_VERSION}:{stage_versions_json(STAGE_VERSIONS)}"
+
+
+def stale_dreams():
+    """Analysed dreams whose analyzer or stage versions are behind the current ones."""
+    baseline = stage_versions_json({name: BASELINE_STAGE_VERSION for name in STAGE_VERSIONS})
+    return (Dream.query.outerjoin(DreamAnalysis, DreamAnalysis.dream_id == Dream.id)
+            .filter(db.func.coalesce(Dream.analysis_status, "done") != "pending",
+                    db.or_(Dream.analysis_version.is_(None),
+                           Dream.analysis_version != ANALYSIS_VERSION,
+                           db.func.coalesce(DreamAnalysis.stage_versions, baseline) != stage_versions_json(STAGE_VERSIONS))))
+
+
+def stored_analysis(dream):
+    """The analysis fields kept for a dream, in analyze_dream's shape."""
+    return {"summary": dream.summary or "", **serialize_dream(dream, ANALYSIS_SECTIONS)}
+
+
+def _reanalyze(job):
+    content, previous, versions = job
+    if previous is None:
+        return analyze_dream(content), list(STAGE_VERSIONS)
+    return reanalyze_dream(content, previous, versions)
+
+
+def reanalysis_checkpoint():
+    ckpt = db.session.get(ReanalysisCheckpoint, REANALYSIS_CHECKPOINT)
+    target = reanalysis_target()
+    if ckpt is None:
+        ckpt = ReanalysisCheckpoint(name=REANALYSIS_CHECKPOINT, target=target)
+        db.session.add(ckpt)
+    if ckpt.target != target or ckpt.cursor in (None, 0):
+        ckpt.target, ckpt.cursor, ckpt.processed, ckpt.failed, ckpt.stage_runs = target, 0, 0, 0, None
+        ckpt.remaining = stale_dreams().count()
+    return ckpt
+
+
+def _skip_degraded_batch(ckpt):
+    print("[reanalysis] models degraded, skipping batch:", ", ".join(degraded_tiers()))
+    db.session.commit()
+    return {"batch": 0, "ok": 0, "failed": 0, "processed": ckpt.processed, "remaining": ckpt.remaining,
+            "dreams_per_second": 0.0}
+
+
+def reanalysis_step(batch_size=REANALYSIS_BATCH_SIZE, concurrency=REANALYSIS_CONCURRENCY):
+    """
+    Upgrade the next batch of stale dreams after the checkpoint cursor. Dreams
+    from an older ANALYSIS_VERSION are analysed in full, the rest re-run only
+    their stale stages. Results and the checkpoint commit together; dreams that
+    fail stay stale and are retried on the next pass. Returns the batch stats.
+    """
+    t0 = time.perf_counter()
+    ckpt = reanalysis_checkpoint()
+    # fallback output from a missing model must not be recorded as up to date. Models
+    # load lazily, so load them first; one can still fail mid-batch (checked again below)
+    warmup()
+    if degraded_tiers():
+        return _skip_degraded_batch(ckpt)
+    dreams = (stale_dreams().options(db.selectinload(Dream.analysis)).filter(Dream.id > ckpt.cursor)
+              .order_by(Dream.id).limit(batch_size).all())
+    if not dreams:
+        # pass complete; the next call starts over (retrying failures)
+        ckpt.cursor, ckpt.remaining = 0, 0
+        stats = {"batch": 0, "ok": 0, "failed": 0, "processed": ckpt.processed, "remaining": 0,
+                 "dreams_per_second": 0.0}
+        db.session.commit()
+        return stats
+
+    jobs = []
+    for dream in dreams:
+        full = dream.analysis_version != ANALYSIS_VERSION
+        versions = json.loads(dream.analysis.stage_versions) if dream.analysis is not None and dream.analysis.stage_versions else None
+        jobs.append((dream.content, None if full else stored_analysis(dream), versions))
+    results = run_concurrently(_reanalyze, jobs, concurrency)
+    if degraded_tiers():
+        # leave the whole batch stale (and the cursor where it was) for a later pass
+        return _skip_degraded_batch(ckpt)
+
+    ok = failed = 0
+    stage_runs = json.loads(ckpt.stage_runs) if ckpt.stage_runs else {}
+    for dream, outcome in zip(dreams, results):
+        if isinstance(outcome, Exception):
+            print(f"[reanalysis] dream {dream.id} error:", outcome)
+            failed += 1
+            continue
+        analysis, stages = outcome
+        apply_analysis(dream, analysis)
+        for stage in stages:
+            stage_runs[stage] = stage_runs.get(stage, 0) + 1
+        ok += 1
+
+    elapsed = time.perf_counter() - t0
+    ckpt.cursor = dreams[-1].id
+    ckpt.processed += ok
+    ckpt.failed += failed
+    ckpt.remaining = max(ckpt.remaining - len(dreams), 0)
+    ckpt.dreams_per_second = round(len(dreams) / elapsed, 3) if elapsed else 0.0
+    ckpt.stage_runs = json.dumps(stage_runs, sort_keys=True)
+    ckpt.updated_at = datetime.utcnow()
+    stats = {"batch": len(dreams), "ok": ok, "failed": failed, "processed": ckpt.processed,
+             "remaining": ckpt.remaining, "dreams_per_second": ckpt.dreams_per_second}
+    db.session.commit()
+    return stats
+
+
+def refresh_reanalysis_metrics():
+    """Backfill gauges from the stored checkpoint (the backfill runs in its own process)."""
+    ckpt = db.session.get(ReanalysisCheckpoint, REANALYSIS_CHECKPOINT)
+    if ckpt is not None:
+        runs = json.loads(ckpt.stage_runs) if ckpt.stage_runs else {}
+        record_progress({"processed": ckpt.processed, "failed": ckpt.failed, "remaining": ckpt.remaining,
+                         "dreams_per_second": ckpt.dreams_per_second,
+                         # every stage, so counts from an earlier pass are reset
+                         "stage_runs": {stage: runs.get(stage, 0) for stage in STAGE_VERSIONS}})
+
+
+def process_analysis_job(job):
+    """Job-queue handler (runs in an analysis worker process)."""
+    with app.app_context():
+        dream = Dream.query.get(job["dream_id"])
+        if dream is None:
+            return  # deleted before it was analysed
+        try:
+            analyze_and_store(dream)
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def mark_analysis_failed(job, error):
+    with app.app_context():
+        dream = Dream.query.get(job["dream_id"])
+        if dream is not None:
+            dream.analysis_status = "failed"
+            # a write like any other: change feeds and ETags must show the failure
+            dream.change_seq = bump_change_seq(dream.user_id)
+            db.session.commit()
+
+
+def init_analysis_worker():
+    # never reuse SQLite connections inherited from the parent over fork
+    with app.app_context():
+        db.engine.dispose()
+
+
+def run_analysis_workers(n=ANALYSIS_WORKERS):
+    """Start the analysis worker pool (also see scripts/run_analysis_workers.py)."""
+    return start_workers(n, ANALYSIS_QUEUE, process_analysis_job, mark_analysis_failed,
+                         initializer=init_analysis_worker)
+
+
+_last_worker_warning = 0.0
+
+
+def warn_if_no_workers():
+    """
+    Queued dreams stay pending until a worker picks them up. Workers only start with
+    `python app.py` or scripts/run_analysis_workers.py (not under flask run or
+    gunicorn), so say so loudly, at most once a minute, when none is alive.
+    """
+    global _last_worker_warning
+    if time.time() - _last_worker_warning < 60 or ANALYSIS_QUEUE.live_workers() > 0:
+        return
+    _last_worker_warning = time.time()
+    print("[app] WARNING: ANALYSIS_ASYNC is on but no analysis worker is running; queued dreams stay "
+          "pending. Start python scripts/run_analysis_workers.py or set ANALYSIS_ASYNC=0.")
+
+
+def _safe_json(val):
+    try:
+        return json.loads(val) if val else None
+    except:
+        return None
+
+
+# response field -> how to render the Dream column of the same name (for analysis
+# sections: the legacy column, used only by dreams without a DreamAnalysis blob)
+_LIST = lambda v: _safe_json(v) or []
+_OBJ = lambda v: _safe_json(v) or {}
+DREAM_FIELDS = {
+    "id": lambda v: v,
+    "title": lambda v: v,
+    "content": lambda v: v,
+    "mood": lambda v: v,
+    "summary": lambda v: v,
+    "themes": _LIST,
+    "symbols": _LIST,
+    "combined_insights": _LIST,
+    "date": lambda v: v.strftime("%Y-%m-%d %H:%M:%S"),
+    "events": _LIST,
+    "entities": _LIST,
+    "people": _LIST,
+    "locations": _LIST,
+    "objects": _LIST,
+    "cause_effect": _LIST,
+    "conflicts": _LIST,
+    "desires": _LIST,
+    "emotional_arc": _OBJ,
+    "narrative": _OBJ,
+    "analysis_version": lambda v: v,
+    "analysis_status": lambda v: v or "done",
+    "change_seq": lambda v: v or 0,
+    "psychological_interpretation": _OBJ,
+}
+
+
+def serialize_dream(d, fields=None):
+    """
+    Dream (ORM object or projected row) -> JSON dict with the requested fields
+    (default: all). Analysis sections are decoded from the blob only when requested.
+    """
+    names = fields or DREAM_FIELDS
+    payload = d.analysis_payload if any(name in ANALYSIS_SECTIONS for name in names) else None
+    # projected rows carry content only when a sentence section needs it
+    blob = AnalysisBlob(payload, getattr(d, "content", None) or "") if payload else None
+    out = {}
+    for name in names:
+        if blob is not None and name in ANALYSIS_SECTIONS:
+            out[name] = blob.get(name, DREAM_FIELDS[name](None))
+        else:
+            out[name] = DREAM_FIELDS[name](getattr(d, name))
+    return out
+
+
+# ---------------------------------------
+# DREAM LIST PAGINATION
+# ---------------------------------------
+GET_DREAMS_DEFAULT_LIMIT = 50
+GET_DREAMS_MAX_LIMIT = 200
+# list mode: the top symbols come from the blob's symbol index (no payload decoding)
+LIST_MODE_TOP_SYMBOLS = 3
+
+
+def encode_cursor(date, dream_id):
+    raw = json.dumps([date.isoformat(), dream_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(date, id) of the last dream on the previous page; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date_str, dream_id = json.loads(raw)
+        return datetime.fromisoformat(date_str), int(dream_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def dream_page(user_id, limit, cursor=None, fields=None, list_mode=False):
+    """
+    One page of a user's dreams, newest first, using keyset pagination on (date, id)
+    so every page is an index range scan regardless of depth. Only the requested
+    columns are selected. Returns (items, next_cursor).
+    """
+    join_analysis = list_mode
+    if list_mode:
+        # json_extract raises on malformed JSON, so legacy rows holding text are skipped
+        columns = [Dream.id, Dream.title, Dream.date, Dream.mood, DreamAnalysis.symbol_index] + [
+            db.case((db.func.json_valid(Dream.symbols) == 1, db.func.json_extract(Dream.symbols, f"$[{i}].symbol")),
+                    else_=None).label(f"top_symbol_{i}")
+            for i in range(LIST_MODE_TOP_SYMBOLS)]
+    else:
+        names = list(dict.fromkeys(["id", "date"] + list(fields or DREAM_FIELDS)))
+        sections = [name for name in names if name in ANALYSIS_SECTIONS]
+        # sentence offsets in the blob resolve against the content
+        if any(name in SENTENCE_SECTIONS for name in sections) and "content" not in names:
+            names.append("content")
+        columns = [getattr(Dream, name) for name in names]
+        if sections:
+            join_analysis = True
+            columns.append(DreamAnalysis.payload.label("analysis_payload"))
+
+    query = db.session.query(*columns).select_from(Dream)
+    if join_analysis:
+        query = query.outerjoin(DreamAnalysis, DreamAnalysis.dream_id == Dream.id)
+    query = query.filter(Dream.user_id == user_id)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        query = query.filter(db.or_(Dream.date < last_date, db.and_(Dream.date == last_date, Dream.id < last_id)))
+    rows = query.order_by(Dream.date.desc(), Dream.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if list_mode:
+        items = [{
+            "id": r.id,
+            "title": r.title,
+            "date": DREAM_FIELDS["date"](r.date),
+            "mood": r.mood,
+            "top_symbols": (parse_symbol_index(r.symbol_index)[:LIST_MODE_TOP_SYMBOLS] if r.symbol_index else
+                            [sym for sym in (getattr(r, f"top_symbol_{i}") for i in range(LIST_MODE_TOP_SYMBOLS)) if sym]),
+        } for r in rows]
+    else:
+        items = [serialize_dream(r, fields) for r in rows]
+    next_cursor = encode_cursor(rows[-1].date, rows[-1].id) if has_more and rows else None
+    return items, next_cursor
+
+
 # ---------------------------------------
 # ADD DREAM
 # ---------------------------------------
@@ -174,145 +794,318 @@ def add_dream():
     if not title or not content:
         return jsonify({"error": "Title and content required"}), 400
 
-    # Previous dreams for recurring symbols
-    previous = []
-    for d in Dream.query.filter_by(user_id=request.user_id).all():
-        try:
-            prev_symbols = json.loads(d.symbols) if d.symbols else []
-        except:
-            prev_symbols = []
-        previous.append({"content": d.content, "symbols": prev_symbols})
+    # Save right away; analysis fills in the rest
+    dream = Dream(
+        title=title,
+        content=content,
+        mood=mood_input,
+        user_id=request.user_id,
+        analysis_status="pending",
+        change_seq=bump_change_seq(request.user_id)
+    )
+    db.session.add(dream)
+    db.session.commit()
 
-    # Run analyzer
+    if ANALYSIS_ASYNC:
+        ANALYSIS_QUEUE.enqueue(dream.id)
+        warn_if_no_workers()
+        return jsonify({
+            "message": "Dream saved",
+            "id": dream.id,
+            "analysis_status": "pending",
+            "analysis_url": f"/dreams/{dream.id}/analysis"
+        }), 202
+
+    # Inline mode: run analyzer inside the request
     try:
-        analysis = analyze_dream(content, previous_dreams=previous)
+        fields = analyze_and_store(dream)
     except Exception:
         traceback.print_exc()
-        analysis = {}
+        db.session.rollback()
+        dream = Dream.query.get(dream.id)
+        fields = apply_analysis(dream, {})
+        db.session.commit()
 
-    # Extract fields
-    summary = analysis.get("summary", "")
-    emotions = analysis.get("emotions", {})
-    dominant_emotion = emotions.get("dominant", mood_input)
-
-    themes_list = analysis.get("themes", [])
-    symbols_list = analysis.get("symbols", [])
-
-    combined_insights_list = analysis.get("combined_insights", [])
-    psychological_interpretation = analysis.get("psychological_interpretation", {})
-
-    events = analysis.get("events", [])
-    entities = analysis.get("entities", [])
-    people = analysis.get("people", [])
-    locations = analysis.get("locations", [])
-    objects = analysis.get("objects", [])
-    cause_effect = analysis.get("cause_effect", [])
-    conflicts = analysis.get("conflicts", [])
-    desires = analysis.get("desires", [])
-    emotional_arc = analysis.get("emotional_arc", {})
-    narrative = analysis.get("narrative", {})
-    analysis_version = analysis.get("analysis_version", "analyzer_v5")
-
-    # Save dream
-    dream = Dream(
-        title=title,
-        content=content,
-        mood=dominant_emotion,
-        summary=summary,
+    return jsonify({"message": "Dream saved", "id": dream.id, "analysis_status": "done", **fields})
 
-        themes=json.dumps(themes_list),
-        symbols=json.dumps(symbols_list),
-        combined_insights=json.dumps(combined_insights_list),
 
-        psychological_interpretation=json.dumps(psychological_interpretation),
+# ---------------------------------------
+# BULK IMPORT
+# ---------------------------------------
+def ndjson_lines(stream, max_line_bytes=DREAM_IMPORT_MAX_LINE_BYTES):
+    """(line number, parsed object, error message) for each non-blank line, read incrementally."""
+    lineno = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        lineno += 1
+        if len(line) > max_line_bytes and not line.endswith(b"\n"):
+            # skip the rest of the oversized line
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_line_bytes + 1)
+            yield lineno, None, "line too long"
+            continue
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            yield lineno, None, "invalid JSON"
+        else:
+            yield lineno, entry, None
+
+
+def parse_import_entry(entry):
+    """Row values for one imported dream; raises ValueError with a client-facing message."""
+    if not isinstance(entry, dict):
+        raise ValueError("expected a JSON object")
+    title, content = entry.get("title"), entry.get("content")
+    if not isinstance(title, str) or not isinstance(content, str) or not title or not content.strip():
+        raise ValueError("title and content required")
+    date = entry.get("date")
+    if date is not None:
+        try:
+            date = datetime.fromisoformat(str(date).replace("Z", "+00:00")).replace(tzinfo=None)
+        except ValueError:
+            raise ValueError("date must be ISO 8601")
+    return {"title": title, "content": content, "mood": str(entry.get("mood") or ""), "date": date or datetime.utcnow()}
+
+
+def import_dreams(user_id, entries):
+    """
+    Analyse and insert one chunk of imported dreams: one analyze_dreams call for the
+    chunk, then a bulk insert each for the dreams, their analysis blobs and the symbol
+    counts. Recurring symbols see earlier chunks (already committed) and earlier
+    dreams of this chunk. Returns the new ids in input order. Caller commits.
+
+    If the analyzer fails, the dreams are still saved, with analysis_status "failed"
+    and no analysis, like a failed queue job; the re-analysis backfill picks them up.
+    """
+    first_seq = bump_change_seq(user_id, len(entries)) - len(entries) + 1
+    try:
+        analyses = analyze_dreams([e["content"] for e in entries], symbol_history=recurring_lookup(user_id))
+    except Exception:
+        traceback.print_exc()
+        dreams = [{**entry, "user_id": user_id, "analysis_status": "failed", "change_seq": first_seq + i}
+                  for i, entry in enumerate(entries)]
+        return db.session.execute(db.insert(Dream).returning(Dream.id, sort_by_parameter_order=True),
+                                  dreams).scalars().all()
+
+    dreams, blobs, symbols = [], [], {}
+    for i, (entry, analysis) in enumerate(zip(entries, analyses)):
+        fields = analysis_fields(analysis)
+        dreams.append({**entry,
+                       "mood": fields["emotions"].get("dominant", entry["mood"]),
+                       "summary": fields["summary"],
+                       "user_id": user_id,
+                       "analysis_version": fields["analysis_version"],
+                       "analysis_status": "done",
+                       "change_seq": first_seq + i})
+        blobs.append({"payload": encode_analysis({name: fields[name] for name in ANALYSIS_SECTIONS}, entry["content"]),
+                      "symbol_index": symbol_index(fields["symbols"]),
+                      "stage_versions": stage_versions_json(analysis.get("stage_versions")),
+                      "updated_at": datetime.utcnow()})
+        for name in symbol_names(fields["symbols"]):
+            n, seen_at = symbols.get(name, (0, entry["date"]))
+            symbols[name] = (n + 1, max(seen_at, entry["date"]))
+
+    ids = db.session.execute(db.insert(Dream).returning(Dream.id, sort_by_parameter_order=True), dreams).scalars().all()
+    db.session.execute(db.insert(DreamAnalysis), [{"dream_id": dream_id, **blob} for dream_id, blob in zip(ids, blobs)])
+    if symbols:
+        add_user_symbols(user_id, symbols)
+    return ids
+
+
+@app.route('/dreams/import', methods=['POST'])
+@auth_required
+def import_dreams_route():
+    """
+    Bulk import: one dream per line as NDJSON ({"title", "content", "mood"?, "date"?}),
+    or a JSON array of the same objects. NDJSON bodies are read and committed
+    DREAM_IMPORT_CHUNK_SIZE dreams at a time, so large files never sit in memory
+    whole. Invalid lines are reported and skipped.
+    """
+    if request.mimetype == "application/json":
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return jsonify({"error": "Expected a JSON array of dreams"}), 400
+        lines = ((lineno, entry, None) for lineno, entry in enumerate(data, 1))
+    else:
+        lines = ndjson_lines(request.stream)
+
+    ids, errors, chunk, chunk_lines = [], [], [], []
+
+    def flush():
+        try:
+            ids.extend(import_dreams(request.user_id, chunk))
+            db.session.commit()
+        except Exception:
+            traceback.print_exc()
+            db.session.rollback()
+            errors.extend({"line": lineno, "error": "import failed"} for lineno in chunk_lines)
+        chunk.clear()
+        chunk_lines.clear()
+
+    for lineno, entry, error in lines:
+        if error is None and len(ids) + len(chunk) >= DREAM_IMPORT_MAX_DREAMS:
+            errors.append({"line": lineno, "error": f"import limit of {DREAM_IMPORT_MAX_DREAMS} dreams reached"})
+            break
+        if error is None:
+            try:
+                chunk.append(parse_import_entry(entry))
+                chunk_lines.append(lineno)
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            errors.append({"line": lineno, "error": error})
+        elif len(chunk) >= DREAM_IMPORT_CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+    errors.sort(key=lambda e: e["line"])
+
+    if not ids and not errors:
+        return jsonify({"error": "No dreams to import"}), 400
+    return jsonify({"imported": len(ids), "ids": ids, "errors": errors}), 201 if ids else 400
 
-        user_id=request.user_id,
 
-        events=json.dumps(events),
-        entities=json.dumps(entities),
-        people=json.dumps(people),
-        locations=json.dumps(locations),
-        objects=json.dumps(objects),
-        cause_effect=json.dumps(cause_effect),
-        conflicts=json.dumps(conflicts),
-        desires=json.dumps(desires),
-        emotional_arc=json.dumps(emotional_arc),
-        narrative=json.dumps(narrative),
-        analysis_version=analysis_version
-    )
+# ---------------------------------------
+# ANALYSIS STATUS (polling)
+# ---------------------------------------
+@app.route('/dreams/<int:id>/analysis', methods=['GET'])
+@auth_required
+def get_dream_analysis(id):
+    dream = Dream.query.get_or_404(id)
+    if dream.user_id != request.user_id:
+        return jsonify({"error": "Unauthorized"}), 403
 
-    db.session.add(dream)
-    db.session.commit()
+    status = dream.analysis_status or "done"
+    body = {"id": dream.id, "analysis_status": status}
+    if status == "done":
+        body["analysis"] = serialize_dream(dream)
+    else:
+        job = ANALYSIS_QUEUE.latest_for_dream(dream.id)
+        if job is not None:
+            body["job"] = {"status": job["status"], "attempts": job["attempts"]}
 
-    return jsonify({
-        "message": "Dream saved",
-        "summary": summary,
-        "emotions": emotions,
-        "themes": themes_list,
-        "symbols": symbols_list,
-        "combined_insights": combined_insights_list,
-        "psychological_interpretation": psychological_interpretation,
-        "events": events,
-        "entities": entities,
-        "people": people,
-        "locations": locations,
-        "objects": objects,
-        "cause_effect": cause_effect,
-        "conflicts": conflicts,
-        "desires": desires,
-        "emotional_arc": emotional_arc,
-        "narrative": narrative,
-        "analysis_version": analysis_version
-    })
+    return jsonify(body)
 
 
 # ---------------------------------------
 # GET DREAMS
 # ---------------------------------------
+def parse_dream_list_args(args, default_limit=GET_DREAMS_DEFAULT_LIMIT):
+    """(limit, fields, mode) from query args; raises ValueError with a client-facing message."""
+    try:
+        limit = min(max(int(args.get("limit", default_limit)), 1), GET_DREAMS_MAX_LIMIT)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+
+    mode = args.get("mode", "full")
+    if mode not in ("full", "list"):
+        raise ValueError("mode must be 'full' or 'list'")
+
+    fields = None
+    if args.get("fields") and mode == "full":
+        fields = [f.strip() for f in args["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in DREAM_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        fields = list(dict.fromkeys(["id", "date"] + fields))
+    return limit, fields, mode
+
+
+def user_change_seq(user_id):
+    return db.session.query(User.change_seq).filter_by(id=user_id).scalar() or 0
+
+
 @app.route('/get_dreams', methods=['GET'])
 @auth_required
 def get_dreams():
-    dreams = Dream.query.filter_by(user_id=request.user_id).order_by(Dream.date.desc()).all()
-    result = []
-
-    def safe(val):
+    """
+    Without parameters: every dream with all fields, as a JSON array (legacy clients).
+    With any of limit / cursor / fields / mode: one page as
+    {"dreams": [...], "next_cursor": ...}; pass next_cursor back for the next page.
+      fields=title,mood,...  only these fields (id and date are always included)
+      mode=list              id, title, date, mood and top_symbols only
+
+    Responses carry a strong ETag derived from the user's change counter and the
+    query, plus X-Dreams-Version (the counter, a starting point for /dreams/changes).
+    A matching If-None-Match gets 304 before any dream row is read.
+    """
+    args = request.args
+    version = user_change_seq(request.user_id)
+    variant = hashlib.sha1(request.query_string).hexdigest()[:12]
+    etag = f"{request.user_id}-{version}-{variant}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif not any(k in args for k in ("limit", "cursor", "fields", "mode")):
+        dreams = (Dream.query.options(db.selectinload(Dream.analysis)).filter_by(user_id=request.user_id)
+                  .order_by(Dream.date.desc()).all())
+        response = jsonify([serialize_dream(d) for d in dreams])
+    else:
         try:
-            return json.loads(val) if val else None
-        except:
-            return None
-
-    for d in dreams:
-        themes = safe(d.themes) or []
-        symbols = safe(d.symbols) or []
-        insights = safe(d.combined_insights) or []
-
-        result.append({
-            "id": d.id,
-            "title": d.title,
-            "content": d.content,
-            "mood": d.mood,
-            "summary": d.summary,
-            "themes": themes,
-            "symbols": symbols,
-            "combined_insights": insights,
-            "date": d.date.strftime("%Y-%m-%d %H:%M:%S"),
-
-            "events": safe(d.events) or [],
-            "entities": safe(d.entities) or [],
-            "people": safe(d.people) or [],
-            "locations": safe(d.locations) or [],
-            "objects": safe(d.objects) or [],
-            "cause_effect": safe(d.cause_effect) or [],
-            "conflicts": safe(d.conflicts) or [],
-            "desires": safe(d.desires) or [],
-            "emotional_arc": safe(d.emotional_arc) or {},
-            "narrative": safe(d.narrative) or {},
-            "analysis_version": d.analysis_version,
-
-            "psychological_interpretation": safe(d.psychological_interpretation) or {}
-        })
-
-    return jsonify(result)
+            limit, fields, mode = parse_dream_list_args(args)
+            items, next_cursor = dream_page(request.user_id, limit, args.get("cursor"), fields, list_mode=(mode == "list"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        response = jsonify({"dreams": items, "next_cursor": next_cursor})
+
+    response.set_etag(etag)
+    response.headers["X-Dreams-Version"] = str(version)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+# ---------------------------------------
+# CHANGE FEED
+# ---------------------------------------
+@app.route('/dreams/changes', methods=['GET'])
+@auth_required
+def dream_changes():
+    """
+    Dreams created or updated, and ids deleted, after change counter `since`
+    (X-Dreams-Version of a /get_dreams response, or `version` of a previous call).
+    Returns {"changed": [...], "deleted": [ids], "version": N, "has_more": bool};
+    while has_more, call again with since=version. Accepts limit / fields / mode
+    like /get_dreams.
+    """
+    try:
+        since = int(request.args.get("since", "0"))
+    except ValueError:
+        return jsonify({"error": "since must be an integer"}), 400
+    try:
+        limit, fields, mode = parse_dream_list_args(request.args, default_limit=GET_DREAMS_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    user_id = request.user_id
+    version = user_change_seq(user_id)
+    query = Dream.query.filter(Dream.user_id == user_id, Dream.change_seq > since)
+    if mode != "list":
+        query = query.options(db.selectinload(Dream.analysis))
+    dreams = query.order_by(Dream.change_seq).limit(limit + 1).all()
+    tombstones = (DreamTombstone.query.filter(DreamTombstone.user_id == user_id, DreamTombstone.change_seq > since)
+                  .order_by(DreamTombstone.change_seq).limit(limit + 1).all())
+
+    # merge both streams in counter order and cut at `limit` entries
+    events = sorted([(d.change_seq, "changed", d) for d in dreams] +
+                    [(t.change_seq, "deleted", t) for t in tombstones], key=lambda e: e[0])
+    has_more = len(events) > limit
+    events = events[:limit]
+    if has_more:
+        version = events[-1][0]
+
+    changed, deleted = [], []
+    for _, kind, row in events:
+        if kind == "deleted":
+            deleted.append(row.dream_id)
+        elif mode == "list":
+            changed.append(serialize_dream(row, ["id", "title", "date", "mood", "change_seq"]))
+        else:
+            changed.append(serialize_dream(row, fields + ["change_seq"] if fields else None))
+    return jsonify({"changed": changed, "deleted": deleted, "version": version, "has_more": has_more})
 
 
 # ---------------------------------------
@@ -325,11 +1118,97 @@ def delete_dream(id):
     if dream.user_id != request.user_id:
         return jsonify({"error": "Unauthorized"}), 403
 
+    names = dream_symbol_names(dream)
+    db.session.add(DreamTombstone(user_id=dream.user_id, dream_id=dream.id, change_seq=bump_change_seq(dream.user_id)))
     db.session.delete(dream)
+    db.session.flush()
+    update_user_symbols(dream.user_id, removed=names, seen_at=dream.date)
     db.session.commit()
 
     return jsonify({"message": "Dream deleted"})
 
 
+# ---------------------------------------
+# HEALTH
+# ---------------------------------------
+@app.route('/health', methods=['GET'])
+def health():
+    degraded = degraded_tiers()
+    return jsonify({
+        "status": "degraded" if degraded else "ok",
+        "degraded_tiers": degraded,
+        "models": model_status(),
+        "symbol_index_version": SYMBOL_INDEX_HOLDER.version,
+        # only meaningful with ANALYSIS_ASYNC: 0 means queued dreams are not being analysed
+        "analysis_workers": ANALYSIS_QUEUE.live_workers() if ANALYSIS_ASYNC else None
+    })
+
+
+# ---------------------------------------
+# ADMIN: SYMBOL INDEX RELOAD
+# ---------------------------------------
+@app.route('/admin/reload_symbols', methods=['POST'])
+@admin_required
+def reload_symbols():
+    previous = SYMBOL_INDEX_HOLDER.version
+    try:
+        snapshot = SYMBOL_INDEX_HOLDER.reload()
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"Reload failed: {e}", "version": previous}), 500
+
+    return jsonify({
+        "message": "Symbol index reloaded",
+        "previous_version": previous,
+        "version": snapshot.version,
+        "symbols": len(snapshot.table)
+    })
+
+
+# ---------------------------------------
+# ADMIN: LOADED MODELS
+# ---------------------------------------
+@app.route('/admin/models', methods=['GET'])
+@admin_required
+def loaded_models():
+    return jsonify(memory_report())
+
+
+# ---------------------------------------
+# METRICS (Prometheus text format; stage timings, micro-batching)
+# ---------------------------------------
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics disabled"}), 404
+    refresh_reanalysis_metrics()
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+# ---------------------------------------
+# ADMIN: METRICS (micro-batch sizes, queueing delay)
+# ---------------------------------------
+@app.route('/admin/metrics', methods=['GET'])
+@admin_required
+def admin_metrics():
+    refresh_reanalysis_metrics()
+    return jsonify(metrics.snapshot())
+
+
+if SYMBOL_INDEX_RELOAD_INTERVAL > 0:
+    SYMBOL_INDEX_HOLDER.start_auto_reload(SYMBOL_INDEX_RELOAD_INTERVAL)
+
+if ANALYSIS_WARMUP:
+    threading.Thread(target=warmup, name="analysis-warmup", daemon=True).start()
+
+
 if __name__ == '__main__':
-    app.run(debug=True, threaded=True)
+    use_reloader = os.environ.get("FLASK_RELOADER", "1") == "1"
+    # with the reloader this block runs twice; only the serving child starts workers
+    serving = not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+    if ANALYSIS_ASYNC and serving:
+        if ANALYSIS_WORKERS > 0:
+            run_analysis_workers()
+        else:
+            print("[app] WARNING: ANALYSIS_ASYNC is on with ANALYSIS_WORKERS=0; run scripts/run_analysis_workers.py")
+    app.run(debug=True, threaded=True, use_reloader=use_reloader)
@@ -0,0 +1,60 @@
+# benchmarks/bench_ann.py
+"""
+Recall@k versus latency of the IVF index against exact search, on clustered
+synthetic 384-d embeddings (real sentence embeddings are far from uniform).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_ann [--sizes 10000 100000] [--top-k 20] [--queries 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.vector_index import ExactVectorIndex, IVFVectorIndex
+
+DIM = 384
+NPROBES = [1, 2, 4, 8, 16, 32, 64]
+
+
+def clustered(rng, n, n_topics=200, spread=0.35):
+    centers = rng.standard_normal((n_topics, DIM)).astype(np.float32)
+    labels = rng.integers(0, n_topics, size=n)
+    return centers[labels] + spread * rng.standard_normal((n, DIM)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--lists", type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        emb = clustered(rng, n)
+        queries = clustered(rng, args.queries)
+        exact = ExactVectorIndex(emb)
+        t0 = time.perf_counter()
+        ivf = IVFVectorIndex.build(emb, n_lists=args.lists)
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        truth = [set(exact.search(q, top_k=args.top_k)[1].tolist()) for q in queries]
+        exact_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+        print(f"\n{n} symbols, {ivf.n_lists} lists, build {build_s:.1f} s, exact {exact_ms:.2f} ms/query")
+        print(f"{'nprobe':>7} {'recall@' + str(args.top_k):>10} {'ms/query':>9}")
+        for nprobe in NPROBES:
+            if nprobe > ivf.n_lists:
+                break
+            t0 = time.perf_counter()
+            found = [set(ivf.search(q, top_k=args.top_k, nprobe=nprobe)[1].tolist()) for q in queries]
+            ms = (time.perf_counter() - t0) * 1000 / len(queries)
+            recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+            print(f"{nprobe:>7} {recall:>10.3f} {ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_api.py
+"""
+Load test of the Flask API: N concurrent clients, each with its own account,
+alternate POST /add_dream and GET /get_dreams against a real threaded server
+on localhost. Reports per-endpoint latency percentiles and throughput.
+
+By default dreams are analysed inside the request (ANALYSIS_ASYNC=0), so
+/add_dream includes the analysis; --async measures only save + enqueue.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_api [--clients 8] [--requests 20] [--async] [--real-models]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.request
+
+from benchmarks.corpus import make_dream
+from benchmarks.timing import summarize_ms
+
+
+def _call(base, method, path, body=None, token=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        payload = resp.read()
+        status = resp.status
+    return time.perf_counter() - t0, status, payload
+
+
+def _start_server():
+    """Serve the app on an ephemeral localhost port from a daemon thread; returns (server, base_url)."""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    import app as app_module
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="bench-api-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_api(clients: int = 8, requests_per_client: int = 20, dream_chars: int = 2000, run_id: str = None) -> dict:
+    """Run the load test; app must not have been imported yet if ANALYSIS_ASYNC is to be overridden."""
+    server, base = _start_server()
+    run_id = run_id or str(int(time.time() * 1000))
+    latencies = {"add_dream": [], "get_dreams": []}
+    errors = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients + 1)
+
+    def client(i):
+        email = f"bench-{run_id}-{i}@example.com"
+        password = "bench-password"
+        try:
+            _call(base, "POST", "/signup", {"email": email, "username": f"bench-{run_id}-{i}", "password": password})
+            _, _, payload = _call(base, "POST", "/login", {"email": email, "password": password})
+            token = json.loads(payload)["token"]
+        except Exception as e:
+            with lock:
+                errors.append(f"client {i} login: {e}")
+            start_barrier.wait()
+            return
+        start_barrier.wait()
+        for r in range(requests_per_client):
+            body = {"title": f"Dream {r}", "content": make_dream(dream_chars, seed=i * 1000 + r), "mood": ""}
+            for endpoint, args in (("add_dream", ("POST", "/add_dream", body)), ("get_dreams", ("GET", "/get_dreams", None))):
+                try:
+                    elapsed, _, _ = _call(base, *args, token=token)
+                    with lock:
+                        latencies[endpoint].append(elapsed)
+                except Exception as e:
+                    with lock:
+                        errors.append(f"{endpoint}: {e}")
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    start_barrier.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    server.shutdown()
+
+    done = sum(len(v) for v in latencies.values())
+    return {
+        "clients": clients,
+        "requests_per_client": requests_per_client,
+        "dream_chars": dream_chars,
+        "analysis_async": os.environ.get("ANALYSIS_ASYNC", "1") == "1",
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(done / wall, 2) if wall else 0.0,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "endpoints": {name: summarize_ms(v) for name, v in latencies.items() if v},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20, help="add_dream + get_dreams pairs per client")
+    parser.add_argument("--dream-chars", type=int, default=2000)
+    parser.add_argument("--async", dest="use_async", action="store_true", help="enqueue analysis instead of running it inline")
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    os.environ["ANALYSIS_ASYNC"] = "1" if args.use_async else "0"
+    if not args.real_models:
+        from benchmarks.stubs import setup_stub_environment
+        setup_stub_environment(latency_ms=args.latency_ms)
+    print(json.dumps(run_api(args.clients, args.requests, args.dream_chars), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_emotion_arc.py
+"""
+Emotion stage latency: one pipeline call per sentence plus one for the whole
+text (old behaviour) versus a single batched call over all of them.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_emotion_arc [--batch-size 16] [--repeat 3]
+"""
+import argparse
+import time
+
+from benchmarks.corpus import make_dream
+from utils.analyzer_upgraded import split_sentences
+from utils.ner_and_utils import detect_emotion_text, detect_emotion_batch, get_emotion_pipeline
+
+SIZES = [1000, 5000, 20000]
+
+
+def run_per_sentence(text, batch_size):
+    detect_emotion_text(text)
+    for s in split_sentences(text):
+        detect_emotion_text(s)
+
+
+def run_batched(text, batch_size):
+    detect_emotion_batch([text] + split_sentences(text), batch_size=batch_size)
+
+
+def best_of(fn, text, batch_size, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text, batch_size)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if get_emotion_pipeline() is None:
+        raise SystemExit("emotion pipeline is not available")
+
+    print(f"{'chars':>8} {'sentences':>9} {'per-sentence (ms)':>18} {'batched (ms)':>13} {'speedup':>8}")
+    for n in SIZES:
+        text = make_dream(n)
+        old = best_of(run_per_sentence, text, args.batch_size, args.repeat)
+        new = best_of(run_batched, text, args.batch_size, args.repeat)
+        print(f"{n:>8} {len(split_sentences(text)):>9} {old * 1000:>18.1f} {new * 1000:>13.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_import.py
+"""
+Measure `import app` in a fresh interpreter and fail if it eagerly pulls in the
+heavy ML stack. Exits non-zero on a violation, so it can gate CI.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_import [--max-seconds 3.0] [--repeat 3]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# modules that must only be imported on first use of a model
+FORBIDDEN = ["torch", "transformers", "sentence_transformers", "keybert", "spacy", "sklearn"]
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+elapsed = time.perf_counter() - t0
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (FORBIDDEN,)
+
+
+def probe():
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-seconds", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [probe() for _ in range(args.repeat)]
+    best = min(r["seconds"] for r in runs)
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    print(f"import app: best {best:.3f} s over {args.repeat} runs")
+
+    failed = False
+    if loaded:
+        print("FAIL: imported eagerly:", ", ".join(loaded))
+        failed = True
+    if best > args.max_seconds:
+        print(f"FAIL: import took longer than {args.max_seconds:.1f} s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_pipeline.py
+"""
+analyze_dream end to end and per stage, plus the symbol matching functions in
+isolation, over the synthetic corpus (short / medium / long x punctuation styles).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_pipeline [--repeat 5] [--real-models] [--latency-ms 0]
+
+Normally run through benchmarks.run_benchmarks, which also writes the JSON results.
+"""
+import argparse
+import json
+import statistics
+
+from benchmarks.corpus import make_corpus
+from benchmarks.timing import measure
+
+
+def run_pipeline(corpus, repeat: int = 5) -> dict:
+    """Per corpus entry: end-to-end latency and the median wall/CPU time of every stage."""
+    from utils.analyzer_upgraded import analyze_dream
+    results = {}
+    for entry in corpus:
+        text = entry["text"]
+        stage_samples = {}
+
+        def call():
+            out = analyze_dream(text, return_timings=True)
+            for name, t in out["timings"]["stages"].items():
+                stage_samples.setdefault(name, []).append(t)
+
+        total = measure(call, repeat=repeat)
+        stages = {}
+        for name, samples in sorted(stage_samples.items()):
+            stages[name] = {
+                "wall_median_ms": round(statistics.median(s["wall_ms"] for s in samples), 3),
+                "cpu_median_ms": round(statistics.median(s["cpu_ms"] for s in samples), 3),
+            }
+        results[entry["id"]] = {"chars": entry["chars"], "total": total, "stages": stages}
+    return results
+
+
+def run_symbols(corpus, repeat: int = 5) -> dict:
+    """exact_match_symbols, semantic_match_symbols and rank_symbols on one fixed index snapshot."""
+    from utils.analyzer_upgraded import (
+        SYMBOL_INDEX_HOLDER, exact_match_symbols, semantic_match_symbols, rank_symbols, merge_symbol_matches,
+    )
+    snapshot = SYMBOL_INDEX_HOLDER.current()
+    if snapshot is None:
+        raise RuntimeError("symbol index not available")
+    snapshot.matcher  # build the trie outside the timed region
+    results = {"symbols_in_index": len(snapshot.table)}
+    for entry in corpus:
+        text = entry["text"]
+        sem = semantic_match_symbols(text, top_k=20, score_threshold=0.40, snapshot=snapshot)
+        exacts = exact_match_symbols(text, snapshot=snapshot)
+        candidates = merge_symbol_matches([dict(s) for s in sem], exacts)
+        results[entry["id"]] = {
+            "exact": measure(lambda: exact_match_symbols(text, snapshot=snapshot), repeat=repeat),
+            "semantic": measure(lambda: semantic_match_symbols(text, top_k=20, score_threshold=0.40, snapshot=snapshot), repeat=repeat),
+            "rank": measure(lambda: rank_symbols(text, candidates), repeat=repeat),
+            "candidates": len(candidates),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--real-models", action="store_true", help="use the real models instead of stubs")
+    parser.add_argument("--latency-ms", type=float, default=0, help="simulated latency per stub model call")
+    parser.add_argument("--symbols", type=int, default=2000, help="size of the synthetic symbol dictionary")
+    args = parser.parse_args()
+
+    if not args.real_models:
+        from benchmarks.stubs import setup_stub_environment
+        setup_stub_environment(n_symbols=args.symbols, latency_ms=args.latency_ms)
+    corpus = make_corpus()
+    print(json.dumps({"pipeline": run_pipeline(corpus, args.repeat), "symbols": run_symbols(corpus, args.repeat)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
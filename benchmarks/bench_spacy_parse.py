@@ -0,0 +1,63 @@
+# benchmarks/bench_spacy_parse.py
+"""
+Compare structured extraction with one spaCy parse per extractor (old behaviour)
+against a single shared parse through AnalysisContext.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_spacy_parse [--repeat 5]
+"""
+import argparse
+import time
+
+from benchmarks.corpus import make_dream
+from utils.ner_and_utils import get_spacy
+from utils.analyzer_upgraded import (
+    AnalysisContext,
+    extract_entities_structured,
+    extract_people_locations_objects,
+    extract_events,
+)
+
+SIZES = [1000, 5000, 20000]
+
+
+def run_separate(text):
+    extract_entities_structured(text)
+    extract_people_locations_objects(text)
+    extract_events(text)
+
+
+def run_shared(text):
+    ctx = AnalysisContext(text)
+    extract_entities_structured(text, doc=ctx.doc)
+    extract_people_locations_objects(text, doc=ctx.doc)
+    extract_events(text, doc=ctx.doc)
+
+
+def best_of(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if get_spacy() is None:
+        raise SystemExit("spaCy model en_core_web_sm is not available")
+
+    print(f"{'chars':>8} {'separate (ms)':>14} {'shared (ms)':>12} {'speedup':>8}")
+    for n in SIZES:
+        text = make_dream(n)
+        sep = best_of(run_separate, text, args.repeat)
+        shared = best_of(run_shared, text, args.repeat)
+        print(f"{n:>8} {sep * 1000:>14.1f} {shared * 1000:>12.1f} {sep / shared:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
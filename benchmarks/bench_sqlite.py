@@ -0,0 +1,144 @@
+# benchmarks/bench_sqlite.py
+"""
+SQLite concurrency benchmark for the dreams store: writer threads save dreams
+the way /add_dream does (bump the user's change counter + insert, one
+transaction), while reader threads fetch /get_dreams-style pages. The same
+mix runs once with SQLite's default settings and once with the pragmas from
+utils/sqlite_profile.py, each on a fresh database file.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_sqlite [--writers 4] [--readers 8] [--ops 200]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.corpus import make_dream
+from benchmarks.timing import summarize_ms
+from utils.sqlite_profile import SQLITE_BUSY_TIMEOUT_MS, apply_pragmas, tuned_pragmas
+
+SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, email TEXT UNIQUE NOT NULL, change_seq INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE dream (
+    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, title TEXT, content TEXT,
+    date DATETIME, mood TEXT, summary TEXT, change_seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX ix_dream_user_date_id ON dream (user_id, date, id);
+CREATE INDEX ix_dream_user_change_seq ON dream (user_id, change_seq);
+"""
+PAGE_QUERY = ("SELECT id, title, date, mood, summary FROM dream WHERE user_id = ? "
+              "ORDER BY date DESC, id DESC LIMIT 50")
+
+PROFILES = {
+    # sqlite3 as app.py used it before: rollback journal, synchronous=FULL, no mmap
+    "default": {},
+    "tuned": tuned_pragmas(),
+}
+
+
+def _connect(path, pragmas):
+    conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0, check_same_thread=False)
+    apply_pragmas(conn, pragmas)
+    return conn
+
+
+def _seed(path, pragmas, users, dreams_per_user, content):
+    conn = _connect(path, pragmas)
+    conn.executescript(SCHEMA)
+    start = datetime(2024, 1, 1)
+    conn.executemany("INSERT INTO user (id, email) VALUES (?, ?)", [(u, f"user{u}@example.com") for u in range(1, users + 1)])
+    conn.executemany(
+        "INSERT INTO dream (user_id, title, content, date, mood, summary) VALUES (?, ?, ?, ?, '', '')",
+        [(u, f"Dream {i}", content, (start + timedelta(hours=i)).isoformat(" "))
+         for u in range(1, users + 1) for i in range(dreams_per_user)])
+    conn.commit()
+    conn.close()
+
+
+def run_profile(name, writers=4, readers=8, ops=200, users=20, dreams_per_user=100, dream_chars=2000, workdir=None):
+    pragmas = PROFILES[name]
+    workdir = workdir or tempfile.mkdtemp(prefix="dream-sqlite-bench-")
+    path = os.path.join(workdir, f"{name}.db")
+    content = make_dream(dream_chars, seed=0)
+    _seed(path, pragmas, users, dreams_per_user, content)
+
+    latencies = {"write": [], "read": []}
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(writers + readers + 1)
+
+    def worker(kind, seed):
+        rng = random.Random(seed)
+        conn = _connect(path, pragmas)
+        samples = []
+        barrier.wait()
+        for _ in range(ops):
+            user_id = rng.randint(1, users)
+            t0 = time.perf_counter()
+            try:
+                if kind == "write":
+                    conn.execute("UPDATE user SET change_seq = change_seq + 1 WHERE id = ?", (user_id,))
+                    seq = conn.execute("SELECT change_seq FROM user WHERE id = ?", (user_id,)).fetchone()[0]
+                    conn.execute("INSERT INTO dream (user_id, title, content, date, mood, change_seq) "
+                                 "VALUES (?, 'new', ?, ?, '', ?)", (user_id, content, datetime.utcnow().isoformat(" "), seq))
+                    conn.commit()
+                else:
+                    conn.execute(PAGE_QUERY, (user_id,)).fetchall()
+                samples.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                with lock:
+                    errors.append(f"{kind}: {e}")
+        conn.close()
+        with lock:
+            latencies[kind].extend(samples)
+
+    threads = [threading.Thread(target=worker, args=("write", i)) for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=("read", 1000 + i)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    done = sum(len(v) for v in latencies.values())
+    return {
+        "pragmas": {k: str(v) for k, v in pragmas.items()},
+        "wall_seconds": round(wall, 3),
+        "throughput_ops": round(done / wall, 1) if wall else 0.0,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "operations": {kind: summarize_ms(v) for kind, v in latencies.items() if v},
+    }
+
+
+def run_sqlite(writers=4, readers=8, ops=200, **kwargs):
+    """Both profiles on identical workloads, plus tuned/default throughput ratio."""
+    results = {name: run_profile(name, writers, readers, ops, **kwargs) for name in PROFILES}
+    default, tuned = results["default"]["throughput_ops"], results["tuned"]["throughput_ops"]
+    results["speedup"] = round(tuned / default, 2) if default else None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="operations per thread")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--dreams-per-user", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(run_sqlite(args.writers, args.readers, args.ops, users=args.users,
+                                dreams_per_user=args.dreams_per_user), indent=2))
+
+
+if __name__ == "__main__":
+    main()
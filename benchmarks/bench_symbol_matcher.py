@@ -0,0 +1,79 @@
+# benchmarks/bench_symbol_matcher.py
+"""
+Microbenchmark: per-row regex scan (the old exact_match_symbols loop) versus the
+compiled SymbolMatcher, on a synthetic dictionary. Also checks both agree.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_symbol_matcher [--symbols 5000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from benchmarks.corpus import make_dream, OBJECTS
+from utils.symbol_matcher import SymbolMatcher
+
+SIZES = [1000, 5000, 20000]
+
+
+def make_symbols(n, seed=0):
+    rng = random.Random(seed)
+    base = sorted({w for phrase in OBJECTS for w in phrase.split()[1:]} | {"snake", "water", "teeth", "ice-cream", "new york"})
+    symbols = list(base)
+    while len(symbols) < n:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        symbols.append(word if rng.random() > 0.1 else word + " " + rng.choice(base))
+    return symbols[:n]
+
+
+def regex_scan(symbols, text_clean):
+    """The previous implementation, minus pandas row overhead."""
+    out = []
+    for pos, symbol in enumerate(symbols):
+        patterns = [rf'\b{re.escape(symbol)}\b']
+        if not symbol.endswith('s'):
+            patterns.append(rf'\b{re.escape(symbol)}s\b')
+        for p in patterns:
+            if re.search(p, text_clean):
+                out.append(pos)
+                break
+    return out
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    symbols = make_symbols(args.symbols)
+    translator = str.maketrans('', '', string.punctuation.replace('-', ''))
+
+    t0 = time.perf_counter()
+    matcher = SymbolMatcher(symbols, plural_s=True)
+    build = time.perf_counter() - t0
+    print(f"dictionary: {len(symbols)} symbols, matcher build {build * 1000:.1f} ms")
+    print(f"{'chars':>8} {'regex (ms)':>11} {'matcher (ms)':>13} {'speedup':>8} {'matches':>8}")
+    for n in SIZES:
+        text_clean = make_dream(n).lower().translate(translator)
+        expected = regex_scan(symbols, text_clean)
+        got = matcher.find(text_clean)
+        assert got == expected, "matcher disagrees with regex scan"
+        old = best_of(lambda: regex_scan(symbols, text_clean), args.repeat)
+        new = best_of(lambda: matcher.find(text_clean), args.repeat)
+        print(f"{n:>8} {old * 1000:>11.1f} {new * 1000:>13.2f} {old / new:>7.0f}x {len(got):>8}")
+
+
+if __name__ == "__main__":
+    main()
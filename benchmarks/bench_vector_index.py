@@ -0,0 +1,67 @@
+# benchmarks/bench_vector_index.py
+"""
+Query latency of ExactVectorIndex against sklearn NearestNeighbors(metric='cosine')
+on random 384-d embeddings (the all-MiniLM-L6-v2 dimension). When sklearn is
+installed the top-k indices of both are compared.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_vector_index [--top-k 20] [--queries 200] [--batch 32]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.vector_index import ExactVectorIndex
+
+SIZES = [1000, 10000, 100000]
+DIM = 384
+
+try:
+    from sklearn.neighbors import NearestNeighbors
+except ImportError:
+    NearestNeighbors = None
+
+
+def per_query_ms(fn, queries):
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - t0) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'symbols':>8} {'sklearn (ms)':>13} {'exact (ms)':>11} {'batched (ms/q)':>15} {'same top-k':>11}")
+    for n in SIZES:
+        emb = rng.standard_normal((n, DIM)).astype(np.float32)
+        queries = rng.standard_normal((args.queries, DIM)).astype(np.float32)
+        index = ExactVectorIndex(emb)
+
+        exact_ms = per_query_ms(lambda q: index.search(q, top_k=args.top_k), queries)
+        t0 = time.perf_counter()
+        for start in range(0, len(queries), args.batch):
+            index.search_batch(queries[start:start + args.batch], top_k=args.top_k)
+        batched_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+        sk_ms, same = float("nan"), "n/a"
+        if NearestNeighbors is not None:
+            nn = NearestNeighbors(n_neighbors=min(50, n), metric="cosine").fit(emb)
+            sk_ms = per_query_ms(lambda q: nn.kneighbors([q], n_neighbors=args.top_k), queries)
+            agree = 0
+            for q in queries[:50]:
+                _, sk_idx = nn.kneighbors([q], n_neighbors=args.top_k)
+                _, ex_idx = index.search(q, top_k=args.top_k)
+                agree += set(sk_idx[0]) == set(ex_idx.tolist())
+            same = f"{agree}/50"
+        print(f"{n:>8} {sk_ms:>13.2f} {exact_ms:>11.2f} {batched_ms:>15.3f} {same:>11}")
+
+
+if __name__ == "__main__":
+    main()
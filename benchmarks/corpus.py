@@ -0,0 +1,78 @@
+# benchmarks/corpus.py
+"""Deterministic synthetic dream text used by the benchmark scripts."""
+import random
+
+SUBJECTS = ["I", "My mother", "A stranger", "The old man", "My brother", "Someone", "A child", "We"]
+VERBS = ["walked through", "ran from", "found", "lost", "watched", "climbed", "opened", "chased", "fell into", "swam across"]
+OBJECTS = ["a dark forest", "the ocean", "a burning house", "an empty school", "a snake", "the moon",
+           "a locked door", "a broken mirror", "a long staircase", "a crowded train", "my teeth", "a wedding"]
+PLACES = ["in Paris", "near the river", "at my old school", "inside a castle", "on a mountain", "under the bridge"]
+FEELINGS = ["and I felt afraid", "and I was happy", "because I wanted to escape", "when the sky turned red",
+            "and it made me sad", "so that nobody could see me", "and I felt calm", ""]
+ENDINGS = [".", ".", ".", "!", "?"]
+
+# entry lengths in characters: short note, typical entry, very long journal dump
+SIZES = {"short": 200, "medium": 2000, "long": 30000}
+
+
+def _plain(body: str, end: str) -> str:
+    return body + end
+
+
+def _spanish(body: str, end: str) -> str:
+    # inverted opening marks
+    return {"?": "¿" + body + "?", "!": "¡" + body + "!"}.get(end, body + end)
+
+
+def _french(body: str, end: str) -> str:
+    # guillemets and a (narrow no-break) space before high punctuation
+    if end in "?!":
+        return body + " " + end
+    return f"« {body} »." if len(body) % 3 == 0 else body + end
+
+
+def _cjk(body: str, end: str) -> str:
+    # full-width stops and corner quotes; no space after the stop
+    return "「" + body + "」" + {".": "。", "!": "！", "?": "？"}[end]
+
+
+def _mixed(body: str, end: str) -> str:
+    # ellipses, em dashes and curly quotes as typed on phones
+    if end == ".":
+        return body.replace(" and ", " — and ", 1) + "…"
+    return "“" + body + end + "”"
+
+
+STYLES = {"en": _plain, "es": _spanish, "fr": _french, "cjk": _cjk, "mixed": _mixed}
+# styles whose sentences are not separated by a space
+_JOINERS = {"cjk": ""}
+
+
+def make_sentence(rng: random.Random, style: str = "en") -> str:
+    parts = [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(PLACES), rng.choice(FEELINGS)]
+    return STYLES[style](" ".join(p for p in parts if p), rng.choice(ENDINGS))
+
+
+def make_dream(n_chars: int, seed: int = 0, style: str = "en") -> str:
+    """Return a dream of roughly `n_chars` characters; same seed and style give the same text."""
+    rng = random.Random(f"{seed}:{n_chars}" if style == "en" else f"{seed}:{n_chars}:{style}")
+    joiner = _JOINERS.get(style, " ")
+    sentences = []
+    length = 0
+    while length < n_chars:
+        s = make_sentence(rng, style)
+        sentences.append(s)
+        length += len(s) + len(joiner)
+    return joiner.join(sentences)
+
+
+def make_corpus(seed: int = 0, sizes=None, styles=None):
+    """Every size x punctuation style as dicts with id, size, style, chars and text."""
+    sizes = sizes or list(SIZES)
+    styles = styles or list(STYLES)
+    corpus = []
+    for size in sizes:
+        for style in styles:
+            text = make_dream(SIZES[size], seed=seed, style=style)
+            corpus.append({"id": f"{size}-{style}", "size": size, "style": style, "chars": len(text), "text": text})
+    return corpus
@@ -0,0 +1,149 @@
+# benchmarks/run_benchmarks.py
+"""
+Run the benchmark suites and write one JSON result file, optionally comparing
+against an earlier run and failing on regressions.
+
+Suites:
+    pipeline  analyze_dream end to end and per stage over the synthetic corpus
+    symbols   exact_match_symbols / semantic_match_symbols / rank_symbols alone
+    api       concurrent clients against /add_dream and /get_dreams
+    sqlite    threaded write/read mix on SQLite, default vs tuned pragmas
+
+Models are replaced by the stubs in benchmarks/stubs.py unless --real-models
+is given, so the numbers track our own code rather than model inference.
+
+Usage (from the repo root):
+    python -m benchmarks.run_benchmarks [--suites pipeline,symbols,api] [--out benchmarks/results]
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/baseline.json [--threshold 0.2]
+
+Exit status is 1 when --compare finds a timing more than --threshold slower
+(and at least --min-delta-ms slower in absolute terms).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.corpus import make_corpus
+
+SUITES = ("pipeline", "symbols", "api", "sqlite")
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def flatten_timings(results, prefix=""):
+    """{'a': {'b': {'median_ms': 1}}} -> {'a/b/median_ms': 1}; keeps only *_ms values."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}/{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_timings(value, path))
+        elif key.endswith("_ms") and isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float):
+    """Timings present in both runs that got slower by more than threshold (ratio) and min_delta_ms."""
+    cur = flatten_timings(current["results"])
+    base = flatten_timings(baseline["results"])
+    regressions = []
+    for path in sorted(cur.keys() & base.keys()):
+        old, new = base[path], cur[path]
+        # max_ms is a single outlier sample; compare the stable statistics only
+        if path.endswith("max_ms"):
+            continue
+        if old > 0 and new > old * (1 + threshold) and new - old >= min_delta_ms:
+            regressions.append({"metric": path, "baseline_ms": old, "current_ms": new, "ratio": round(new / old, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suites", default=",".join(SUITES), help="comma-separated subset of " + ", ".join(SUITES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", default="short,medium,long")
+    parser.add_argument("--symbols", type=int, default=2000, help="size of the synthetic symbol dictionary")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0, help="simulated latency per stub model call")
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results"))
+    parser.add_argument("--compare", help="earlier result JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown ratio, e.g. 0.2 = 20%%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    # must happen before the app / analyzer modules are imported
+    os.environ.setdefault("ANALYSIS_ASYNC", "0")
+    workdir = None
+    if not args.real_models:
+        from benchmarks.stubs import setup_stub_environment
+        workdir = setup_stub_environment(n_symbols=args.symbols, latency_ms=args.latency_ms)
+
+    corpus = make_corpus(seed=args.seed, sizes=args.sizes.split(","))
+    results = {}
+    for suite in suites:
+        print(f"[benchmarks] running {suite} ...", file=sys.stderr)
+        if suite == "pipeline":
+            from benchmarks.bench_pipeline import run_pipeline
+            results[suite] = run_pipeline(corpus, args.repeat)
+        elif suite == "symbols":
+            from benchmarks.bench_pipeline import run_symbols
+            results[suite] = run_symbols(corpus, args.repeat)
+        elif suite == "api":
+            from benchmarks.bench_api import run_api
+            results[suite] = run_api(args.clients, args.requests)
+        elif suite == "sqlite":
+            from benchmarks.bench_sqlite import run_sqlite
+            results[suite] = run_sqlite(readers=args.clients, ops=args.requests * 10)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "stub_models": not args.real_models,
+            "stub_latency_ms": args.latency_ms,
+            "workdir": workdir,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"bench-{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['git_revision']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[benchmarks] results written to {path}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s) vs {args.compare}:")
+            for r in regressions:
+                print(f"  {r['metric']}: {r['baseline_ms']:.3f} -> {r['current_ms']:.3f} ms ({r['ratio']:.2f}x)")
+            raise SystemExit(1)
+        print(f"No regressions vs {args.compare} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# benchmarks/stubs.py
+"""
+Lightweight stand-ins for the transformer / spaCy models, so benchmark numbers
+measure our own code. They are injected into utils.model_registry under the real
+keys, so every getter and micro-batcher uses them unchanged. `latency_ms` adds a
+fixed sleep per model call (sleep releases the GIL like torch does), to model
+inference cost without loading weights.
+"""
+import os
+import re
+import tempfile
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.corpus import OBJECTS, PLACES
+
+EMOTION_LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+_WORD = re.compile(r"\w+")
+_SENT = re.compile(r"[^.!?。！？]+[.!?。！？]*")
+
+
+def _pause(latency_ms):
+    if latency_ms:
+        time.sleep(latency_ms / 1000.0)
+
+
+def _seed(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class StubSummarizer:
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+
+    def __call__(self, texts, max_length=80, min_length=15, **kwargs):
+        _pause(self.latency_ms)
+        texts = [texts] if isinstance(texts, str) else texts
+        out = []
+        for t in texts:
+            words = t.split()
+            out.append({"summary_text": " ".join(words[:max(min_length, min(max_length, len(words)) // 2)])})
+        return out
+
+
+class StubEmotionPipeline:
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+
+    def _scores(self, text):
+        raw = np.random.default_rng(_seed(text)).random(len(EMOTION_LABELS))
+        raw /= raw.sum()
+        return [{"label": l, "score": float(s)} for l, s in zip(EMOTION_LABELS, raw)]
+
+    def __call__(self, texts, **kwargs):
+        _pause(self.latency_ms)
+        if isinstance(texts, str):
+            return [self._scores(texts)]
+        return [self._scores(t) for t in texts]
+
+
+class StubSentenceTransformer:
+    """Hashed bag-of-words embeddings: deterministic, and texts sharing words score higher."""
+    def __init__(self, dim: int = 384, latency_ms: float = 0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _embed(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for w in _WORD.findall(str(text).lower()):
+            vec[_seed(w) % self.dim] += 1.0
+        return vec
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        _pause(self.latency_ms)
+        if isinstance(texts, str):
+            return self._embed(texts)
+        return np.vstack([self._embed(t) for t in texts]) if len(texts) else np.zeros((0, self.dim), np.float32)
+
+
+class StubKeyBERT:
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+
+    def extract_keywords(self, text, top_n=5, **kwargs):
+        _pause(self.latency_ms)
+        counts = Counter(w for w in _WORD.findall(str(text).lower()) if len(w) > 3)
+        total = sum(counts.values()) or 1
+        return [(w, c / total) for w, c in counts.most_common(top_n)]
+
+
+class _Token:
+    def __init__(self, text, dep="", pos="NOUN"):
+        self.text = text
+        self.lemma_ = text.lower()
+        self.dep_ = dep
+        self.pos_ = pos
+        self.children = []
+
+
+class _Span(list):
+    @property
+    def text(self):
+        return " ".join(t.text for t in self)
+
+
+class _Ent:
+    def __init__(self, text, label):
+        self.text = text
+        self.label_ = label
+
+
+class _Doc:
+    def __init__(self, sents, ents):
+        self.sents = sents
+        self.ents = ents
+
+
+class StubNLP:
+    """Minimal spaCy-like parser: sentences, a subject-verb-object guess and capitalised-word entities."""
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+
+    def __call__(self, text):
+        _pause(self.latency_ms)
+        sents, ents = [], []
+        for raw in _SENT.findall(text):
+            words = _WORD.findall(raw)
+            if not words:
+                continue
+            tokens = [_Token(w) for w in words]
+            if len(tokens) > 1:
+                verb = tokens[1]
+                verb.dep_, verb.pos_ = "ROOT", "VERB"
+                tokens[0].dep_ = "nsubj"
+                verb.children.append(tokens[0])
+                if len(tokens) > 2:
+                    tokens[-1].dep_ = "dobj"
+                    verb.children.append(tokens[-1])
+            for t in tokens[1:]:
+                if t.text[:1].isupper():
+                    ents.append(_Ent(t.text, "GPE" if t.text == "Paris" else "PERSON"))
+            sents.append(_Span(tokens))
+        return _Doc(sents, ents)
+
+
+def install_stub_models(latency_ms: float = 0):
+    """Register stubs for every analysis model tier; returns the registry keys replaced."""
+    from utils.model_registry import set_model
+    from utils.ner_and_utils import MODEL_TIERS
+    stubs = {
+        "summary": StubSummarizer(latency_ms),
+        "emotion": StubEmotionPipeline(latency_ms),
+        "semantic": StubSentenceTransformer(latency_ms=latency_ms),
+        "keywords": StubKeyBERT(latency_ms),
+        "spacy": StubNLP(latency_ms),
+    }
+    for tier, model in stubs.items():
+        set_model(MODEL_TIERS[tier], model)
+    return [MODEL_TIERS[t] for t in stubs]
+
+
+def write_symbol_csv(path: str, n_symbols: int = 2000, seed: int = 0):
+    """Synthetic dream dictionary: the corpus vocabulary plus generated filler symbols."""
+    import csv
+    import random
+    rng = random.Random(seed)
+    words = sorted({w for phrase in OBJECTS + PLACES for w in _WORD.findall(phrase.lower()) if len(w) > 2})
+    words += ["shadow", "mirror", "water", "fire", "mask", "circle", "sun", "monster", "falling", "flying"]
+    words = list(dict.fromkeys(words))
+    while len(words) < n_symbols:
+        words.append(f"symbol{len(words):05d}")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Word", "Interpretation"])
+        for w in words[:n_symbols]:
+            other = rng.choice(words)
+            writer.writerow([w, f"To dream of {w} suggests {other} in your waking life. It may also point to change."])
+
+
+def setup_stub_environment(workdir: str = None, n_symbols: int = 2000, latency_ms: float = 0) -> str:
+    """
+    Point the app at throwaway databases and a synthetic symbol dictionary, and swap
+    in the stub models. Must run before utils.analyzer_upgraded or app is imported,
+    since they read their paths from the environment at import time. Returns workdir.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="dream-bench-")
+    csv_path = os.path.join(workdir, "symbols.csv")
+    write_symbol_csv(csv_path, n_symbols)
+    os.environ["SYMBOL_CSV_PATH"] = csv_path
+    os.environ["SYMBOL_INDEX_DIR"] = os.path.join(workdir, "symbol_index")
+    os.environ["DREAMS_DB"] = os.path.join(workdir, "dreams.db")
+    os.environ["ANALYSIS_QUEUE_DB"] = os.path.join(workdir, "analysis_jobs.db")
+    os.environ["RESULT_CACHE_DB"] = os.path.join(workdir, "analysis_cache.db")
+    # repeated timings of the same text would otherwise measure cache hits
+    os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+    install_stub_models(latency_ms)
+    return workdir
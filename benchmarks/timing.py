@@ -0,0 +1,37 @@
+# benchmarks/timing.py
+"""Timing and summary helpers shared by the benchmark suites."""
+import math
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100) of a non-empty list."""
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(q / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def summarize_ms(samples_s: List[float]) -> Dict[str, float]:
+    """min / median / p95 / max in milliseconds for a list of durations in seconds."""
+    ms = [s * 1000 for s in samples_s]
+    return {
+        "n": len(ms),
+        "min_ms": round(min(ms), 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Call fn() `warmup` times untimed, then `repeat` times; returns summarize_ms of the timed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize_ms(samples)
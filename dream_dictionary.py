@@ -1,8 +1,9 @@
 import pandas as pd
-import re
 import os
 import string
 
+from utils.symbol_matcher import SymbolMatcher
+
 # --- Load CSV dynamically relative to this file ---
 dict_path = r"C:\Users\amjad\Downloads\Research Papers 2025\Dream Journal\Datasets\cleaned_dream_interpretations.csv"
 
@@ -14,6 +15,20 @@ dream_dict_df = dream_dict_df.loc[:, ~dream_dict_df.columns.str.contains('^Unnam
 # Normalize column names
 dream_dict_df.columns = [c.strip().lower() for c in dream_dict_df.columns]
 
+# matcher compiled for the most recently used dictionary DataFrame
+_matcher_cache = {"df": None, "rows": 0, "matcher": None}
+
+def get_symbol_matcher(dream_dict_df):
+    """Build (once per DataFrame) a matcher over the punctuation-free symbols."""
+    cached = _matcher_cache
+    if cached["df"] is not dream_dict_df or cached["rows"] != len(dream_dict_df):
+        strip_punct = str.maketrans('', '', string.punctuation)
+        symbols = [str(w).lower().strip().translate(strip_punct) for w in dream_dict_df['word']]
+        cached["matcher"] = SymbolMatcher(symbols)
+        cached["df"] = dream_dict_df
+        cached["rows"] = len(dream_dict_df)
+    return cached["matcher"]
+
 def interpret_dream_text(text, dream_dict_df):
     """
     Return a list of symbols found in `text` with their meanings from the CSV.
@@ -24,14 +39,10 @@ def interpret_dream_text(text, dream_dict_df):
     text_lower = text.lower()
     text_lower = text_lower.translate(str.maketrans('', '', string.punctuation))
 
-    for _, row in dream_dict_df.iterrows():
+    for idx in get_symbol_matcher(dream_dict_df).find(text_lower):
+        row = dream_dict_df.iloc[idx]
         symbol = str(row['word']).lower().strip()
         meaning = str(row['interpretation']).strip()
-
-        # Normalize symbol
-        symbol_clean = symbol.translate(str.maketrans('', '', string.punctuation))
-
-        if re.search(rf'\b{re.escape(symbol_clean)}\b', text_lower):
-            interpretations.append({"symbol": symbol, "meaning": meaning})
+        interpretations.append({"symbol": symbol, "meaning": meaning})
 
     return interpretations
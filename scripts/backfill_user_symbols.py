@@ -0,0 +1,48 @@
+# scripts/backfill_user_symbols.py
+"""
+Rebuild the user_symbol table (per-user symbol counts and last-seen dates used for
+recurring symbols) from the symbols stored on every dream. Safe to re-run: each
+user's rows are replaced in one transaction.
+
+    python scripts/backfill_user_symbols.py [--user-id N]
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from app import app, db, Dream, DreamAnalysis, User, UserSymbol, symbol_names
+from utils.analysis_store import parse_symbol_index
+
+
+def backfill_user(user_id):
+    counts, last_seen = {}, {}
+    rows = (db.session.query(Dream.date, Dream.symbols, DreamAnalysis.symbol_index)
+            .outerjoin(DreamAnalysis, DreamAnalysis.dream_id == Dream.id)
+            .filter(Dream.user_id == user_id).yield_per(500))
+    for date, symbols, indexed in rows:
+        names = set(parse_symbol_index(indexed)) if indexed is not None else symbol_names(symbols)
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+            if date is not None and (last_seen.get(name) is None or date > last_seen[name]):
+                last_seen[name] = date
+    UserSymbol.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(UserSymbol, [
+        {"user_id": user_id, "symbol": name, "count": n, "last_seen": last_seen.get(name)}
+        for name, n in counts.items()
+    ])
+    db.session.commit()
+    return len(counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user-id", type=int, help="only rebuild this user's history")
+    args = parser.parse_args()
+
+    with app.app_context():
+        user_ids = [args.user_id] if args.user_id else [u.id for u in User.query.order_by(User.id)]
+        total = 0
+        for uid in user_ids:
+            total += backfill_user(uid)
+        print(f"Rebuilt symbol history for {len(user_ids)} users ({total} user/symbol rows).")
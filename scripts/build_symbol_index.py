@@ -1,10 +1,25 @@
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from utils.symbol_index import load_symbol_csv, build_symbol_index
+import argparse
+
+from utils.symbol_index import update_symbol_index
 
 CSV = r"C:\Users\amjad\Downloads\Research Papers 2025\Dream Journal\Datasets\cleaned_dream_interpretations.csv"
 
-df = load_symbol_csv(CSV)
-build_symbol_index(df, persist_dir="models/symbol_index")
-print("Symbol index built.")
+parser = argparse.ArgumentParser(description="Build or refresh the symbol index from the dictionary CSV.")
+parser.add_argument("--csv", default=os.environ.get("SYMBOL_CSV_PATH") or CSV)
+parser.add_argument("--dir", default=os.environ.get("SYMBOL_INDEX_DIR", "models/symbol_index"))
+mode = parser.add_mutually_exclusive_group()
+mode.add_argument("--incremental", action="store_true",
+                  help="re-encode only new or changed rows (default)")
+mode.add_argument("--force", action="store_true",
+                  help="re-encode every row even if the CSV and model are unchanged")
+args = parser.parse_args()
+
+stats = update_symbol_index(args.csv, persist_dir=args.dir, force=args.force)
+if stats["status"] == "up-to-date":
+    print(f"Symbol index up to date ({stats['rows']} rows); nothing re-encoded.")
+else:
+    print(f"Symbol index built: {stats['rows']} rows, {stats['encoded']} re-encoded, "
+          f"{stats['reused']} reused, {stats['dropped']} dropped.")
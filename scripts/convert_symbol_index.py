@@ -0,0 +1,29 @@
+# scripts/convert_symbol_index.py
+"""
+Convert a legacy models/symbol_index/symbol_index.joblib into the memory-mapped
+format (manifest.json + embeddings.npy + offset-indexed text columns).
+
+    python scripts/convert_symbol_index.py [--dir models/symbol_index] [--csv path/to/cleaned_dream_interpretations.csv]
+
+--csv records the dictionary's content hash in the manifest; --model records the
+SBERT model the embeddings were built with (defaults to $SBERT_MODEL).
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+
+from utils.symbol_index import convert_legacy_index, LEGACY_FILE
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--dir", default="models/symbol_index")
+parser.add_argument("--csv", default=None)
+parser.add_argument("--model", default=None)
+args = parser.parse_args()
+
+if not os.path.exists(os.path.join(args.dir, LEGACY_FILE)):
+    sys.exit(f"No {LEGACY_FILE} in {args.dir}")
+
+manifest = convert_legacy_index(args.dir, csv_path=args.csv, model_name=args.model)
+print(f"Converted {manifest['count']} symbols ({manifest['dim']}-d, model {manifest['model']}).")
+print(f"{LEGACY_FILE} is no longer read and can be deleted.")
@@ -0,0 +1,55 @@
+# scripts/migrate.py
+"""
+Bring the dreams database up to the current schema (migrations in utils/migrations.py).
+Safe to interrupt and re-run: finished migrations are recorded in schema_version
+and data backfills resume from their last committed chunk. The app can keep
+serving while it runs.
+
+    python scripts/migrate.py                 apply everything pending
+    python scripts/migrate.py --status        list migrations and their state
+    python scripts/migrate.py --target 3      stop after version 3
+    python scripts/migrate.py --stamp         mark all as applied without running them
+
+Backfill pacing: --chunk-size rows per transaction (halved while a chunk holds the
+write lock longer than --max-chunk-ms), --sleep seconds between chunks.
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from utils.migrations import MigrationRunner
+
+DEFAULT_DB = os.environ.get("DREAMS_DB") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dreams.db")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--target", type=int, help="highest version to apply")
+    parser.add_argument("--stamp", action="store_true", help="record migrations as applied without running them")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--sleep", type=float, default=0.05, help="pause between backfill chunks (seconds)")
+    parser.add_argument("--max-chunk-ms", type=float, default=200.0)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return freed pages to the OS")
+    args = parser.parse_args()
+
+    runner = MigrationRunner(args.db)
+    try:
+        if args.status:
+            for m in runner.status():
+                extra = f"  ({m['backfill_rows']} rows, cursor {m['backfill_cursor']})" if m["backfill_rows"] else ""
+                print(f"{m['version']:03d}  {m['name']:<24} {m['state']}{extra}")
+        elif args.stamp:
+            runner.stamp(args.target)
+            print("Migrations stamped as applied.")
+        else:
+            n = runner.migrate(args.target, args.chunk_size, args.sleep, args.max_chunk_ms)
+            print(f"Migration completed: {n} migration(s) applied.")
+            if args.vacuum:
+                runner.conn.execute("VACUUM")
+                print("Database vacuumed.")
+    finally:
+        runner.close()
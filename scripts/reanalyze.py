@@ -0,0 +1,55 @@
+# scripts/reanalyze.py
+"""
+Bring stored analyses up to the current analyzer. Dreams from an older
+ANALYSIS_VERSION are analysed in full; otherwise only the stages whose
+STAGE_VERSIONS entry changed (and their dependants) are re-run. Progress is
+checkpointed in the database after every batch, so the command can be stopped
+and restarted at any time; a changed version map starts a new pass.
+
+    python scripts/reanalyze.py                 one pass over the stale dreams, then exit
+    python scripts/reanalyze.py --loop          keep running as a background worker
+    python scripts/reanalyze.py --status        checkpoint and stale-dream count
+
+--cpu-budget caps the average share of the machine's cores the backfill uses
+(REANALYSIS_CPU_BUDGET); metrics appear under reanalysis_* on /metrics.
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from app import (app, db, reanalysis_step, reanalysis_target, stale_dreams, ReanalysisCheckpoint,
+                 REANALYSIS_CHECKPOINT)
+from utils.reanalysis import (run_backfill, REANALYSIS_BATCH_SIZE, REANALYSIS_CONCURRENCY, REANALYSIS_CPU_BUDGET,
+                              REANALYSIS_POLL_INTERVAL)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loop", action="store_true", help="keep polling for stale dreams")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=REANALYSIS_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=REANALYSIS_CONCURRENCY)
+    parser.add_argument("--cpu-budget", type=float, default=REANALYSIS_CPU_BUDGET, help="share of all cores, e.g. 0.5")
+    parser.add_argument("--poll-interval", type=float, default=REANALYSIS_POLL_INTERVAL)
+    parser.add_argument("--max-batches", type=int, help="stop after this many batches")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.status:
+            ckpt = db.session.get(ReanalysisCheckpoint, REANALYSIS_CHECKPOINT)
+            print(f"target:  {reanalysis_target()}")
+            print(f"stale:   {stale_dreams().count()} dreams")
+            if ckpt is not None:
+                print(f"pass:    {ckpt.processed} upgraded, {ckpt.failed} failed, {ckpt.remaining} left "
+                      f"(cursor {ckpt.cursor}, {ckpt.dreams_per_second} dreams/s, {ckpt.updated_at})")
+                if ckpt.stage_runs:
+                    print(f"stages:  {ckpt.stage_runs}")
+            sys.exit(0)
+
+        try:
+            n = run_backfill(lambda: reanalysis_step(args.batch_size, args.concurrency), cpu_budget=args.cpu_budget,
+                             loop=args.loop, poll_interval=args.poll_interval, max_batches=args.max_batches)
+        except KeyboardInterrupt:
+            print("Stopping re-analysis (progress is checkpointed).")
+        else:
+            print(f"Re-analysis completed: {n} dreams upgraded.")
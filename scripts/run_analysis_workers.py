@@ -0,0 +1,27 @@
+# scripts/run_analysis_workers.py
+"""
+Run the /add_dream analysis worker pool as its own process, separately from the
+web server (e.g. next to gunicorn). Jobs live in the SQLite queue, so workers can
+be stopped and restarted at any time.
+
+    python scripts/run_analysis_workers.py [--workers 2]
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from app import run_analysis_workers, ANALYSIS_WORKERS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=ANALYSIS_WORKERS)
+    args = parser.parse_args()
+
+    procs = run_analysis_workers(args.workers)
+    print(f"Started {len(procs)} analysis workers.")
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        print("Stopping analysis workers.")
@@ -0,0 +1,216 @@
+# utils/analysis_store.py
+"""
+Compact storage format for a dream's analysis: one binary blob per dream instead
+of a JSON text column per field.
+
+Layout:  b"DA" | format version (1 byte) | codec (1 byte) | header length (4 bytes, big endian)
+         | header (JSON: section -> [offset, length, compressed]) | section bodies
+
+Every section is serialized and compressed on its own, so readers decode only the
+sections they ask for. Sentences quoted from the dream (emotional arc, events,
+cause/effect) are stored as [start, end] offsets into the dream's content.
+
+msgpack + zstandard are used when both are installed, json + zlib otherwise; the
+codec is recorded in the blob, so either kind can be read back.
+"""
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import msgpack
+    import zstandard
+except ImportError:
+    msgpack = zstandard = None
+
+# "auto" (msgpack-zstd when available), "msgpack-zstd" or "json-zlib"
+ANALYSIS_CODEC = os.environ.get("ANALYSIS_CODEC", "auto")
+ANALYSIS_COMPRESS_LEVEL = int(os.environ.get("ANALYSIS_COMPRESS_LEVEL", "6"))
+# sections smaller than this are stored uncompressed (compression would only add framing)
+MIN_COMPRESS_BYTES = 64
+
+MAGIC = b"DA"
+FORMAT_VERSION = 1
+CODEC_JSON_ZLIB = 1
+CODEC_MSGPACK_ZSTD = 2
+CODEC_NAMES = {CODEC_JSON_ZLIB: "json-zlib", CODEC_MSGPACK_ZSTD: "msgpack-zstd"}
+_PREFIX = struct.Struct(">2sBBI")
+
+# analysis fields kept in the blob (everything else stays a Dream column)
+ANALYSIS_SECTIONS = (
+    "themes", "symbols", "combined_insights", "psychological_interpretation",
+    "events", "entities", "people", "locations", "objects", "cause_effect",
+    "conflicts", "desires", "emotional_arc", "narrative",
+)
+# sections holding sentences quoted from the content, stored as offsets
+SENTENCE_SECTIONS = ("events", "cause_effect", "emotional_arc")
+
+
+def default_codec() -> int:
+    if ANALYSIS_CODEC == "json-zlib":
+        return CODEC_JSON_ZLIB
+    if msgpack is not None and zstandard is not None:
+        return CODEC_MSGPACK_ZSTD
+    if ANALYSIS_CODEC == "msgpack-zstd":
+        print("[analysis_store] msgpack/zstandard not installed, falling back to json-zlib")
+    return CODEC_JSON_ZLIB
+
+
+def _dumps(codec: int, value: Any) -> bytes:
+    if codec == CODEC_MSGPACK_ZSTD:
+        return msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(codec: int, data: bytes) -> Any:
+    if codec == CODEC_MSGPACK_ZSTD:
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_MSGPACK_ZSTD:
+        return zstandard.ZstdCompressor(level=ANALYSIS_COMPRESS_LEVEL).compress(data)
+    return zlib.compress(data, ANALYSIS_COMPRESS_LEVEL)
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_MSGPACK_ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+# ---------- sentence references ----------
+def _to_refs(items: List[Any], content: str) -> List[Any]:
+    """Replace each item's "sentence" with "sentence_ref": [start, end] where it occurs in content."""
+    out, cursor = [], 0
+    for item in items:
+        sentence = item.get("sentence") if isinstance(item, dict) else None
+        if sentence:
+            start = content.find(sentence, cursor)
+            if start < 0:
+                start = content.find(sentence)
+            if start >= 0:
+                cursor = start + len(sentence)
+                item = {k: v for k, v in item.items() if k != "sentence"}
+                item["sentence_ref"] = [start, cursor]
+        out.append(item)
+    return out
+
+
+def _from_refs(items: List[Any], content: str) -> List[Any]:
+    out = []
+    for item in items:
+        if isinstance(item, dict) and "sentence_ref" in item:
+            start, end = item["sentence_ref"]
+            item = {k: v for k, v in item.items() if k != "sentence_ref"}
+            item["sentence"] = content[start:end]
+        out.append(item)
+    return out
+
+
+def _pack_section(name: str, value: Any, content: str) -> Any:
+    if not content or name not in SENTENCE_SECTIONS:
+        return value
+    if name == "emotional_arc" and isinstance(value, dict) and isinstance(value.get("arc"), list):
+        return {**value, "arc": _to_refs(value["arc"], content)}
+    if isinstance(value, list):
+        return _to_refs(value, content)
+    return value
+
+
+def _unpack_section(name: str, value: Any, content: str) -> Any:
+    if name not in SENTENCE_SECTIONS:
+        return value
+    content = content or ""
+    if name == "emotional_arc" and isinstance(value, dict) and isinstance(value.get("arc"), list):
+        return {**value, "arc": _from_refs(value["arc"], content)}
+    if isinstance(value, list):
+        return _from_refs(value, content)
+    return value
+
+
+# ---------- blob encoding ----------
+def encode_analysis(sections: Dict[str, Any], content: str = "", codec: Optional[int] = None) -> bytes:
+    """Serialize analysis sections (section name -> JSON-compatible value) into one blob."""
+    codec = codec or default_codec()
+    header, bodies, offset = {}, [], 0
+    for name, value in sections.items():
+        body = _dumps(codec, _pack_section(name, value, content))
+        compressed = len(body) >= MIN_COMPRESS_BYTES
+        if compressed:
+            body = _compress(codec, body)
+        header[name] = [offset, len(body), int(compressed)]
+        bodies.append(body)
+        offset += len(body)
+    head = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return _PREFIX.pack(MAGIC, FORMAT_VERSION, codec, len(head)) + head + b"".join(bodies)
+
+
+class AnalysisBlob:
+    """
+    Read view over an encoded blob. Only the header is parsed up front; each
+    section is decompressed and decoded on first access and then memoized.
+    """
+
+    def __init__(self, blob: bytes, content: str = ""):
+        magic, version, codec, head_len = _PREFIX.unpack_from(blob)
+        if magic != MAGIC or version != FORMAT_VERSION or codec not in CODEC_NAMES:
+            raise ValueError("Not an analysis blob")
+        if codec == CODEC_MSGPACK_ZSTD and (msgpack is None or zstandard is None):
+            raise ValueError("msgpack and zstandard are required to read this analysis blob")
+        start = _PREFIX.size
+        self.codec = codec
+        self.content = content
+        self.header = json.loads(blob[start:start + head_len])
+        self._body = memoryview(blob)[start + head_len:]
+        self._decoded: Dict[str, Any] = {}
+
+    @property
+    def codec_name(self) -> str:
+        return CODEC_NAMES[self.codec]
+
+    def sections(self) -> List[str]:
+        return list(self.header)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.header
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in self._decoded:
+            return self._decoded[name]
+        if name not in self.header:
+            return default
+        offset, length, compressed = self.header[name]
+        data = bytes(self._body[offset:offset + length])
+        if compressed:
+            data = _decompress(self.codec, data)
+        value = _unpack_section(name, _loads(self.codec, data), self.content)
+        self._decoded[name] = value
+        return value
+
+    def to_dict(self, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        return {name: self.get(name) for name in (names or self.header) if name in self.header}
+
+
+def decode_sections(blob: bytes, names: Iterable[str], content: str = "") -> Dict[str, Any]:
+    """The requested sections of a blob (sections it does not hold are left out)."""
+    return AnalysisBlob(blob, content).to_dict(names)
+
+
+# ---------- symbol index ----------
+# symbol names in rank order as "\nmoon\nsnake\n": list views and "which dreams
+# contain X" lookups read this plain column instead of decoding blobs
+def symbol_index(symbols: Iterable[Any]) -> str:
+    names = []
+    for s in symbols or []:
+        name = s.get("symbol") if isinstance(s, dict) else s
+        if name and name not in names:
+            names.append(str(name).replace("\n", " "))
+    return "\n" + "\n".join(names) + "\n" if names else ""
+
+
+def parse_symbol_index(value: Optional[str]) -> List[str]:
+    return [name for name in (value or "").split("\n") if name]
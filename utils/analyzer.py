@@ -1,5 +1,3 @@
-from transformers import pipeline
-from keybert import KeyBERT
 import pandas as pd
 import re
 import string
@@ -7,35 +5,31 @@ from itertools import combinations
 import random
 import traceback
 
+from utils.symbol_matcher import SymbolMatcher
+from utils.ner_and_utils import get_summarizer, get_emotion_pipeline, get_keybert
+
 # --- Load dream dictionary ---
 dict_path = r"C:\Users\amjad\Downloads\Research Papers 2025\Dream Journal\Datasets\cleaned_dream_interpretations.csv"
 dream_dict_df = pd.read_csv(dict_path)
 # drop unnamed columns, normalize column names
 dream_dict_df = dream_dict_df.loc[:, ~dream_dict_df.columns.str.contains('^Unnamed|^$', case=False)]
 dream_dict_df.columns = [c.strip().lower() for c in dream_dict_df.columns]
+# whole-word symbol matcher built once from the dictionary
+_dict_words = dream_dict_df['word'] if 'word' in dream_dict_df.columns else [''] * len(dream_dict_df)
+symbol_matcher = SymbolMatcher([str(w).lower().strip() or None for w in _dict_words])
+
+# --- NLP models (shared process-wide with analyzer_upgraded via the model registry) ---
+summarizer = get_summarizer()
+if summarizer is None:
+    print("[analyzer] Summarizer load failed")
 
-# --- Initialize NLP models (loaded once) ---
-try:
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-except Exception as e:
-    print("[analyzer] Summarizer load failed:", e)
-    summarizer = None
-
-try:
-    emotion_classifier = pipeline(
-        "text-classification",
-        model="j-hartmann/emotion-english-distilroberta-base",
-        return_all_scores=True
-    )
-except Exception as e:
-    print("[analyzer] Emotion classifier load failed:", e)
-    emotion_classifier = None
-
-try:
-    kw_model = KeyBERT()
-except Exception as e:
-    print("[analyzer] KeyBERT load failed:", e)
-    kw_model = None
+emotion_classifier = get_emotion_pipeline()
+if emotion_classifier is None:
+    print("[analyzer] Emotion classifier load failed")
+
+kw_model = get_keybert()
+if kw_model is None:
+    print("[analyzer] KeyBERT load failed")
 
 # -------------------------
 # Helper utilities
@@ -113,20 +107,16 @@ def interpret_symbols(text):
         # remove punctuation but keep hyphens (some entries might contain hyphenated symbols)
         translator = str.maketrans('', '', string.punctuation.replace('-', ''))
         text_clean = str(text).lower().translate(translator)
-        # iterate dictionary rows defensively
-        for _, row in dream_dict_df.iterrows():
+        # single pass over the text; boundary match avoids partial matches (e.g., 'day' inside 'yesterday')
+        for idx in symbol_matcher.find(text_clean):
+            row = dream_dict_df.iloc[idx]
             symbol = str(row.get('word', '')).lower().strip()
             meaning_raw = str(row.get('interpretation', '')).strip()
-            if not symbol:
-                continue
-            # boundary match to avoid partial matches (e.g., 'day' inside 'yesterday')
-            pattern = r'\b' + re.escape(symbol) + r'\b'
-            if re.search(pattern, text_clean):
-                meaning_short = safe_first_sentence(meaning_raw)
-                # if nothing found use full cleaned meaning_raw
-                if not meaning_short and meaning_raw:
-                    meaning_short = " ".join(meaning_raw.split())[:220] + ("..." if len(meaning_raw) > 220 else "")
-                matches.append({"symbol": symbol, "meaning": meaning_short})
+            meaning_short = safe_first_sentence(meaning_raw)
+            # if nothing found use full cleaned meaning_raw
+            if not meaning_short and meaning_raw:
+                meaning_short = " ".join(meaning_raw.split())[:220] + ("..." if len(meaning_raw) > 220 else "")
+            matches.append({"symbol": symbol, "meaning": meaning_short})
         return matches
     except Exception as e:
         print("[analyzer] interpret_symbols error:", e)
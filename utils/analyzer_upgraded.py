@@ -2,83 +2,153 @@
 import os
 import re
 import string
-import traceback
-import json
+import time
 from typing import List, Dict, Any
 
-import numpy as np
-
-from utils.symbol_index import ensure_index, load_symbol_index
+from utils.symbol_index import SymbolIndexHolder
+from utils.pipeline import Stage, StageGraph, topological_order
+from utils.profiling import sampled_profile
+from utils.metrics import histogram
+from utils.result_cache import ResultCache, RESULT_CACHE_ENABLED, cache_key
 from utils.ner_and_utils import (
     safe_first_sentence,
     chunked_summarize,
-    detect_emotion_text,
+    summarize_many,
+    detect_emotion_batch,
     extract_keywords,
-    extract_entities,
+    extract_keywords_batch,
+    encode_texts,
     get_sbert,
     get_spacy,
+    get_summarizer,
+    get_emotion_pipeline,
+    get_keybert,
+    degraded_tiers,
+    MODEL_TIERS,
 )
 
 # CONFIG - update path if required
 SYMBOL_CSV_PATH = os.environ.get("SYMBOL_CSV_PATH") or r"C:\Users\amjad\Downloads\Research Papers 2025\Dream Journal\Datasets\cleaned_dream_interpretations.csv"
 PERSIST_DIR = os.environ.get("SYMBOL_INDEX_DIR", "models/symbol_index")
 
-# load symbol index (fast if already built)
-try:
-    SYMBOL_DF, SYMBOL_EMB, SYMBOL_NN = ensure_index(SYMBOL_CSV_PATH, PERSIST_DIR)
-except Exception as e:
-    SYMBOL_DF, SYMBOL_EMB, SYMBOL_NN = None, None, None
-    print("[analyzer_upgraded] symbol index not loaded at import:", e)
-
-SBERT = get_sbert()
-SPACY_NLP = get_spacy()
+# versioned symbol index; loaded on first use, reload() swaps it atomically while
+# requests are in flight. Models come from the shared registry, also on first use.
+SYMBOL_INDEX_HOLDER = SymbolIndexHolder(SYMBOL_CSV_PATH, PERSIST_DIR)
+
+ANALYSIS_SECONDS = histogram("analysis_total_seconds", "End-to-end analyze_dream wall time")
+
+ANALYSIS_VERSION = "analyzer_upgraded_v2"
+# Bump a stage's entry when its output changes; the re-analysis backfill then re-runs
+# that stage and everything downstream of it on stored dreams (see reanalyze_dream).
+# Bump ANALYSIS_VERSION instead for changes that need a full re-analysis.
+STAGE_VERSIONS = {
+    "summary": 1,
+    "emotion": 1,
+    "themes": 1,
+    "parse": 1,
+    "entities": 1,
+    "people_locations_objects": 1,
+    "events": 1,
+    "cause_effect": 1,
+    "conflicts_desires": 1,
+    "emotional_arc": 1,
+    "narrative": 1,
+    "semantic_symbols": 1,
+    "exact_symbols": 1,
+    "rank_symbols": 1,
+    "combined_insights": 1,
+    "archetype": 1,
+}
+# version assumed for stages missing from a stored map (analyses predating STAGE_VERSIONS)
+BASELINE_STAGE_VERSION = 1
+# results keyed on normalised text + analyzer / stage / model / symbol-index versions;
+# recurring_symbols depends on the user's history and is recomputed on every hit
+RESULT_CACHE = ResultCache() if RESULT_CACHE_ENABLED else None
+
+def analysis_cache_key(text: str, symbol_index_version=None) -> str:
+    return cache_key(text, analyzer=ANALYSIS_VERSION, stages=STAGE_VERSIONS, models=sorted(MODEL_TIERS.values()),
+                     symbol_index=symbol_index_version)
+
+def warmup() -> Dict[str, Any]:
+    """
+    Load every model and the symbol index now instead of on the first request.
+    Call after boot, or after fork in each worker. Returns per-component status and seconds.
+    """
+    steps = [
+        ("symbol_index", lambda: SYMBOL_INDEX_HOLDER.current()),
+        ("symbol_matcher", lambda: SYMBOL_INDEX_HOLDER.current().matcher),
+        ("sbert", get_sbert),
+        ("spacy", get_spacy),
+        ("summarizer", get_summarizer),
+        ("emotion", get_emotion_pipeline),
+        ("keybert", get_keybert),
+    ]
+    report = {}
+    for name, step in steps:
+        t0 = time.perf_counter()
+        try:
+            ok = step() is not None
+        except Exception as e:
+            print(f"[analyzer_upgraded] warmup {name} failed:", e)
+            ok = False
+        report[name] = {"ok": ok, "seconds": round(time.perf_counter() - t0, 3)}
+    return report
 
 # ---------- symbol matching (same as you had) ----------
-def exact_match_symbols(text: str) -> List[Dict[str,Any]]:
+def exact_match_symbols(text: str, snapshot=None) -> List[Dict[str,Any]]:
     translator = str.maketrans('', '', string.punctuation.replace('-', ''))
     text_clean = str(text).lower().translate(translator)
     matches = []
-    if SYMBOL_DF is None:
+    snapshot = snapshot or SYMBOL_INDEX_HOLDER.current()
+    if snapshot is None:
         return matches
-    for _, row in SYMBOL_DF.iterrows():
-        symbol = row['word_clean']
-        if not symbol:
-            continue
-        patterns = [rf'\b{re.escape(symbol)}\b']
-        if not symbol.endswith('s'):
-            patterns.append(rf'\b{re.escape(symbol)}s\b')
-        for p in patterns:
-            if re.search(p, text_clean):
-                # mark exact matches with a high semantic_score so they rank highly
-                matches.append({
-                    "symbol": symbol,
-                    "meaning": row.get('interp_first', ''),
-                    "match_type": "exact",
-                    "semantic_score": 0.95
-                })
-                break
+    table = snapshot.table
+    for idx in snapshot.matcher.find(text_clean):
+        # mark exact matches with a high semantic_score so they rank highly
+        matches.append({
+            "symbol": table.word(idx),
+            "meaning": table.meaning(idx),
+            "match_type": "exact",
+            "semantic_score": 0.95
+        })
     return matches
 
-def semantic_match_symbols(text: str, top_k=12, score_threshold=0.40) -> List[Dict[str,Any]]:
-    if SYMBOL_DF is None or SYMBOL_NN is None or SBERT is None:
-        return []
-    txt = " ".join(str(text).split()).lower()
-    emb = SBERT.encode(txt, convert_to_numpy=True)
-    distances, idxs = SYMBOL_NN.kneighbors([emb], n_neighbors=min(top_k, len(SYMBOL_EMB)), return_distance=True)
+def _semantic_rows(table, scores, idxs) -> List[Dict[str,Any]]:
     results = []
-    for dist, idx in zip(distances[0], idxs[0]):
-        score = float(1 - dist)
-        if score < score_threshold:
-            continue
-        row = SYMBOL_DF.iloc[idx]
+    for score, idx in zip(scores, idxs):
         results.append({
-            "symbol": row['word_clean'],
-            "meaning": row.get('interp_first', ''),
-            "semantic_score": score,
+            "symbol": table.word(int(idx)),
+            "meaning": table.meaning(int(idx)),
+            "semantic_score": float(score),
             "match_type": "semantic"
         })
     return results
 
+def semantic_match_symbols(text: str, top_k=12, score_threshold=0.40, snapshot=None) -> List[Dict[str,Any]]:
+    snapshot = snapshot or SYMBOL_INDEX_HOLDER.current()
+    if snapshot is None:
+        return []
+    txt = " ".join(str(text).split()).lower()
+    embs = encode_texts([txt])
+    if embs is None:
+        return []
+    emb = embs[0]
+    # threshold is applied on the score vector before any symbol text is read
+    scores, idxs = snapshot.index.search(emb, top_k=top_k, score_threshold=score_threshold)
+    return _semantic_rows(snapshot.table, scores, idxs)
+
+def semantic_match_symbols_batch(texts: List[str], top_k=12, score_threshold=0.40, snapshot=None) -> List[List[Dict[str,Any]]]:
+    """semantic_match_symbols for many texts: one encode call and one similarity matmul."""
+    snapshot = snapshot or SYMBOL_INDEX_HOLDER.current()
+    if not texts:
+        return []
+    txts = [" ".join(str(t).split()).lower() for t in texts]
+    embs = encode_texts(txts) if snapshot is not None else None
+    if embs is None:
+        return [[] for _ in texts]
+    hits = snapshot.index.search_batch(embs, top_k=top_k, score_threshold=score_threshold)
+    return [_semantic_rows(snapshot.table, scores, idxs) for scores, idxs in hits]
+
 def rank_symbols(text: str, matches: List[Dict[str,Any]]) -> List[Dict[str,Any]]:
     text_lower = str(text).lower()
     ranked = []
@@ -119,22 +189,65 @@ def bucket_symbols_by_weight(ranked_symbols: List[Dict[str,Any]]) -> (List[Dict[
             noise.append(s)
     return primary, secondary, noise
 
-# ---------- event extraction / entities / narrative ----------
-def extract_entities_structured(text: str) -> Dict[str, List[Dict[str,str]]]:
-    nlp = SPACY_NLP
+# ---------- shared per-call analysis context ----------
+def split_sentences(text: str) -> List[str]:
+    """Punctuation-based sentence split used by the emotional arc."""
+    return [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
+
+class AnalysisContext:
+    """
+    Holds state shared by the extractors for a single analyze_dream call.
+    The spaCy parse (sentences, entities, dependency tree) is computed lazily
+    on first access and then reused, so the text is parsed at most once.
+    """
+    def __init__(self, text: str, nlp=None):
+        self.text = text
+        self._nlp = nlp
+        self._doc = None
+        self._parsed = False
+        self._sentences = None
+
+    @property
+    def sentences(self) -> List[str]:
+        if self._sentences is None:
+            self._sentences = split_sentences(self.text)
+        return self._sentences
+
+    @property
+    def nlp(self):
+        return self._nlp if self._nlp is not None else get_spacy()
+
+    @property
+    def doc(self):
+        if not self._parsed:
+            self._parsed = True
+            nlp = self.nlp
+            self._doc = nlp(self.text) if nlp else None
+        return self._doc
+
+def _resolve_doc(text: str, doc=None):
+    """Return the supplied spaCy Doc, or parse `text` when called standalone."""
+    if doc is not None:
+        return doc
+    nlp = get_spacy()
     if not nlp:
+        return None
+    return nlp(text)
+
+# ---------- event extraction / entities / narrative ----------
+def extract_entities_structured(text: str, doc=None) -> Dict[str, List[Dict[str,str]]]:
+    doc = _resolve_doc(text, doc)
+    if doc is None:
         return {"entities": []}
-    doc = nlp(text)
     entities = []
     for ent in doc.ents:
         entities.append({"text": ent.text, "label": ent.label_})
     return {"entities": entities}
 
-def extract_people_locations_objects(text: str) -> Dict[str, List[str]]:
-    nlp = SPACY_NLP
-    if not nlp:
+def extract_people_locations_objects(text: str, doc=None) -> Dict[str, List[str]]:
+    doc = _resolve_doc(text, doc)
+    if doc is None:
         return {"people": [], "locations": [], "objects": []}
-    doc = nlp(text)
     people, locations, objects = [], [], []
     for ent in doc.ents:
         lab = ent.label_
@@ -156,12 +269,11 @@ def extract_people_locations_objects(text: str) -> Dict[str, List[str]]:
         return out
     return {"people": unique(people), "locations": unique(locations), "objects": unique(objects)}
 
-def extract_events(text: str) -> List[Dict[str,str]]:
+def extract_events(text: str, doc=None) -> List[Dict[str,str]]:
     """Rule-based extraction of simple SVO events from sentences using spaCy dependency parse."""
-    nlp = SPACY_NLP
-    if not nlp:
+    doc = _resolve_doc(text, doc)
+    if doc is None:
         return []
-    doc = nlp(text)
     events = []
     for sent in doc.sents:
         subject = None
@@ -224,16 +336,18 @@ def detect_conflicts_and_desires(text: str) -> Dict[str, List[str]]:
             desires.append(kw)
     return {"conflicts": list(set(conflicts)), "desires": list(set(desires))}
 
-def emotional_arc(text: str) -> Dict[str, Any]:
-    """Split into sentences and get emotion per sentence to form a simple arc."""
+def emotional_arc(text: str, sentence_emotions: List[Dict[str,Any]] = None) -> Dict[str, Any]:
+    """
+    Split into sentences and get emotion per sentence to form a simple arc.
+    All sentences are classified in one batched call unless `sentence_emotions`
+    (one result per split_sentences(text) entry) is supplied by the caller.
+    """
     try:
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        sentences = split_sentences(text)
+        if sentence_emotions is None or len(sentence_emotions) != len(sentences):
+            sentence_emotions = detect_emotion_batch(sentences)
         arc = []
-        for s in sentences:
-            s_clean = s.strip()
-            if not s_clean:
-                continue
-            emo = detect_emotion_text(s_clean)
+        for s_clean, emo in zip(sentences, sentence_emotions):
             arc.append({"sentence": s_clean, "dominant": emo.get("dominant"), "scores": emo.get("scores")})
         # summarize trend: count of negative vs positive labels
         neg = sum(1 for a in arc if a["dominant"].lower() in ("fear","anger","sadness","disgust"))
@@ -286,10 +400,164 @@ def combined_insights_from_symbols(symbols, dominant_emotion=None):
     insight_text = " ".join([sentence1, sentence2, sentence3])
     return [{"symbols": syms, "insight": insight_text}]
 
+# ---------- analysis stages ----------
+ARCHETYPE_MAP = {
+    "shadow": ["snake","darkness","monster","mirror"],
+    "anima": ["woman","water","moon","emotion"],
+    "animus": ["man","fire","war","control"],
+    "self": ["circle","mandala","sun","unity"],
+    "persona": ["mask","clothes","actor","crowd"]
+}
+
+def merge_symbol_matches(sem: List[Dict[str,Any]], exacts: List[Dict[str,Any]]) -> List[Dict[str,Any]]:
+    """Union of semantic + exact matches keyed by symbol; exact hits boost the semantic score."""
+    merged = {s['symbol']: s for s in sem}
+    for e in exacts:
+        sym = e['symbol']
+        if sym in merged:
+            # preserve meaning if present, mark exact+semantic and boost semantic_score
+            merged[sym]['meaning'] = merged[sym].get('meaning') or e.get('meaning')
+            merged[sym]['match_type'] = 'exact+semantic'
+            merged[sym]['semantic_score'] = max(merged[sym].get('semantic_score', 0), 0.95)
+        else:
+            merged[sym] = {**e, 'semantic_score': 0.95}
+    return list(merged.values())
+
+def detect_archetype(symbols: List[Dict[str,Any]]):
+    """Archetype with the most hits among the ranked symbols (None when nothing matches)."""
+    counts = {a:0 for a in ARCHETYPE_MAP}
+    for s in symbols:
+        for arch_name, words in ARCHETYPE_MAP.items():
+            if s.get("symbol") in words:
+                counts[arch_name] += 1
+    dom = max(counts, key=counts.get)
+    return dom if counts[dom] > 0 else None
+
+def recurring_symbols(symbols: List[Dict[str,Any]], previous_dreams=None, symbol_history=None) -> List[str]:
+    """
+    Current symbols the user has dreamed of before. `symbol_history(names)` returns the
+    subset of `names` already in the user's history (an indexed lookup); without it the
+    symbols of `previous_dreams` are scanned.
+    """
+    curr_syms = set([s['symbol'] for s in symbols])
+    if symbol_history is not None:
+        return list(symbol_history(sorted(curr_syms)))
+    prev_syms = set()
+    for d in previous_dreams or []:
+        try:
+            for s in d.get('symbols', []):
+                if isinstance(s, dict):
+                    prev_syms.add(s.get('symbol'))
+                elif isinstance(s, str):
+                    prev_syms.add(s)
+        except Exception:
+            pass
+    return list(prev_syms.intersection(curr_syms))
+
+def _recurring_or_empty(symbols, previous_dreams, symbol_history) -> List[str]:
+    try:
+        return recurring_symbols(symbols, previous_dreams, symbol_history)
+    except Exception as e:
+        print("[analyzer_upgraded] recurring symbols error:", e)
+        return []
+
+def _summary_stage(text: str) -> str:
+    try:
+        return chunked_summarize(text)
+    except Exception as e:
+        print("[analyzer_upgraded] summary error:", e)
+        return safe_first_sentence(text)
+
+def _symbols_stage(text: str, deps) -> tuple:
+    ranked = rank_symbols(text, merge_symbol_matches(deps["semantic_symbols"], deps["exact_symbols"]))
+    # bucket by weight thresholds: primary >=90, secondary 75-89, noise <75
+    primary, secondary, noise = bucket_symbols_by_weight(ranked)
+    return ranked, primary, secondary, noise
+
+def build_analysis_stages(ctx: "AnalysisContext", snapshot, precomputed: Dict[str, Any] = None) -> List[Stage]:
+    """
+    The analyze_dream DAG. Stages without dependencies between them (summary, emotion,
+    keywords, spaCy parse, symbol matching) run concurrently; each stage's default is
+    what analyze_dream reported before when that step failed. Stages named in
+    `precomputed` just return the given output (see analyze_dreams).
+    """
+    text = ctx.text
+
+    def emotion(_):
+        # whole-document emotion and every arc sentence share one batched pipeline call
+        batch = detect_emotion_batch([text] + ctx.sentences)
+        return {"emotions": batch[0], "sentence_emotions": batch[1:]}
+
+    no_emotion = {"emotions": {"dominant": "neutral", "scores": []}, "sentence_emotions": None}
+    no_arc = {"arc": [], "trend": "neutral", "neg_count": 0, "pos_count": 0}
+    stages = [
+        Stage("summary", lambda _: _summary_stage(text), default=""),
+        Stage("emotion", emotion, default=no_emotion),
+        Stage("themes", lambda _: extract_keywords(text, top_n=6) or [], default=[]),
+        # one shared spaCy parse for all structured extractors
+        Stage("parse", lambda _: ctx.doc),
+        Stage("entities", lambda d: extract_entities_structured(text, doc=d["parse"]), ["parse"], default={}),
+        Stage("people_locations_objects", lambda d: extract_people_locations_objects(text, doc=d["parse"]), ["parse"], default={}),
+        Stage("events", lambda d: extract_events(text, doc=d["parse"]), ["parse"], default=[]),
+        Stage("cause_effect", lambda _: detect_cause_effect(text), default=[]),
+        Stage("conflicts_desires", lambda _: detect_conflicts_and_desires(text), default={}),
+        Stage("emotional_arc", lambda d: emotional_arc(text, sentence_emotions=d["emotion"]["sentence_emotions"]),
+              ["emotion"], default=no_arc),
+        Stage("narrative", lambda _: detect_narrative_structure(text), default={}),
+        Stage("semantic_symbols", lambda _: semantic_match_symbols(text, top_k=20, score_threshold=0.40, snapshot=snapshot), default=[]),
+        Stage("exact_symbols", lambda _: exact_match_symbols(text, snapshot=snapshot), default=[]),
+        Stage("rank_symbols", lambda d: _symbols_stage(text, d), ["semantic_symbols", "exact_symbols"], default=([], [], [], [])),
+        Stage("combined_insights", lambda d: combined_insights_from_symbols(d["rank_symbols"][0], d["emotion"]["emotions"].get("dominant")),
+              ["rank_symbols", "emotion"], default=[]),
+        Stage("archetype", lambda d: detect_archetype(d["rank_symbols"][0]), ["rank_symbols"]),
+    ]
+    if precomputed:
+        stages = [Stage(s.name, lambda _, out=precomputed[s.name]: out, default=s.default) if s.name in precomputed else s
+                  for s in stages]
+    return stages
+
+def _collect_outputs(result: Dict[str, Any], outputs: Dict[str, Any], stages) -> None:
+    """Copy the result fields produced by the named stages out of the graph outputs."""
+    if "summary" in stages:
+        result["summary"] = outputs["summary"]
+    if "emotion" in stages:
+        result["emotions"] = outputs["emotion"]["emotions"]
+    if "themes" in stages:
+        result["themes"] = outputs["themes"] or []
+    if "entities" in stages:
+        result["entities"] = outputs["entities"].get("entities", [])
+    if "people_locations_objects" in stages:
+        for field in ("people", "locations", "objects"):
+            result[field] = outputs["people_locations_objects"].get(field, [])
+    if "events" in stages:
+        result["events"] = outputs["events"]
+    if "cause_effect" in stages:
+        result["cause_effect"] = outputs["cause_effect"]
+    if "conflicts_desires" in stages:
+        result["conflicts"] = outputs["conflicts_desires"].get("conflicts", [])
+        result["desires"] = outputs["conflicts_desires"].get("desires", [])
+    if "emotional_arc" in stages:
+        result["emotional_arc"] = outputs["emotional_arc"]
+    if "narrative" in stages:
+        result["narrative"] = outputs["narrative"]
+    if "rank_symbols" in stages:
+        ranked, primary, secondary, noise = outputs["rank_symbols"]
+        result["symbols"] = ranked
+        result["symbols_primary"] = primary
+        result["symbols_secondary"] = secondary
+        result["symbols_noise"] = noise
+    if "combined_insights" in stages:
+        result["combined_insights"] = outputs["combined_insights"]
+    if "archetype" in stages:
+        result["archetype"] = outputs["archetype"]
+
 # ---------- master analyze ----------
-def analyze_dream(text: str, previous_dreams=None, use_llm_fallback=False) -> Dict[str,Any]:
+def analyze_dream(text: str, previous_dreams=None, use_llm_fallback=False, return_timings=False,
+                  symbol_history=None) -> Dict[str,Any]:
     """
     Returns a dictionary with all fields (backwards compatible).
+    recurring_symbols comes from symbol_history(names) when given (see
+    recurring_symbols), otherwise from scanning previous_dreams.
     Adds:
       - events
       - entities
@@ -298,8 +566,13 @@ def analyze_dream(text: str, previous_dreams=None, use_llm_fallback=False) -> Di
       - conflicts/desires
       - emotional_arc
       - narrative (setup/climax/resolution)
-      - analysis_version
+      - analysis_version, stage_versions (STAGE_VERSIONS that produced it)
       - symbols_primary / secondary / noise (new)
+      - symbol_index_version (dictionary version the symbols came from)
+      - timings (only with return_timings=True): total_ms and per-stage
+        wall_ms / cpu_ms (/ peak_kb with ANALYSIS_TRACE_MEMORY=1), plus the
+        cProfile dump path when this call was sampled for profiling, or
+        cache_hit when the result came from RESULT_CACHE
     """
     result = {
         "summary": "",
@@ -324,138 +597,197 @@ def analyze_dream(text: str, previous_dreams=None, use_llm_fallback=False) -> Di
         "desires": [],
         "emotional_arc": {},
         "narrative": {},
-        "analysis_version": "analyzer_upgraded_v2"
+        "analysis_version": ANALYSIS_VERSION,
+        "stage_versions": dict(STAGE_VERSIONS),
+        "symbol_index_version": None
     }
 
     if not text or not str(text).strip():
         return result
 
-    try:
-        result["summary"] = chunked_summarize(text)
-    except Exception as e:
-        print("[analyzer_upgraded] summary error:", e)
-        result["summary"] = safe_first_sentence(text)
-
-    try:
-        result["emotions"] = detect_emotion_text(text)
-    except Exception as e:
-        print("[analyzer_upgraded] emotion error:", e)
-
-    try:
-        result["themes"] = extract_keywords(text, top_n=6) or []
-    except Exception as e:
-        print("[analyzer_upgraded] themes error:", e)
-        result["themes"] = []
-
-    # structured extraction
-    try:
-        ents_struct = extract_entities_structured(text)
-        result["entities"] = ents_struct.get("entities", [])
-        ppl_loc_obj = extract_people_locations_objects(text)
-        result["people"] = ppl_loc_obj.get("people", [])
-        result["locations"] = ppl_loc_obj.get("locations", [])
-        result["objects"] = ppl_loc_obj.get("objects", [])
-        result["events"] = extract_events(text)
-        result["cause_effect"] = detect_cause_effect(text)
-        cd = detect_conflicts_and_desires(text)
-        result["conflicts"] = cd.get("conflicts", [])
-        result["desires"] = cd.get("desires", [])
-        result["emotional_arc"] = emotional_arc(text)
-        result["narrative"] = detect_narrative_structure(text)
-    except Exception as e:
-        print("[analyzer_upgraded] structured extraction error:", e)
-
-    # symbols: union of semantic + exact, then rank, then bucket
-    try:
-        sem = semantic_match_symbols(text, top_k=20, score_threshold=0.40)
-        exacts = exact_match_symbols(text)
-        merged = {s['symbol']: s for s in sem}
-        for e in exacts:
-            sym = e['symbol']
-            if sym in merged:
-                # preserve meaning if present, mark exact+semantic and boost semantic_score
-                merged[sym]['meaning'] = merged[sym].get('meaning') or e.get('meaning')
-                merged[sym]['match_type'] = 'exact+semantic'
-                merged[sym]['semantic_score'] = max(merged[sym].get('semantic_score', 0), 0.95)
-            else:
-                merged[sym] = {**e, 'semantic_score': 0.95}
-        candidates = list(merged.values())
-        ranked = rank_symbols(text, candidates)
-
-        # bucket by weight thresholds: primary >=90, secondary 75-89, noise <75
-        primary, secondary, noise = bucket_symbols_by_weight(ranked)
-
-        result["symbols"] = ranked
-        result["symbols_primary"] = primary
-        result["symbols_secondary"] = secondary
-        result["symbols_noise"] = noise
-
-    except Exception as e:
-        print("[analyzer_upgraded] symbol error:", e)
-        result["symbols"] = []
-        result["symbols_primary"] = []
-        result["symbols_secondary"] = []
-        result["symbols_noise"] = []
-
-    try:
-        result["combined_insights"] = combined_insights_from_symbols(result["symbols"], result["emotions"].get("dominant"))
-    except Exception as e:
-        print("[analyzer_upgraded] combined_insights error:", e)
-        result["combined_insights"] = []
+    t0 = time.perf_counter()
+    ctx = AnalysisContext(text)
+    # one index snapshot for the whole call, even if a reload swaps it meanwhile
+    snapshot = SYMBOL_INDEX_HOLDER.current()
+    result["symbol_index_version"] = snapshot.version if snapshot is not None else None
+
+    key = analysis_cache_key(text, result["symbol_index_version"]) if RESULT_CACHE is not None and snapshot is not None else None
+    cached = RESULT_CACHE.get(key) if key else None
+    if cached is not None:
+        cached["recurring_symbols"] = _recurring_or_empty(cached.get("symbols", []), previous_dreams, symbol_history)
+        total = time.perf_counter() - t0
+        ANALYSIS_SECONDS.observe(total)
+        if return_timings:
+            cached["timings"] = {"total_ms": round(total * 1000, 3), "stages": {}, "cache_hit": True}
+        return cached
+
+    graph = StageGraph(build_analysis_stages(ctx, snapshot), log_prefix="analyzer_upgraded")
+    with sampled_profile("analyze_dream") as profile:
+        # cProfile only sees the calling thread, so profiled calls run their stages serially
+        outputs = graph.run(parallel=False if profile.active else None)
+
+    _collect_outputs(result, outputs, outputs)
+    ranked = result["symbols"]
+    result["coherence_score"] = 0  # keep old behavior or compute later
+
+    # results produced by fallbacks (failed stage or degraded model) are not cached
+    if key and not graph.errors and not degraded_tiers():
+        RESULT_CACHE.put(key, result)
+    # per-user, so computed outside the cached result (and on the caller's thread,
+    # where symbol_history may use the caller's database session)
+    result["recurring_symbols"] = _recurring_or_empty(ranked, previous_dreams, symbol_history)
+
+    total = time.perf_counter() - t0
+    ANALYSIS_SECONDS.observe(total)
+    if return_timings:
+        result["timings"] = {"total_ms": round(total * 1000, 3), "stages": graph.timings}
+        if profile.path:
+            result["timings"]["profile"] = profile.path
+    return result
 
+# ---------- bulk analysis ----------
+def _batched(name: str, fn):
     try:
-        # archetype detection on top-n symbols (reuse small mapping)
-        arch = None
-        try:
-            # small mapping
-            archetype_map = {
-                "shadow": ["snake","darkness","monster","mirror"],
-                "anima": ["woman","water","moon","emotion"],
-                "animus": ["man","fire","war","control"],
-                "self": ["circle","mandala","sun","unity"],
-                "persona": ["mask","clothes","actor","crowd"]
-            }
-            counts = {a:0 for a in archetype_map}
-            for s in result.get("symbols", []):
-                for arch_name, words in archetype_map.items():
-                    if s.get("symbol") in words:
-                        counts[arch_name] += 1
-            dom = max(counts, key=counts.get)
-            arch = dom if counts[dom] > 0 else None
-        except Exception:
-            arch = None
-        result["archetype"] = arch
+        return fn()
     except Exception as e:
-        print("[analyzer_upgraded] archetype error:", e)
-        result["archetype"] = None
+        print(f"[analyzer_upgraded] batched {name} error:", e)
+        return None
 
-    try:
-        result["coherence_score"] = 0
-        if result.get("emotional_arc"):
-            emotion_scores = result["emotional_arc"].get("arc", [])
+def _batch_model_outputs(contexts: List["AnalysisContext"], snapshot) -> List[Dict[str, Any]]:
+    """
+    Outputs of the model stages for every text, one batched pass per model. A model
+    whose batched pass fails is left out, so those stages run per text as usual.
+    """
+    texts = [ctx.text for ctx in contexts]
+    pre = [{} for _ in texts]
+
+    summaries = _batched("summary", lambda: summarize_many(texts))
+    themes = _batched("themes", lambda: extract_keywords_batch(texts, top_n=6))
+    semantic = _batched("semantic_symbols", lambda: semantic_match_symbols_batch(
+        texts, top_k=20, score_threshold=0.40, snapshot=snapshot))
+    # whole documents and every arc sentence of every text in one emotion pass
+    inputs = texts + [s for ctx in contexts for s in ctx.sentences]
+    emotions = _batched("emotion", lambda: detect_emotion_batch(inputs))
+    nlp = get_spacy()
+    docs = _batched("parse", lambda: list(nlp.pipe(texts))) if nlp is not None and hasattr(nlp, "pipe") else None
+
+    pos = len(texts)
+    for i, ctx in enumerate(contexts):
+        if summaries is not None:
+            pre[i]["summary"] = summaries[i]
+        if themes is not None:
+            pre[i]["themes"] = themes[i] or []
+        if semantic is not None:
+            pre[i]["semantic_symbols"] = semantic[i]
+        if emotions is not None:
+            n = len(ctx.sentences)
+            pre[i]["emotion"] = {"emotions": emotions[i], "sentence_emotions": emotions[pos:pos + n]}
+            pos += n
+        if docs is not None:
+            pre[i]["parse"] = docs[i]
+    return pre
+
+def analyze_dreams(texts: List[str], symbol_history=None, previous_dreams=None) -> List[Dict[str, Any]]:
+    """
+    analyze_dream for many texts at once (bulk imports): every model runs once over
+    the whole set instead of once per text, and cached results are reused. The texts
+    are taken as consecutive dreams of one user, so a symbol is recurring when the
+    user's history (symbol_history / previous_dreams) or an earlier text has it.
+    """
+    texts = list(texts)
+    results: List[Dict[str, Any]] = [None] * len(texts)
+    snapshot = SYMBOL_INDEX_HOLDER.current()
+    version = snapshot.version if snapshot is not None else None
+
+    todo, keys = [], {}
+    for i, text in enumerate(texts):
+        if not text or not str(text).strip():
+            results[i] = analyze_dream(text)
+            continue
+        key = analysis_cache_key(text, version) if RESULT_CACHE is not None and snapshot is not None else None
+        cached = RESULT_CACHE.get(key) if key else None
+        if cached is not None:
+            results[i] = cached
         else:
-            emotion_scores = []
-        result["coherence_score"] = 0  # keep old behavior or compute later
-    except Exception as e:
-        result["coherence_score"] = 0
+            todo.append(i)
+            keys[i] = key
+
+    if todo:
+        t0 = time.perf_counter()
+        contexts = [AnalysisContext(texts[i]) for i in todo]
+        precomputed = _batch_model_outputs(contexts, snapshot)
+        cacheable = not degraded_tiers()
+        for i, ctx, pre in zip(todo, contexts, precomputed):
+            graph = StageGraph(build_analysis_stages(ctx, snapshot, pre), log_prefix="analyzer_upgraded")
+            outputs = graph.run()
+            result = analyze_dream("")
+            result["symbol_index_version"] = version
+            _collect_outputs(result, outputs, outputs)
+            if keys[i] and cacheable and not graph.errors:
+                RESULT_CACHE.put(keys[i], result)
+            results[i] = result
+        ANALYSIS_SECONDS.observe((time.perf_counter() - t0) / len(todo))
+
+    # recurring symbols in input order: one history lookup for the whole set
+    names = sorted({s["symbol"] for r in results for s in r.get("symbols", [])})
+    known = set(_recurring_or_empty([{"symbol": n} for n in names], previous_dreams, symbol_history)) if names else set()
+    for r in results:
+        current = {s["symbol"] for s in r.get("symbols", [])}
+        r["recurring_symbols"] = sorted(current & known)
+        known |= current
+    return results
 
-    try:
-        # recurring symbols
-        prev = previous_dreams or []
-        prev_syms = set()
-        for d in prev:
-            try:
-                for s in d.get('symbols', []):
-                    if isinstance(s, dict):
-                        prev_syms.add(s.get('symbol'))
-                    elif isinstance(s, str):
-                        prev_syms.add(s)
-            except Exception:
-                pass
-        curr_syms = set([s['symbol'] for s in result.get("symbols", [])])
-        result["recurring_symbols"] = list(prev_syms.intersection(curr_syms))
-    except Exception as e:
-        print("[analyzer_upgraded] recurring symbols error:", e)
-        result["recurring_symbols"] = []
+# ---------- incremental re-analysis ----------
+def stale_stages(stage_versions: Dict[str, int] = None) -> List[str]:
+    """Stages whose STAGE_VERSIONS entry differs from a stored map (None: analysed before versioning)."""
+    stored = stage_versions or {}
+    return [name for name, version in STAGE_VERSIONS.items() if stored.get(name, BASELINE_STAGE_VERSION) != version]
 
-    return result
+def rerun_plan(stages: List[Stage], stale) -> tuple:
+    """
+    (stages whose outputs must be replaced, stages to run). A stale stage invalidates
+    everything downstream of it; the ancestors of those are re-run as inputs only.
+    """
+    order = topological_order(stages)
+    produce = set(stale)
+    for s in order:
+        if produce.intersection(s.deps):
+            produce.add(s.name)
+    by_name = {s.name: s for s in stages}
+    run, todo = set(produce), list(produce)
+    while todo:
+        for dep in by_name[todo.pop()].deps:
+            if dep not in run:
+                run.add(dep)
+                todo.append(dep)
+    return produce, run
+
+def reanalyze_dream(text: str, previous: Dict[str, Any], stage_versions: Dict[str, int] = None,
+                    symbol_history=None) -> tuple:
+    """
+    Update a stored analysis (`previous`, made by this ANALYSIS_VERSION with
+    `stage_versions`) to the current STAGE_VERSIONS, re-running only what changed.
+    Returns (result, names of the stages whose outputs were replaced); raises
+    RuntimeError when a re-run stage fails.
+    """
+    stale = stale_stages(stage_versions)
+    result = dict(previous, analysis_version=ANALYSIS_VERSION, stage_versions=dict(STAGE_VERSIONS))
+    if not stale or not text or not str(text).strip():
+        return result, []
+
+    t0 = time.perf_counter()
+    ctx = AnalysisContext(text)
+    snapshot = SYMBOL_INDEX_HOLDER.current()
+    stages = build_analysis_stages(ctx, snapshot)
+    produce, run = rerun_plan(stages, stale)
+    graph = StageGraph([s for s in stages if s.name in run], log_prefix="analyzer_upgraded")
+    outputs = graph.run()
+    # a stage default is not a result worth recording as up to date
+    if graph.errors:
+        raise RuntimeError("re-analysis stages failed: " + ", ".join(sorted(graph.errors)))
+    _collect_outputs(result, outputs, produce)
+    if "rank_symbols" in produce:
+        result["symbol_index_version"] = snapshot.version if snapshot is not None else None
+        result["recurring_symbols"] = _recurring_or_empty(result["symbols"], None, symbol_history)
+    ANALYSIS_SECONDS.observe(time.perf_counter() - t0)
+    return result, sorted(produce)
@@ -0,0 +1,138 @@
+# utils/batching.py
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from utils.metrics import histogram, SIZE_BUCKETS
+
+MICROBATCH_ENABLED = os.environ.get("MICROBATCH_ENABLED", "1") == "1"
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", "5"))
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", "16"))
+
+BATCH_SIZE = histogram("microbatch_batch_size", "Inputs per batched model call", buckets=SIZE_BUCKETS)
+QUEUE_DELAY = histogram("microbatch_queue_delay_seconds", "Time an input waited before its batch ran")
+RUN_TIME = histogram("microbatch_run_seconds", "Duration of one batched model call")
+
+
+class _Pending:
+    __slots__ = ("item", "enqueued", "done", "result", "error")
+
+    def __init__(self, item):
+        self.item = item
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Collects inputs from concurrent callers and runs them through `fn` together.
+
+    A batch is dispatched once it holds `max_batch` items or `max_wait_ms` after its
+    first item arrived, whichever comes first. `fn` takes a list of inputs and returns
+    a list of results in the same order. If a batched call raises, its items are
+    retried one by one so a single bad input only fails its own caller.
+    Batch sizes, queueing delay and run time are recorded in utils.metrics.
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], List[Any]],
+                 max_batch: int = None, max_wait_ms: float = None):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max_batch or MICROBATCH_MAX_SIZE
+        self.max_wait = (MICROBATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=f"microbatch-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def submit_many(self, items: List[Any]) -> List[Any]:
+        """Run `items` (possibly batched with other callers' inputs); results in input order."""
+        if not items:
+            return []
+        self._ensure_thread()
+        pending = [_Pending(item) for item in items]
+        for p in pending:
+            self._queue.put(p)
+        for p in pending:
+            p.done.wait()
+        for p in pending:
+            if p.error is not None:
+                raise p.error
+        return [p.result for p in pending]
+
+    def submit(self, item: Any) -> Any:
+        return self.submit_many([item])[0]
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0].enqueued + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    # take whatever is already queued, then wait until the deadline
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch: List[_Pending]):
+        start = time.perf_counter()
+        for p in batch:
+            QUEUE_DELAY.observe(start - p.enqueued, model=self.name)
+        BATCH_SIZE.observe(len(batch), model=self.name)
+        try:
+            results = self.fn([p.item for p in batch])
+            for p, r in zip(batch, results):
+                p.result = r
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+            else:
+                for p in batch:
+                    try:
+                        p.result = self.fn([p.item])[0]
+                    except Exception as item_error:
+                        p.error = item_error
+        RUN_TIME.observe(time.perf_counter() - start, model=self.name)
+        for p in batch:
+            p.done.set()
+
+
+_batchers: Dict[Any, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(key: Any, fn: Callable[[List[Any]], List[Any]], name: str = None) -> MicroBatcher:
+    """Process-wide batcher for `key` (e.g. model plus generation kwargs), created on first use."""
+    batcher = _batchers.get(key)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                batcher = _batchers[key] = MicroBatcher(name or str(key), fn)
+    return batcher
+
+
+def run_batched(key: Any, fn: Callable[[List[Any]], List[Any]], items: List[Any], name: str = None) -> List[Any]:
+    """Send `items` through the shared batcher for `key`, or call fn directly when batching is off."""
+    if not MICROBATCH_ENABLED:
+        return fn(list(items))
+    return get_batcher(key, fn, name).submit_many(list(items))
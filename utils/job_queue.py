@@ -0,0 +1,202 @@
+# utils/job_queue.py
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional
+
+# a job still "running" after its lease expired belongs to a dead worker and is re-queued
+DEFAULT_LEASE_SECONDS = int(os.environ.get("ANALYSIS_JOB_LEASE_SECONDS", "600"))
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+# workers record a heartbeat this often; one silent for HEARTBEAT_TTL is considered gone
+HEARTBEAT_INTERVAL = float(os.environ.get("ANALYSIS_WORKER_HEARTBEAT", "10"))
+HEARTBEAT_TTL = 3 * HEARTBEAT_INTERVAL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_job (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dream_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS ix_analysis_job_status ON analysis_job (status, id);
+CREATE INDEX IF NOT EXISTS ix_analysis_job_dream ON analysis_job (dream_id);
+CREATE TABLE IF NOT EXISTS analysis_worker (
+    name TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+"""
+
+
+class JobQueue:
+    """
+    Durable FIFO of analysis jobs in a local SQLite file.
+
+    Jobs move pending -> running -> done, or back to pending on error until
+    max_attempts, then failed. A claim holds a lease; jobs whose lease expired
+    (worker crashed or the box restarted) are claimed again, so nothing is lost.
+    Safe to share between threads and processes: each thread gets its own connection.
+    """
+
+    def __init__(self, path: str, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        # schema on a throwaway connection, so the constructing process holds none to
+        # hand down to forked workers
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def __getstate__(self):
+        return {"path": self.path, "lease_seconds": self.lease_seconds, "max_attempts": self.max_attempts}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # connections must not cross a fork into worker processes
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, dream_id: int) -> int:
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO analysis_job (dream_id, status, created_at, updated_at) VALUES (?, 'pending', ?, ?)",
+            (dream_id, now, now))
+        return cur.lastrowid
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest runnable job (pending, or running with an expired lease)."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM analysis_job WHERE status = 'pending' "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE analysis_job SET status = 'running', attempts = attempts + 1, "
+                "lease_until = ?, updated_at = ? WHERE id = ?",
+                (now + self.lease_seconds, now, row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job_id: int):
+        self._conn().execute(
+            "UPDATE analysis_job SET status = 'done', error = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+            (time.time(), job_id))
+
+    def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """Record an error; returns True when the job gave up (no attempts left)."""
+        final = job["attempts"] >= self.max_attempts
+        self._conn().execute(
+            "UPDATE analysis_job SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+            ("failed" if final else "pending", error[-2000:], time.time(), job["id"]))
+        return final
+
+    def latest_for_dream(self, dream_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM analysis_job WHERE dream_id = ? ORDER BY id DESC LIMIT 1", (dream_id,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM analysis_job GROUP BY status").fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    def heartbeat(self, name: str):
+        self._conn().execute(
+            "INSERT INTO analysis_worker (name, seen_at) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET seen_at = excluded.seen_at", (name, time.time()))
+
+    def live_workers(self, ttl: float = HEARTBEAT_TTL) -> int:
+        """Workers (in any process) that sent a heartbeat within the last `ttl` seconds."""
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM analysis_worker WHERE seen_at >= ?", (time.time() - ttl,)).fetchone()[0]
+
+
+def _beat(queue: JobQueue, name: str, stop_event=None):
+    # from its own thread, so a long job does not make the worker look dead
+    while stop_event is None or not stop_event.is_set():
+        try:
+            queue.heartbeat(name)
+        except sqlite3.OperationalError as e:
+            print("[job_queue] heartbeat failed:", e)
+        time.sleep(HEARTBEAT_INTERVAL)
+
+
+def run_worker(queue: JobQueue, handler: Callable[[Dict[str, Any]], None],
+               on_give_up: Callable[[Dict[str, Any], str], None] = None,
+               poll_interval: float = 1.0, stop_event=None, initializer: Callable[[], None] = None):
+    """Claim and process jobs until stop_event is set; idle workers poll every poll_interval seconds."""
+    if initializer is not None:
+        initializer()
+    name = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    threading.Thread(target=_beat, args=(queue, name, stop_event), name="analysis-worker-heartbeat", daemon=True).start()
+    while stop_event is None or not stop_event.is_set():
+        try:
+            job = queue.claim()
+        except sqlite3.OperationalError as e:
+            print("[job_queue] claim failed:", e)
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        try:
+            handler(job)
+            queue.complete(job["id"])
+        except Exception:
+            error = traceback.format_exc()
+            print(f"[job_queue] job {job['id']} (dream {job['dream_id']}) failed, attempt {job['attempts']}")
+            if queue.fail(job, error) and on_give_up is not None:
+                try:
+                    on_give_up(job, error)
+                except Exception:
+                    traceback.print_exc()
+
+
+def start_workers(n: int, queue: JobQueue, handler, on_give_up=None, poll_interval: float = 1.0,
+                  initializer=None) -> List[multiprocessing.Process]:
+    """
+    Start `n` daemon worker processes. handler, on_give_up and initializer (run once
+    in each child before the first job) must be importable module-level functions.
+    """
+    procs = []
+    for i in range(n):
+        p = multiprocessing.Process(target=run_worker, args=(queue, handler, on_give_up, poll_interval, None, initializer),
+                                    name=f"analysis-worker-{i}", daemon=True)
+        p.start()
+        procs.append(p)
+    return procs
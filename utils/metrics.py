@@ -0,0 +1,142 @@
+# utils/metrics.py
+import threading
+from typing import Dict, Iterable, Tuple
+
+# default latency buckets in seconds
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) with optional labels."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = TIME_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def snapshot(self) -> Dict[Tuple[Tuple[str, str], ...], Dict]:
+        with self._lock:
+            out = {}
+            for key, series in self._series.items():
+                n = len(self.buckets)
+                out[key] = {
+                    "buckets": dict(zip(self.buckets, series[:n])),
+                    "count": series[n],
+                    "sum": series[-1],
+                }
+            return out
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+_metrics: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def _get_or_create(cls, name, help, **kwargs):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help, **kwargs)
+        return metric
+
+
+def histogram(name: str, help: str, buckets: Iterable[float] = TIME_BUCKETS) -> Histogram:
+    """Process-wide histogram registered under `name` (created on first use)."""
+    return _get_or_create(Histogram, name, help, buckets=buckets)
+
+
+def counter(name: str, help: str) -> Counter:
+    return _get_or_create(Counter, name, help)
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return _get_or_create(Gauge, name, help)
+
+
+def snapshot() -> Dict[str, Dict]:
+    """JSON-friendly view of every registered metric."""
+    out = {}
+    for name, metric in list(_metrics.items()):
+        series = {}
+        for key, value in metric.snapshot().items():
+            label = ",".join(f"{k}={v}" for k, v in key) or "_"
+            if isinstance(value, dict):
+                value = {**value, "buckets": {str(b): c for b, c in value["buckets"].items()}}
+            series[label] = value
+        out[name] = {"type": metric.kind, "series": series}
+    return out
+
+
+def _labels(key, extra=()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def _num(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, metric in sorted(_metrics.items()):
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(metric.snapshot().items()):
+            if isinstance(metric, Histogram):
+                for bound, count in value["buckets"].items():
+                    lines.append(f"{name}_bucket{_labels(key, [('le', _num(bound))])} {count}")
+                lines.append(f"{name}_bucket{_labels(key, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{name}_sum{_labels(key)} {_num(value['sum'])}")
+                lines.append(f"{name}_count{_labels(key)} {value['count']}")
+            else:
+                lines.append(f"{name}{_labels(key)} {_num(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,309 @@
+# utils/migrations.py
+"""
+Versioned schema migrations for the dreams database (run with scripts/migrate.py).
+
+Each Migration has a schema step, applied in one transaction together with its
+schema_version row, and optionally a data backfill. Backfills run in chunks of
+rows, one short transaction each, with the position saved in the same
+transaction. An interrupted run therefore resumes where it stopped. The chunk
+size shrinks while chunks hold the write lock longer than max_chunk_ms, and the
+runner sleeps between chunks so the app's own writes keep getting through.
+
+Schema steps must be safe on a database whose tables create_all() has just
+built: add_column / create_index skip what already exists, and tables that do
+not exist yet are left to create_all().
+"""
+import json
+import sqlite3
+import time
+from typing import Callable, List, Optional, Tuple
+
+from utils.analysis_store import ANALYSIS_SECTIONS, encode_analysis, symbol_index, parse_symbol_index
+from utils.sqlite_profile import SQLITE_BUSY_TIMEOUT_MS, apply_pragmas
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    backfill_cursor INTEGER NOT NULL DEFAULT 0,
+    backfill_rows INTEGER NOT NULL DEFAULT 0,
+    applied_at REAL NOT NULL
+)
+"""
+
+# backfill(conn, after_id, limit) -> (last id processed, rows processed); 0 rows = finished
+Backfill = Callable[[sqlite3.Connection, int, int], Tuple[int, int]]
+
+
+class Migration:
+    def __init__(self, version: int, name: str, schema: Callable[[sqlite3.Connection], None] = None,
+                 backfill: Backfill = None):
+        self.version = version
+        self.name = name
+        self.schema = schema
+        self.backfill = backfill
+
+
+# ---------- schema helpers ----------
+def has_table(conn, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def has_column(conn, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f'PRAGMA table_info("{table}")'))
+
+
+def add_column(conn, table: str, column: str, decl: str):
+    if has_table(conn, table) and not has_column(conn, table, column):
+        conn.execute(f'ALTER TABLE "{table}" ADD COLUMN {column} {decl}')
+
+
+def create_index(conn, name: str, table: str, columns: str):
+    if has_table(conn, table):
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" ({columns})')
+
+
+# ---------- runner ----------
+class MigrationRunner:
+    def __init__(self, db_path: str, migrations: List[Migration] = None):
+        self.db_path = db_path
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0, isolation_level=None)
+            apply_pragmas(self._conn)
+            self._conn.execute(SCHEMA_VERSION_TABLE)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def status(self) -> List[dict]:
+        rows = {r[0]: r for r in self.conn.execute(
+            "SELECT version, state, backfill_cursor, backfill_rows, applied_at FROM schema_version")}
+        out = []
+        for m in self.migrations:
+            row = rows.get(m.version)
+            out.append({"version": m.version, "name": m.name, "state": row[1] if row else "pending",
+                        "backfill_cursor": row[2] if row else 0, "backfill_rows": row[3] if row else 0})
+        return out
+
+    def pending(self) -> List[Migration]:
+        done = {r[0] for r in self.conn.execute("SELECT version FROM schema_version WHERE state = 'done'")}
+        return [m for m in self.migrations if m.version not in done]
+
+    def stamp(self, target: Optional[int] = None):
+        """Record migrations as done without running them (a database create_all() just built)."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        for m in self.migrations:
+            if target is None or m.version <= target:
+                self.conn.execute("INSERT OR REPLACE INTO schema_version (version, name, state, applied_at) "
+                                  "VALUES (?, ?, 'done', ?)", (m.version, m.name, now))
+        self.conn.execute("COMMIT")
+
+    def migrate(self, target: Optional[int] = None, chunk_size: int = 500, sleep: float = 0.05,
+                max_chunk_ms: float = 200.0, log: Callable[[str], None] = print) -> int:
+        """Apply pending migrations up to `target` in order; returns how many completed."""
+        completed = 0
+        for m in self.pending():
+            if target is not None and m.version > target:
+                break
+            state = self.conn.execute("SELECT state FROM schema_version WHERE version = ?", (m.version,)).fetchone()
+            if state is None:
+                self._apply_schema(m)
+                log(f"[migrate] {m.version:03d} {m.name}: schema applied")
+            if m.backfill is not None:
+                self._run_backfill(m, chunk_size, sleep, max_chunk_ms, log)
+            completed += 1
+        return completed
+
+    def _apply_schema(self, m: Migration):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if m.schema is not None:
+                m.schema(conn)
+            conn.execute("INSERT INTO schema_version (version, name, state, applied_at) VALUES (?, ?, ?, ?)",
+                         (m.version, m.name, "backfilling" if m.backfill else "done", time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _run_backfill(self, m: Migration, chunk_size: int, sleep: float, max_chunk_ms: float, log):
+        conn = self.conn
+        cursor, total = conn.execute("SELECT backfill_cursor, backfill_rows FROM schema_version WHERE version = ?",
+                                     (m.version,)).fetchone()
+        limit = chunk_size
+        while True:
+            t0 = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                last_id, n = m.backfill(conn, cursor, limit)
+                if n:
+                    cursor, total = last_id, total + n
+                    conn.execute("UPDATE schema_version SET backfill_cursor = ?, backfill_rows = ? WHERE version = ?",
+                                 (cursor, total, m.version))
+                else:
+                    conn.execute("UPDATE schema_version SET state = 'done', applied_at = ? WHERE version = ?",
+                                 (time.time(), m.version))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if not n:
+                log(f"[migrate] {m.version:03d} {m.name}: backfill done ({total} rows)")
+                return
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            log(f"[migrate] {m.version:03d} {m.name}: {total} rows (up to id {cursor}, chunk {limit}, {elapsed_ms:.0f} ms)")
+            # keep each write-lock hold under max_chunk_ms
+            if elapsed_ms > max_chunk_ms and limit > 1:
+                limit = max(1, limit // 2)
+            elif elapsed_ms < max_chunk_ms / 4 and limit < chunk_size:
+                limit = min(chunk_size, limit * 2)
+            if sleep:
+                time.sleep(sleep)
+
+
+# ---------- migrations ----------
+def _analysis_fields(conn):
+    # formerly scripts/migrate_add_fields.py
+    for col in ("events", "entities", "people", "locations", "objects", "cause_effect",
+                "conflicts", "desires", "emotional_arc", "narrative"):
+        add_column(conn, "dream", col, "TEXT")
+    add_column(conn, "dream", "analysis_version", "VARCHAR(80)")
+    add_column(conn, "dream", "analysis_status", "VARCHAR(20)")
+
+
+def _change_tracking(conn):
+    add_column(conn, "dream", "change_seq", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "user", "change_seq", "INTEGER NOT NULL DEFAULT 0")
+    create_index(conn, "ix_dream_user_change_seq", "dream", "user_id, change_seq")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dream_tombstone (
+            id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            dream_id INTEGER NOT NULL,
+            change_seq INTEGER NOT NULL,
+            deleted_at DATETIME
+        )""")
+    create_index(conn, "ix_dream_tombstone_user_change_seq", "dream_tombstone", "user_id, change_seq")
+
+
+def _keyset_index(conn):
+    create_index(conn, "ix_dream_user_date_id", "dream", "user_id, date, id")
+
+
+def _user_symbol_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_symbol (
+            id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            symbol VARCHAR(200) NOT NULL,
+            count INTEGER NOT NULL,
+            last_seen DATETIME,
+            CONSTRAINT uq_user_symbol UNIQUE (user_id, symbol)
+        )""")
+
+
+def _dream_symbol_rows(conn, user_id):
+    """(date, symbol names) of every dream of a user, from the blob index or the legacy column."""
+    if has_table(conn, "dream_analysis"):
+        rows = conn.execute("SELECT d.date, d.symbols, a.symbol_index FROM dream d "
+                            "LEFT JOIN dream_analysis a ON a.dream_id = d.id WHERE d.user_id = ?", (user_id,))
+    else:
+        rows = conn.execute("SELECT date, symbols, NULL FROM dream WHERE user_id = ?", (user_id,))
+    for date, symbols, indexed in rows:
+        if indexed is not None:
+            yield date, set(parse_symbol_index(indexed))
+            continue
+        try:
+            items = json.loads(symbols) if symbols else []
+        except ValueError:
+            items = []
+        yield date, {s.get("symbol") if isinstance(s, dict) else s for s in items or []} - {None, ""}
+
+
+def _backfill_user_symbols(conn, after_id, limit):
+    if not (has_table(conn, "user") and has_table(conn, "dream")):
+        return after_id, 0
+    user_ids = [r[0] for r in conn.execute('SELECT id FROM "user" WHERE id > ? ORDER BY id LIMIT ?', (after_id, limit))]
+    for user_id in user_ids:
+        counts, last_seen = {}, {}
+        for date, names in _dream_symbol_rows(conn, user_id):
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+                if date is not None and (last_seen.get(name) is None or date > last_seen[name]):
+                    last_seen[name] = date
+        conn.execute("DELETE FROM user_symbol WHERE user_id = ?", (user_id,))
+        conn.executemany("INSERT INTO user_symbol (user_id, symbol, count, last_seen) VALUES (?, ?, ?, ?)",
+                         [(user_id, name, n, last_seen.get(name)) for name, n in counts.items()])
+    return (user_ids[-1] if user_ids else after_id), len(user_ids)
+
+
+def _dream_analysis_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dream_analysis (
+            dream_id INTEGER NOT NULL PRIMARY KEY REFERENCES dream (id) ON DELETE CASCADE,
+            payload BLOB NOT NULL,
+            symbol_index TEXT,
+            updated_at DATETIME
+        )""")
+
+
+_OBJECT_SECTIONS = ("psychological_interpretation", "emotional_arc", "narrative")
+
+
+def _legacy_section(name, raw):
+    try:
+        value = json.loads(raw) if raw else None
+    except ValueError:
+        value = None
+    return value or ({} if name in _OBJECT_SECTIONS else [])
+
+
+def _backfill_dream_analysis(conn, after_id, limit):
+    """Move legacy per-field JSON columns into dream_analysis blobs."""
+    if not has_table(conn, "dream"):
+        return after_id, 0
+    columns = ", ".join(ANALYSIS_SECTIONS)
+    legacy = " OR ".join(f"d.{name} IS NOT NULL" for name in ANALYSIS_SECTIONS)
+    rows = conn.execute(
+        f"SELECT d.id, d.content, {columns} FROM dream d WHERE d.id > ? AND ({legacy}) "
+        f"AND NOT EXISTS (SELECT 1 FROM dream_analysis a WHERE a.dream_id = d.id) ORDER BY d.id LIMIT ?",
+        (after_id, limit)).fetchall()
+    now = time.strftime("%Y-%m-%d %H:%M:%S.000000", time.gmtime())
+    cleared = ", ".join(f"{name} = NULL" for name in ANALYSIS_SECTIONS)
+    for row in rows:
+        dream_id, content = row[0], row[1] or ""
+        sections = {name: _legacy_section(name, raw) for name, raw in zip(ANALYSIS_SECTIONS, row[2:])}
+        conn.execute("INSERT INTO dream_analysis (dream_id, payload, symbol_index, updated_at) VALUES (?, ?, ?, ?)",
+                     (dream_id, encode_analysis(sections, content), symbol_index(sections["symbols"]), now))
+        conn.execute(f"UPDATE dream SET {cleared} WHERE id = ?", (dream_id,))
+    return (rows[-1][0] if rows else after_id), len(rows)
+
+
+def _stage_versions(conn):
+    add_column(conn, "dream_analysis", "stage_versions", "TEXT")
+
+
+def _reanalysis_stage_runs(conn):
+    add_column(conn, "reanalysis_checkpoint", "stage_runs", "TEXT")
+
+
+MIGRATIONS = [
+    Migration(1, "dream_analysis_fields", _analysis_fields),
+    Migration(2, "change_tracking", _change_tracking),
+    Migration(3, "dream_keyset_index", _keyset_index),
+    Migration(4, "user_symbol_history", _user_symbol_table, _backfill_user_symbols),
+    Migration(5, "dream_analysis_blob", _dream_analysis_table, _backfill_dream_analysis),
+    Migration(6, "analysis_stage_versions", _stage_versions),
+    Migration(7, "reanalysis_stage_runs", _reanalysis_stage_runs),
+]
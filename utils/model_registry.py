@@ -0,0 +1,163 @@
+# utils/model_registry.py
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+# one sentence-transformer shared by symbol indexing, KeyBERT and semantic matching
+SBERT_MODEL = os.environ.get("SBERT_MODEL", "all-MiniLM-L6-v2")
+# after a failed load, wait this long before retrying (doubling per failure, capped)
+RETRY_BACKOFF_SECONDS = float(os.environ.get("MODEL_RETRY_BACKOFF", "60"))
+RETRY_BACKOFF_MAX_SECONDS = float(os.environ.get("MODEL_RETRY_BACKOFF_MAX", "3600"))
+
+_models: Dict[str, Any] = {}
+_info: Dict[str, Dict[str, Any]] = {}
+# key -> {"error", "failed_at", "attempts", "retry_at"} for models whose last load failed
+_failures: Dict[str, Dict[str, Any]] = {}
+_key_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised without touching disk while a model is backing off after a failed load."""
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _registry_lock:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (0 if it cannot be determined)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _param_bytes(model) -> int:
+    """Size of a torch model's parameters; pipelines expose theirs as `.model`."""
+    for candidate in (model, getattr(model, "model", None)):
+        params = getattr(candidate, "parameters", None)
+        if callable(params):
+            try:
+                return sum(p.numel() * p.element_size() for p in params())
+            except Exception:
+                return 0
+    return 0
+
+
+def _check_backoff(key: str):
+    failure = _failures.get(key)
+    if failure is not None and time.time() < failure["retry_at"]:
+        raise ModelUnavailable(f"{key} unavailable until retry in {failure['retry_at'] - time.time():.0f}s: {failure['error']}")
+
+
+def get_model(key: str, loader: Callable[[], Any]) -> Any:
+    """
+    Return the process-wide instance registered under `key`, calling loader() at most
+    once even when several threads ask concurrently.
+
+    A failed load is remembered: until its backoff expires (MODEL_RETRY_BACKOFF
+    seconds, doubling per consecutive failure up to MODEL_RETRY_BACKOFF_MAX) calls
+    raise ModelUnavailable immediately instead of retrying the load, so callers
+    fall back to their cheap heuristics at no cost.
+    """
+    model = _models.get(key)
+    if model is not None:
+        return model
+    _check_backoff(key)
+    with _lock_for(key):
+        model = _models.get(key)
+        if model is not None:
+            return model
+        _check_backoff(key)
+        rss_before = rss_bytes()
+        t0 = time.perf_counter()
+        try:
+            model = loader()
+        except Exception as e:
+            attempts = _failures.get(key, {}).get("attempts", 0) + 1
+            now = time.time()
+            delay = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+            _failures[key] = {"error": f"{type(e).__name__}: {e}", "failed_at": now,
+                              "attempts": attempts, "retry_at": now + delay}
+            print(f"[model_registry] {key} failed to load (attempt {attempts}); next retry in {delay:.0f}s:", e)
+            raise
+        _models[key] = model
+        _failures.pop(key, None)
+        _info[key] = {
+            "load_seconds": round(time.perf_counter() - t0, 3),
+            "rss_delta_mb": round((rss_bytes() - rss_before) / 2**20, 1),
+            "param_mb": round(_param_bytes(model) / 2**20, 1),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    return model
+
+
+def set_model(key: str, model: Any):
+    """Register an already-built instance under `key` (preloaded models, benchmark stubs)."""
+    with _lock_for(key):
+        _models[key] = model
+        _failures.pop(key, None)
+        _info[key] = {"load_seconds": 0.0, "rss_delta_mb": 0.0, "param_mb": round(_param_bytes(model) / 2**20, 1),
+                      "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "injected": True}
+
+
+def model_state(key: str) -> str:
+    """'loaded', 'unavailable' (in backoff), 'retry_pending' (backoff over) or 'not_loaded'."""
+    if key in _models:
+        return "loaded"
+    failure = _failures.get(key)
+    if failure is None:
+        return "not_loaded"
+    return "unavailable" if time.time() < failure["retry_at"] else "retry_pending"
+
+
+def model_status() -> Dict[str, Any]:
+    """State of every model the registry has seen, with failure details for degraded ones."""
+    status = {key: {"state": "loaded"} for key in _models}
+    for key, failure in _failures.items():
+        status[key] = {"state": model_state(key), "error": failure["error"], "attempts": failure["attempts"],
+                       "retry_in_seconds": max(0, round(failure["retry_at"] - time.time()))}
+    return status
+
+
+def reset_failure(key: str = None):
+    """Forget recorded failures (all, or one key) so the next call retries immediately."""
+    if key is None:
+        _failures.clear()
+    else:
+        _failures.pop(key, None)
+
+
+def is_loaded(key: str) -> bool:
+    return key in _models
+
+
+def memory_report() -> Dict[str, Any]:
+    """
+    Per-model load statistics: RSS growth while loading (includes imported libraries
+    for the first model of a kind) and parameter size, plus current process RSS.
+    """
+    return {
+        "rss_mb": round(rss_bytes() / 2**20, 1),
+        "models": {key: dict(info) for key, info in _info.items()},
+        "status": model_status(),
+    }
+
+
+def get_sbert():
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(SBERT_MODEL)
+    return get_model(f"sbert:{SBERT_MODEL}", load)
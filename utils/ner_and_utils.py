@@ -1,60 +1,77 @@
 # utils/ner_and_utils.py
-import re, string
-from transformers import pipeline
-from keybert import KeyBERT
-from sentence_transformers import SentenceTransformer
-import numpy as np
-import spacy
+import os, re, string
 from typing import List, Dict
 
-# Models - lazy load for faster import
-_summarizer = None
-_emotion = None
-_kw_model = None
-_SBERT = None
-_spacy_nlp = None
+from utils.model_registry import get_model, get_sbert as registry_get_sbert, model_state, SBERT_MODEL
+from utils.batching import run_batched
 
+# inputs per forward pass when classifying many texts (e.g. every sentence of a dream)
+EMOTION_BATCH_SIZE = int(os.environ.get("EMOTION_BATCH_SIZE", "16"))
+
+SUMMARIZER_MODEL = "facebook/bart-large-cnn"
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+SPACY_MODEL = "en_core_web_sm"
+
+# Models - lazy load for faster import; instances live in the process-wide registry
+# so every module (symbol index, analyzers, KeyBERT) shares one copy of each.
+# transformers / keybert / spacy are imported inside the loaders, so importing this
+# module does not pull in torch.
 def get_sbert():
-    global _SBERT
-    if _SBERT is None:
-        _SBERT = SentenceTransformer("all-MiniLM-L6-v2")
-    return _SBERT
+    try:
+        return registry_get_sbert()
+    except Exception:
+        return None
 
 def get_summarizer():
-    global _summarizer
-    if _summarizer is None:
-        try:
-            _summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-        except Exception:
-            _summarizer = None
-    return _summarizer
+    def load():
+        from transformers import pipeline
+        return pipeline("summarization", model=SUMMARIZER_MODEL)
+    try:
+        return get_model(f"summarizer:{SUMMARIZER_MODEL}", load)
+    except Exception:
+        return None
 
 def get_emotion_pipeline():
-    global _emotion
-    if _emotion is None:
-        try:
-            _emotion = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", return_all_scores=True)
-        except Exception:
-            _emotion = None
-    return _emotion
+    def load():
+        from transformers import pipeline
+        return pipeline("text-classification", model=EMOTION_MODEL, return_all_scores=True)
+    try:
+        return get_model(f"emotion:{EMOTION_MODEL}", load)
+    except Exception:
+        return None
 
 def get_keybert():
-    global _kw_model
-    if _kw_model is None:
-        try:
-            _kw_model = KeyBERT(get_sbert())
-        except Exception:
-            _kw_model = None
-    return _kw_model
+    def load():
+        from keybert import KeyBERT
+        # wraps the shared SBERT instance, so it adds no model weights of its own;
+        # the registry getter raises if SBERT itself is unavailable
+        return KeyBERT(registry_get_sbert())
+    try:
+        return get_model(f"keybert:{SBERT_MODEL}", load)
+    except Exception:
+        return None
 
 def get_spacy():
-    global _spacy_nlp
-    if _spacy_nlp is None:
-        try:
-            _spacy_nlp = spacy.load("en_core_web_sm")
-        except Exception:
-            _spacy_nlp = None
-    return _spacy_nlp
+    def load():
+        import spacy
+        return spacy.load(SPACY_MODEL)
+    try:
+        return get_model(f"spacy:{SPACY_MODEL}", load)
+    except Exception:
+        return None
+
+# analysis tiers -> registry keys; a tier is degraded while its model is failing
+MODEL_TIERS = {
+    "summary": f"summarizer:{SUMMARIZER_MODEL}",
+    "emotion": f"emotion:{EMOTION_MODEL}",
+    "keywords": f"keybert:{SBERT_MODEL}",
+    "semantic": f"sbert:{SBERT_MODEL}",
+    "spacy": f"spacy:{SPACY_MODEL}",
+}
+
+def degraded_tiers() -> List[str]:
+    """Tiers whose model failed to load and currently run on the heuristic fallbacks."""
+    return [tier for tier, key in MODEL_TIERS.items() if model_state(key) in ("unavailable", "retry_pending")]
 
 # helpers
 def safe_first_sentence(text: str, max_chars=220) -> str:
@@ -70,11 +87,7 @@ def safe_first_sentence(text: str, max_chars=220) -> str:
         part = t[:max_chars]
         return re.sub(r'\s+\S+$', '', part).strip() + "..."
 
-def chunked_summarize(text: str, max_chunk_words=450):
-    summ = get_summarizer()
-    if not summ:
-        # fallback
-        return safe_first_sentence(text, max_chars=200)
+def _summary_chunks(text: str, max_chunk_words: int) -> List[str]:
     sentences = re.split(r'(?<=[.!?])\s+', text)
     chunks, cur, cur_len = [], [], 0
     for s in sentences:
@@ -85,35 +98,129 @@ def chunked_summarize(text: str, max_chunk_words=450):
             cur, cur_len = [], 0
     if cur:
         chunks.append(" ".join(cur))
-    if not chunks:
-        return ""
-    # summarize each chunk
-    summaries = []
-    for c in chunks:
-        try:
-            summaries.append(summ(c, max_length=80, min_length=15, do_sample=False)[0]['summary_text'])
-        except Exception:
-            summaries.append(safe_first_sentence(c, max_chars=180))
-    if len(summaries) == 1:
-        return summaries[0]
+    return chunks
+
+def _summarize_each(texts: List[str], max_length: int, min_length: int, fallback) -> List[str]:
+    """Batched summaries, falling back to one call per text and then to fallback(text)."""
     try:
-        combined = " ".join(summaries)
-        final = summ(combined, max_length=100, min_length=20, do_sample=False)[0]['summary_text']
-        return final
+        return _summarize_batched(texts, max_length=max_length, min_length=min_length)
     except Exception:
-        return " ".join(summaries)[:350] + ("..." if len(" ".join(summaries)) > 350 else "")
+        summaries = []
+        for t in texts:
+            try:
+                summaries.append(_summarize_batched([t], max_length=max_length, min_length=min_length)[0])
+            except Exception:
+                summaries.append(fallback(t))
+        return summaries
 
-def detect_emotion_text(text: str):
+def summarize_many(texts: List[str], max_chunk_words=450) -> List[str]:
+    """
+    chunked_summarize for many texts: the chunks of every text share one batched
+    summarizer pass, then texts longer than one chunk get a second pass over their
+    combined chunk summaries.
+    """
+    texts = list(texts)
+    summ = get_summarizer()
+    if not summ:
+        # fallback
+        return [safe_first_sentence(t, max_chars=200) for t in texts]
+    chunked = [_summary_chunks(t, max_chunk_words) for t in texts]
+    flat = [c for chunks in chunked for c in chunks]
+    # summarize each chunk; chunks (and concurrent requests) share batched forward passes
+    flat_summaries = _summarize_each(flat, 80, 15, lambda c: safe_first_sentence(c, max_chars=180)) if flat else []
+    out, combine_at, combined, pos = [""] * len(texts), [], [], 0
+    for i, chunks in enumerate(chunked):
+        summaries = flat_summaries[pos:pos + len(chunks)]
+        pos += len(chunks)
+        if len(summaries) == 1:
+            out[i] = summaries[0]
+        elif summaries:
+            combine_at.append(i)
+            combined.append(" ".join(summaries))
+    if combined:
+        finals = _summarize_each(combined, 100, 20, lambda c: c[:350] + ("..." if len(c) > 350 else ""))
+        for i, final in zip(combine_at, finals):
+            out[i] = final
+    return out
+
+def chunked_summarize(text: str, max_chunk_words=450):
+    return summarize_many([text], max_chunk_words)[0]
+
+def _summarize_batched(texts: List[str], max_length: int, min_length: int) -> List[str]:
+    """Summaries for `texts`; one micro-batcher per generation setting so batched inputs share kwargs."""
+    def forward(batch):
+        summ = get_summarizer()
+        if summ is None:
+            raise RuntimeError("summarizer not available")
+        out = summ(batch, max_length=max_length, min_length=min_length, do_sample=False, batch_size=len(batch))
+        return [r['summary_text'] for r in out]
+    return run_batched(("summarizer", SUMMARIZER_MODEL, max_length, min_length), forward, texts,
+                       name=f"summarizer[{max_length},{min_length}]")
+
+def _emotion_from_scores(res):
+    top = max(res, key=lambda x: x.get('score', 0))
+    return {"dominant": top['label'], "scores": res}
+
+def _emotion_forward(texts: List[str], batch_size: int = None) -> List[List[Dict]]:
+    """One pipeline call over `texts`, sorted by length so each batch pads to similar lengths."""
     pipe = get_emotion_pipeline()
-    if not pipe:
+    if pipe is None:
+        raise RuntimeError("emotion pipeline not available")
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    outputs = pipe([texts[i] for i in order], batch_size=batch_size or EMOTION_BATCH_SIZE, truncation=True)
+    results = [None] * len(texts)
+    for i, res in zip(order, outputs):
+        results[i] = res
+    return results
+
+def _emotion_scores(texts: List[str]) -> List[List[Dict]]:
+    return run_batched(("emotion", EMOTION_MODEL), _emotion_forward, texts, name="emotion")
+
+def detect_emotion_text(text: str):
+    if not get_emotion_pipeline():
         return {"dominant": "neutral", "scores": []}
     try:
-        res = pipe(text)[0]
-        top = max(res, key=lambda x: x.get('score', 0))
-        return {"dominant": top['label'], "scores": res}
+        return _emotion_from_scores(_emotion_scores([text])[0])
     except Exception:
         return {"dominant": "neutral", "scores": []}
 
+def detect_emotion_batch(texts: List[str], batch_size: int = None) -> List[Dict]:
+    """
+    Classify many texts with batched pipeline calls instead of one forward pass each.
+    Texts go through the shared micro-batcher (mixed with other requests' inputs);
+    an explicit batch_size calls the pipeline directly with that batch size instead.
+    Results come back in input order; falls back to per-text calls if a batch fails.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    if not get_emotion_pipeline():
+        return [{"dominant": "neutral", "scores": []} for _ in texts]
+    try:
+        if batch_size:
+            outputs = _emotion_forward(texts, batch_size)
+        else:
+            outputs = _emotion_scores(texts)
+        return [_emotion_from_scores(res) for res in outputs]
+    except Exception:
+        return [detect_emotion_text(t) for t in texts]
+
+def encode_texts(texts: List[str]):
+    """
+    SBERT embeddings (numpy, one row per text) through the shared micro-batcher, so
+    concurrent requests encoding a few texts each share one forward pass.
+    Returns None when the sentence-transformer is unavailable.
+    """
+    import numpy as np
+    if get_sbert() is None:
+        return None
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    def forward(batch):
+        return list(registry_get_sbert().encode(batch, batch_size=len(batch), convert_to_numpy=True, show_progress_bar=False))
+    return np.vstack(run_batched(("sbert", SBERT_MODEL), forward, texts, name="sbert"))
+
 def extract_keywords(text: str, top_n=6):
     kw = get_keybert()
     if not kw:
@@ -129,6 +236,20 @@ def extract_keywords(text: str, top_n=6):
     except Exception:
         return []
 
+def extract_keywords_batch(texts: List[str], top_n=6) -> List[List[str]]:
+    """extract_keywords for many texts; KeyBERT embeds all the documents in one call."""
+    texts = list(texts)
+    kw = get_keybert()
+    if not kw or len(texts) < 2:
+        return [extract_keywords(t, top_n=top_n) for t in texts]
+    try:
+        batch = kw.extract_keywords(texts, keyphrase_ngram_range=(1,2), top_n=top_n, use_mmr=True, diversity=0.6)
+        if len(batch) == len(texts) and all(isinstance(kws, list) for kws in batch):
+            return [[k[0] for k in kws] for kws in batch]
+    except Exception as e:
+        print("[ner_and_utils] batched keywords error:", e)
+    return [extract_keywords(t, top_n=top_n) for t in texts]
+
 def extract_entities(text: str):
     nlp = get_spacy()
     if not nlp:
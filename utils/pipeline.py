@@ -0,0 +1,176 @@
+# utils/pipeline.py
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List
+
+from utils.metrics import histogram
+
+# threads running independent analysis stages (shared by all requests in the process)
+ANALYSIS_STAGE_WORKERS = int(os.environ.get("ANALYSIS_STAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+ANALYSIS_PARALLEL_STAGES = os.environ.get("ANALYSIS_PARALLEL_STAGES", "1") == "1"
+# torch intra-op threads; default splits the cores between the stage workers
+ANALYSIS_INTRA_OP_THREADS = int(os.environ.get("ANALYSIS_INTRA_OP_THREADS", "0"))
+# record peak Python allocations per stage with tracemalloc (slow; forces serial stages)
+ANALYSIS_TRACE_MEMORY = os.environ.get("ANALYSIS_TRACE_MEMORY", "0") == "1"
+
+STAGE_WALL = histogram("analysis_stage_seconds", "Wall time per analysis stage")
+STAGE_CPU = histogram("analysis_stage_cpu_seconds", "CPU time of the thread running each analysis stage")
+STAGE_PEAK = histogram("analysis_stage_peak_bytes", "Peak Python allocations per analysis stage (tracemalloc)",
+                       buckets=(2**16, 2**18, 2**20, 2**22, 2**24, 2**26, 2**28, 2**30))
+
+
+class Stage:
+    """
+    One named step of an analysis. `fn` receives a dict with the outputs of the
+    stages named in `deps` and returns this stage's output. If it raises, the
+    error is logged and `default` becomes its output, so dependants still run.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = (), default: Any = None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.default = default
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={self.deps})"
+
+
+def topological_order(stages: List[Stage]) -> List[Stage]:
+    """Stages ordered so every stage follows its dependencies; raises ValueError on unknown deps or cycles."""
+    by_name = {s.name: s for s in stages}
+    if len(by_name) != len(stages):
+        raise ValueError("duplicate stage names")
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown stages {missing}")
+    order, state = [], {}
+
+    def visit(s: Stage):
+        mark = state.get(s.name)
+        if mark == "done":
+            return
+        if mark == "visiting":
+            raise ValueError(f"dependency cycle through stage {s.name!r}")
+        state[s.name] = "visiting"
+        for d in s.deps:
+            visit(by_name[d])
+        state[s.name] = "done"
+        order.append(s)
+
+    for s in stages:
+        visit(s)
+    return order
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_threads_tuned = False
+
+
+def _tune_intra_op_threads():
+    """
+    Cap torch's intra-op threads so stage workers running model calls side by side
+    do not oversubscribe the cores. Only touches torch once something else imported it.
+    """
+    global _threads_tuned
+    if _threads_tuned or "torch" not in sys.modules:
+        return
+    _threads_tuned = True
+    n = ANALYSIS_INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // max(1, ANALYSIS_STAGE_WORKERS))
+    try:
+        sys.modules["torch"].set_num_threads(n)
+    except Exception as e:
+        print("[pipeline] set_num_threads error:", e)
+
+
+def get_stage_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=ANALYSIS_STAGE_WORKERS, thread_name_prefix="analysis-stage")
+    return _pool
+
+
+class StageGraph:
+    """
+    A DAG of stages. run() starts every stage as soon as its dependencies finished,
+    so independent stages overlap on the shared bounded thread pool and the total
+    latency approaches the slowest dependency chain instead of the sum of stages.
+
+    Every stage is timed; after run(), `timings` maps stage name to wall_ms and
+    cpu_ms (thread CPU, so work done in micro-batcher threads is not included),
+    plus peak_kb when memory tracing is on. The same values feed the
+    analysis_stage_* histograms.
+    """
+
+    def __init__(self, stages: List[Stage], log_prefix: str = "pipeline"):
+        self.stages = topological_order(stages)
+        self.log_prefix = log_prefix
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.errors: Dict[str, str] = {}
+
+    def _run_stage(self, stage: Stage, inputs: Dict[str, Any], trace_memory: bool = False) -> Any:
+        if trace_memory:
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            return stage.fn(inputs)
+        except Exception as e:
+            print(f"[{self.log_prefix}] {stage.name} error:", e)
+            self.errors[stage.name] = f"{type(e).__name__}: {e}"
+            return stage.default
+        finally:
+            wall = time.perf_counter() - wall0
+            cpu = time.thread_time() - cpu0
+            timing = {"wall_ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3)}
+            STAGE_WALL.observe(wall, stage=stage.name)
+            STAGE_CPU.observe(cpu, stage=stage.name)
+            if trace_memory:
+                peak = max(0, tracemalloc.get_traced_memory()[1] - mem_before)
+                timing["peak_kb"] = round(peak / 1024, 1)
+                STAGE_PEAK.observe(peak, stage=stage.name)
+            self.timings[stage.name] = timing
+
+    def run(self, parallel: bool = None, trace_memory: bool = None) -> Dict[str, Any]:
+        """Execute all stages; returns {stage name: output}."""
+        parallel = ANALYSIS_PARALLEL_STAGES if parallel is None else parallel
+        trace_memory = ANALYSIS_TRACE_MEMORY if trace_memory is None else trace_memory
+        outputs: Dict[str, Any] = {}
+        self.timings = {}
+        self.errors = {}
+        if trace_memory:
+            # tracemalloc's peak is process-wide; only serial stages give per-stage numbers
+            parallel = False
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+        try:
+            if not parallel or ANALYSIS_STAGE_WORKERS <= 1:
+                for stage in self.stages:
+                    outputs[stage.name] = self._run_stage(stage, {d: outputs[d] for d in stage.deps}, trace_memory)
+                return outputs
+        finally:
+            if trace_memory and started:
+                tracemalloc.stop()
+
+        _tune_intra_op_threads()
+        pool = get_stage_pool()
+        waiting = list(self.stages)
+        running = {}
+        while waiting or running:
+            for stage in [s for s in waiting if all(d in outputs for d in s.deps)]:
+                waiting.remove(stage)
+                inputs = {d: outputs[d] for d in stage.deps}
+                running[pool.submit(self._run_stage, stage, inputs)] = stage
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                outputs[running.pop(future).name] = future.result()
+        return outputs
@@ -0,0 +1,53 @@
+# utils/profiling.py
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# fraction of analyze_dream calls to run under cProfile (0 = off)
+ANALYSIS_PROFILE_SAMPLE_RATE = float(os.environ.get("ANALYSIS_PROFILE_SAMPLE_RATE", "0"))
+ANALYSIS_PROFILE_DIR = os.environ.get("ANALYSIS_PROFILE_DIR", "profiles")
+
+# cProfile cannot run in two threads at once; a sampled call that finds it busy is skipped
+_profile_lock = threading.Lock()
+
+
+class SampledProfile:
+    def __init__(self):
+        self.active = False
+        self.path = None
+
+
+@contextmanager
+def sampled_profile(name: str, rate: float = None):
+    """
+    With probability `rate` (ANALYSIS_PROFILE_SAMPLE_RATE), run the block under
+    cProfile and dump the stats to ANALYSIS_PROFILE_DIR/<name>-<time>-<pid>.prof
+    (open with `python -m pstats` or snakeviz). Yields a SampledProfile whose
+    `active` tells the block to stay on the calling thread and `path` is set afterwards.
+    """
+    rate = ANALYSIS_PROFILE_SAMPLE_RATE if rate is None else rate
+    sample = SampledProfile()
+    if rate <= 0 or random.random() >= rate or not _profile_lock.acquire(blocking=False):
+        yield sample
+        return
+    profiler = cProfile.Profile()
+    sample.active = True
+    try:
+        profiler.enable()
+        try:
+            yield sample
+        finally:
+            profiler.disable()
+        try:
+            os.makedirs(ANALYSIS_PROFILE_DIR, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(ANALYSIS_PROFILE_DIR, f"{name}-{stamp}-{os.getpid()}-{threading.get_ident()}.prof")
+            profiler.dump_stats(path)
+            sample.path = path
+        except OSError as e:
+            print("[profiling] dump error:", e)
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,106 @@
+# utils/reanalysis.py
+"""
+Driver for background re-analysis of stored dreams (see scripts/reanalyze.py).
+The app supplies `step()`, which upgrades one checkpointed batch of stale dreams.
+This module runs it under a CPU budget. The backfill runs in its own process, so
+its progress reaches /metrics through the checkpoint row: the app fills the
+gauges below from it (record_progress).
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.metrics import gauge
+
+REANALYSIS_BATCH_SIZE = int(os.environ.get("REANALYSIS_BATCH_SIZE", "16"))
+# dreams of a batch analysed side by side, so the micro-batcher can group their model calls
+REANALYSIS_CONCURRENCY = int(os.environ.get("REANALYSIS_CONCURRENCY", "8"))
+# share of the machine's cores the backfill may use on average (1.0 = all of them)
+REANALYSIS_CPU_BUDGET = float(os.environ.get("REANALYSIS_CPU_BUDGET", "0.5"))
+# worker mode: wait this long before looking for stale dreams again
+REANALYSIS_POLL_INTERVAL = float(os.environ.get("REANALYSIS_POLL_INTERVAL", "300"))
+
+REANALYSIS_PENDING = gauge("reanalysis_pending_dreams", "Stale dreams left in the current backfill pass")
+REANALYSIS_PROCESSED = gauge("reanalysis_processed_dreams", "Dreams upgraded in the current backfill pass")
+REANALYSIS_FAILED = gauge("reanalysis_failed_dreams", "Dreams that failed to re-analyse in the current backfill pass")
+REANALYSIS_STAGE_RUNS = gauge("reanalysis_stage_runs", "Stage outputs replaced in the current backfill pass, by stage")
+REANALYSIS_RATE = gauge("reanalysis_dreams_per_second", "Backfill throughput over the last batch")
+
+
+class CpuBudget:
+    """
+    Sleeps after each unit of work so that this process's CPU time stays within
+    `fraction` of the machine's cores, averaged over work + sleep.
+    """
+
+    def __init__(self, fraction: float = REANALYSIS_CPU_BUDGET, cores: int = None):
+        self.allowed = max(fraction, 0.01) * (cores or os.cpu_count() or 1)
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+
+    def throttle(self) -> float:
+        cpu = time.process_time() - self._cpu
+        wall = time.perf_counter() - self._wall
+        pause = cpu / self.allowed - wall
+        if pause > 0:
+            time.sleep(pause)
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return max(pause, 0.0)
+
+
+def run_concurrently(fn: Callable[[Any], Any], items: List[Any], concurrency: int = REANALYSIS_CONCURRENCY) -> List[Any]:
+    """fn(item) for every item on a thread pool; an item that raised gets its exception as result."""
+    def call(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            return e
+    if concurrency <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items)), thread_name_prefix="reanalysis") as pool:
+        return list(pool.map(call, items))
+
+
+def record_progress(checkpoint: Dict[str, Any]):
+    """
+    Gauges from the stored checkpoint: processed, failed, remaining, dreams_per_second
+    and stage_runs ({stage: outputs replaced}).
+    """
+    REANALYSIS_PROCESSED.set(checkpoint.get("processed", 0))
+    REANALYSIS_FAILED.set(checkpoint.get("failed", 0))
+    REANALYSIS_PENDING.set(checkpoint.get("remaining", 0))
+    REANALYSIS_RATE.set(checkpoint.get("dreams_per_second", 0.0))
+    for stage, runs in (checkpoint.get("stage_runs") or {}).items():
+        REANALYSIS_STAGE_RUNS.set(runs, stage=stage)
+
+
+def run_backfill(step: Callable[[], Dict[str, Any]], cpu_budget: float = REANALYSIS_CPU_BUDGET,
+                 loop: bool = False, poll_interval: float = REANALYSIS_POLL_INTERVAL,
+                 max_batches: Optional[int] = None, stop_event=None, log: Callable[[str], None] = print) -> int:
+    """
+    Call step() until a pass finds nothing left to do (or, with loop=True, forever,
+    waiting poll_interval between passes). step() returns the batch stats:
+    {"batch": n, "ok": n, "failed": n, "processed": n, "remaining": n}, with batch 0
+    at the end of a pass. Returns the number of dreams upgraded.
+    """
+    budget = CpuBudget(cpu_budget)
+    upgraded, batches = 0, 0
+    while stop_event is None or not stop_event.is_set():
+        t0 = time.perf_counter()
+        stats = step()
+        elapsed = time.perf_counter() - t0
+        if not stats["batch"]:
+            if not loop:
+                break
+            time.sleep(poll_interval)
+            continue
+        upgraded += stats["ok"]
+        batches += 1
+        log(f"[reanalysis] {stats['processed']} upgraded, {stats['remaining']} left "
+            f"({stats['batch']} in {elapsed:.1f}s, {stats['failed']} failed)")
+        if max_batches is not None and batches >= max_batches:
+            break
+        budget.throttle()
+    return upgraded
@@ -0,0 +1,164 @@
+# utils/result_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.metrics import counter
+
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "1") == "1"
+# in-memory tier: entry count, total serialized bytes and time-to-live
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "512"))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 2**20)))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "3600"))
+# persistent tier, shared by every process on the host ("" disables it)
+RESULT_CACHE_DB = os.environ.get("RESULT_CACHE_DB", "models/analysis_cache.db")
+RESULT_CACHE_DB_TTL = float(os.environ.get("RESULT_CACHE_DB_TTL", str(30 * 86400)))
+
+CACHE_REQUESTS = counter("analysis_cache_requests_total", "analyze_dream result cache lookups by outcome")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_analysis_cache_created ON analysis_cache (created_at);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with runs of whitespace collapsed, so re-pasted or re-saved text hashes the same."""
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+def cache_key(text: str, **versions) -> str:
+    """sha256 over the normalised text and every version component (analyzer, models, symbol index)."""
+    payload = json.dumps({"text": normalize_text(text), **versions}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU of serialized values bounded by entry count, total bytes and TTL."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, blob = item
+            if expires_at < time.time():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return blob
+
+    def put(self, key: str, blob: bytes):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.time() + self.ttl, blob)
+            self._bytes += len(blob)
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                self._pop(next(iter(self._data)))
+
+    def _pop(self, key: str):
+        _, blob = self._data.pop(key)
+        self._bytes -= len(blob)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+
+class ResultCache:
+    """
+    Two-tier cache of analysis results: an in-process LRU in front of a SQLite file
+    that worker processes share. Values are stored as zlib-compressed JSON, so every
+    get() returns a fresh copy the caller may mutate.
+    """
+
+    def __init__(self, db_path: str = RESULT_CACHE_DB, max_entries: int = RESULT_CACHE_SIZE,
+                 max_bytes: int = RESULT_CACHE_MAX_BYTES, ttl: float = RESULT_CACHE_TTL,
+                 db_ttl: float = RESULT_CACHE_DB_TTL):
+        self.memory = LRUCache(max_entries, max_bytes, ttl)
+        self.db_path = db_path
+        self.db_ttl = db_ttl
+        self._local = threading.local()
+        self._puts = 0
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if not self.db_path:
+            return None
+        conn = getattr(self._local, "conn", None)
+        # connections must not cross a fork into worker processes
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        blob = self.memory.get(key)
+        if blob is not None:
+            CACHE_REQUESTS.inc(result="hit_memory")
+            return json.loads(zlib.decompress(blob))
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)).fetchone() if conn else None
+        except (sqlite3.Error, OSError) as e:
+            print("[result_cache] read error:", e)
+            row = None
+        if row is None or row[1] + self.db_ttl < time.time():
+            CACHE_REQUESTS.inc(result="miss")
+            return None
+        CACHE_REQUESTS.inc(result="hit_disk")
+        self.memory.put(key, row[0])
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, value: Dict[str, Any]):
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        self.memory.put(key, blob)
+        try:
+            conn = self._conn()
+            if conn is None:
+                return
+            now = time.time()
+            conn.execute("INSERT OR REPLACE INTO analysis_cache (key, value, created_at) VALUES (?, ?, ?)", (key, blob, now))
+            self._puts += 1
+            if self._puts % 100 == 0:
+                conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.db_ttl,))
+        except (sqlite3.Error, OSError) as e:
+            print("[result_cache] write error:", e)
+
+    def clear(self):
+        self.memory.clear()
+        conn = self._conn()
+        if conn is not None:
+            conn.execute("DELETE FROM analysis_cache")
@@ -0,0 +1,63 @@
+# utils/sqlite_profile.py
+"""
+Connection settings for the dreams database. The pragmas are applied on every
+new SQLite connection the engine opens (including those of forked analysis
+workers); the pool options size the engine's QueuePool for a threaded server.
+"""
+import os
+from typing import Dict, Optional
+
+# WAL lets readers run alongside the single writer; with WAL, NORMAL only syncs at checkpoints
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 2**20)))
+# page cache per connection, in KiB
+SQLITE_CACHE_KB = int(os.environ.get("SQLITE_CACHE_KB", str(64 * 1024)))
+# how long a writer waits for the lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+
+def tuned_pragmas() -> Dict[str, object]:
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": -SQLITE_CACHE_KB,  # negative = KiB rather than pages
+        "temp_store": "MEMORY",
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    }
+
+
+def apply_pragmas(dbapi_conn, pragmas: Optional[Dict[str, object]] = None):
+    """Run PRAGMA name=value for each setting on a raw sqlite3 connection."""
+    cursor = dbapi_conn.cursor()
+    try:
+        for name, value in (tuned_pragmas() if pragmas is None else pragmas).items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install_pragmas(engine, pragmas: Optional[Dict[str, object]] = None):
+    """Apply the pragmas to every connection `engine` opens from now on."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, connection_record):
+        apply_pragmas(dbapi_conn, pragmas)
+
+    return _on_connect
+
+
+def engine_options() -> Dict[str, object]:
+    """SQLALCHEMY_ENGINE_OPTIONS for the dreams database."""
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000.0},
+    }
@@ -1,14 +1,120 @@
 # utils/symbol_index.py
-import os, re, joblib
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from sklearn.neighbors import NearestNeighbors
-from typing import Tuple
+import os, re, json, mmap, hashlib, shutil, tempfile, threading, time
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
 
-MODEL_NAME = os.environ.get("SBERT_MODEL", "all-MiniLM-L6-v2")
-MODEL = SentenceTransformer(MODEL_NAME)
+if TYPE_CHECKING:
+    import pandas as pd  # imported lazily at runtime, see load_symbol_csv
 
-def load_symbol_csv(csv_path: str) -> pd.DataFrame:
+from utils.model_registry import get_sbert, SBERT_MODEL
+from utils.symbol_matcher import SymbolMatcher
+from utils.vector_index import ExactVectorIndex, IVFVectorIndex
+
+MODEL_NAME = SBERT_MODEL
+# "exact" (brute force) or "ivf" (approximate, for very large dictionaries)
+INDEX_TYPE = os.environ.get("SYMBOL_INDEX_TYPE", "exact")
+IVF_LISTS = int(os.environ["SYMBOL_IVF_LISTS"]) if os.environ.get("SYMBOL_IVF_LISTS") else None
+IVF_NPROBE = int(os.environ.get("SYMBOL_IVF_NPROBE", "8"))
+
+# on-disk layout (format 2): everything is memory-mapped, nothing is unpickled. Each
+# build is a directory under builds/ that is never modified once published;
+# manifest.json names the current one and is the only file that gets replaced.
+FORMAT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+BUILDS_DIR = "builds"
+EMBEDDINGS_FILE = "embeddings.npy"
+ROW_HASHES_FILE = "row_hashes.npy"
+IVF_DIR = "ivf"
+LEGACY_FILE = "symbol_index.joblib"
+TEXT_COLUMNS = ("word_clean", "interp_first", "embed_text")
+# old builds (and staging dirs of crashed ones) are deleted once this old, so a
+# process that read the previous manifest a moment ago can still open its files
+BUILD_PRUNE_GRACE_SECONDS = float(os.environ.get("SYMBOL_INDEX_PRUNE_GRACE", "600"))
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def row_hashes(texts: Sequence[str]) -> np.ndarray:
+    """sha1 of every embed_text as an (n, 20) uint8 array; equal hash means the stored vector is reusable."""
+    digests = b"".join(hashlib.sha1(str(t).encode("utf-8")).digest() for t in texts)
+    return np.frombuffer(digests, dtype=np.uint8).reshape(-1, 20)
+
+def _csv_stat(csv_path: str) -> dict:
+    st = os.stat(csv_path)
+    return {"csv_size": st.st_size, "csv_mtime": st.st_mtime}
+
+class StringColumn:
+    """Offset-indexed UTF-8 strings: one blob file plus an int64 offsets array (n + 1 entries)."""
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self):
+        return list(self)
+
+    @staticmethod
+    def write(path_prefix: str, values: Sequence[str]):
+        encoded = [str(v).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.array([len(b) for b in encoded], dtype=np.int64), out=offsets[1:])
+        with open(path_prefix + ".bin", "wb") as f:
+            f.write(b"".join(encoded))
+        np.save(path_prefix + ".offsets.npy", offsets)
+
+    @classmethod
+    def open(cls, path_prefix: str) -> "StringColumn":
+        offsets = np.load(path_prefix + ".offsets.npy", mmap_mode="r")
+        with open(path_prefix + ".bin", "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        return cls(blob, offsets)
+
+class SymbolTable:
+    """Symbol text by row position: word_clean, interp_first (meaning) and embed_text columns."""
+    def __init__(self, columns: Dict[str, Sequence[str]]):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["word_clean"])
+
+    def column(self, name: str) -> Sequence[str]:
+        return self.columns[name]
+
+    def word(self, i: int) -> str:
+        return self.columns["word_clean"][i]
+
+    def meaning(self, i: int) -> str:
+        return self.columns["interp_first"][i]
+
+    @classmethod
+    def from_dataframe(cls, df: "pd.DataFrame") -> "SymbolTable":
+        return cls({c: df[c].fillna("").astype(str).tolist() for c in TEXT_COLUMNS})
+
+    def save(self, persist_dir: str):
+        for name in TEXT_COLUMNS:
+            StringColumn.write(os.path.join(persist_dir, name), self.columns[name])
+
+    @classmethod
+    def open(cls, persist_dir: str) -> "SymbolTable":
+        return cls({name: StringColumn.open(os.path.join(persist_dir, name)) for name in TEXT_COLUMNS})
+
+def load_symbol_csv(csv_path: str) -> "pd.DataFrame":
+    import pandas as pd  # only needed when (re)building from the CSV
     df = pd.read_csv(csv_path)
     # normalize columns (robust to different header names)
     cols = {c.lower().strip(): c for c in df.columns}
@@ -27,26 +133,336 @@ def load_symbol_csv(csv_path: str) -> pd.DataFrame:
     df['embed_text'] = (df['word_clean'] + " — " + df['interp_first']).fillna(df['word_clean'])
     return df[['word_clean','interp_first','embed_text']]
 
-def build_symbol_index(df: pd.DataFrame, persist_dir="models/symbol_index") -> Tuple[pd.DataFrame, object, object]:
-    os.makedirs(persist_dir, exist_ok=True)
-    texts = df['embed_text'].tolist()
-    embeddings = MODEL.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-    # use sklearn NearestNeighbors (cosine) for portability
-    nn = NearestNeighbors(n_neighbors=min(50, len(texts)), metric='cosine').fit(embeddings)
-    joblib.dump((df, embeddings, nn), os.path.join(persist_dir, "symbol_index.joblib"))
-    return df, embeddings, nn
-
-def load_symbol_index(persist_dir="models/symbol_index"):
-    path = os.path.join(persist_dir, "symbol_index.joblib")
+def read_manifest(persist_dir="models/symbol_index") -> Optional[dict]:
+    path = os.path.join(persist_dir, MANIFEST_FILE)
     if not os.path.exists(path):
-        raise FileNotFoundError("No symbol index found. Run build_symbol_index first.")
-    df, embeddings, nn = joblib.load(path)
-    return df, embeddings, nn
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-def ensure_index(csv_path, persist_dir="models/symbol_index"):
-    """Convenience: if index exists load it, else build it from CSV."""
+def index_dir(persist_dir, manifest: Optional[dict]) -> str:
+    """Directory with the files of the build `manifest` names (indexes written before builds/ keep them in persist_dir)."""
+    build = (manifest or {}).get("build")
+    return os.path.join(persist_dir, BUILDS_DIR, build) if build else persist_dir
+
+def build_ivf_index(vectors, directory="models/symbol_index", n_lists=None, nprobe=None):
+    """
+    Build the approximate index from normalised vectors and persist it in `directory`
+    (the build it belongs to). It is written aside and renamed into place, so readers
+    see all of it or none; if another process got there first, its copy is kept.
+    """
+    ivf = IVFVectorIndex.build(vectors, n_lists=n_lists or IVF_LISTS, nprobe=nprobe or IVF_NPROBE, normalized=True)
+    if isinstance(ivf, IVFVectorIndex):  # tiny dictionaries get exact search, nothing to persist
+        staging = tempfile.mkdtemp(prefix=".ivf-", dir=directory)
+        ivf.save(staging)
+        try:
+            os.rename(staging, os.path.join(directory, IVF_DIR))
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+    return ivf
+
+def _vector_index(directory, vectors, index_type=None):
+    index = ExactVectorIndex(vectors, normalized=True)
+    if (index_type or INDEX_TYPE) != "ivf":
+        return index
+    ivf_path = os.path.join(directory, IVF_DIR)
+    if os.path.isdir(ivf_path):
+        ivf = IVFVectorIndex.load(ivf_path, nprobe=IVF_NPROBE)
+        if len(ivf) == len(index):
+            return ivf
+    return build_ivf_index(vectors, directory)
+
+def _remove_flat_files(persist_dir):
+    """Data files of an index written before builds/ existed."""
+    names = [EMBEDDINGS_FILE, ROW_HASHES_FILE] + [c + ext for c in TEXT_COLUMNS for ext in (".bin", ".offsets.npy")]
+    for name in names:
+        try:
+            os.remove(os.path.join(persist_dir, name))
+        except OSError:
+            pass
+    shutil.rmtree(os.path.join(persist_dir, IVF_DIR), ignore_errors=True)
+
+def prune_builds(persist_dir, keep=()):
+    """
+    Delete builds that neither the manifest nor `keep` names and that are older than
+    BUILD_PRUNE_GRACE_SECONDS. Files another process still maps cannot be deleted on
+    Windows; those are skipped and retried on the next build.
+    """
+    root = os.path.join(persist_dir, BUILDS_DIR)
+    current = read_manifest(persist_dir) or {}
+    keep = set(keep) | {current.get("build")}
+    now = time.time()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if name in keep or now - os.path.getmtime(path) < BUILD_PRUNE_GRACE_SECONDS:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+def write_symbol_index(persist_dir, table: SymbolTable, vectors, csv_hash=None, model_name=None,
+                       hashes: np.ndarray = None, extra: dict = None) -> dict:
+    """
+    Write the format-2 index as a new build: embeddings.npy (normalised float32),
+    row_hashes.npy and one offset-indexed file pair per text column, in a fresh
+    directory under builds/. Then manifest.json is replaced in one os.replace to
+    point at it. Readers resolve every file through the manifest they read, so they
+    see either the old build or the new one, never a mix; builds are not modified
+    after publishing, and old ones are pruned lazily (see prune_builds).
+    """
+    builds = os.path.join(persist_dir, BUILDS_DIR)
+    os.makedirs(builds, exist_ok=True)
+    previous = read_manifest(persist_dir)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if hashes is None:
+        hashes = row_hashes(table.column("embed_text"))
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=builds)
+    # unique per build, so two builds of the same CSV within a second get different versions
+    stamp, build_id = time.strftime("%Y%m%d%H%M%S"), os.path.basename(staging)[len(".staging-"):]
+    build = f"build-{stamp}-{build_id}"
     try:
-        return load_symbol_index(persist_dir)
-    except FileNotFoundError:
-        df = load_symbol_csv(csv_path)
-        return build_symbol_index(df, persist_dir)
+        np.save(os.path.join(staging, EMBEDDINGS_FILE), vectors)
+        np.save(os.path.join(staging, ROW_HASHES_FILE), hashes)
+        table.save(staging)
+        os.rename(staging, os.path.join(builds, build))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    manifest = {
+        "format": FORMAT_VERSION,
+        "model": model_name or MODEL_NAME,
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "count": int(len(table)),
+        "csv_sha256": csv_hash,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "version": f"{stamp}-{(csv_hash or 'nocsv')[:8]}-{build_id}",
+        "build": build,
+        **(extra or {}),
+    }
+    fd, tmp = tempfile.mkstemp(prefix=MANIFEST_FILE + ".", suffix=".tmp", dir=persist_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(persist_dir, MANIFEST_FILE))
+
+    # the build just replaced may still be opened by a process that read the old manifest
+    prune_builds(persist_dir, keep={build, (previous or {}).get("build")})
+    if previous is not None and previous.get("build"):
+        # no manifest points at pre-builds/ files any more (not even the previous one)
+        _remove_flat_files(persist_dir)
+    return manifest
+
+def _encode(texts: Sequence[str]) -> np.ndarray:
+    embeddings = get_sbert().encode(list(texts), convert_to_numpy=True, show_progress_bar=True)
+    # normalised float32 matrix; cosine top-k is a single matrix-vector product
+    return ExactVectorIndex(embeddings).vectors
+
+def update_symbol_index(csv_path, persist_dir="models/symbol_index", force=False) -> dict:
+    """
+    Rebuild the index from the CSV, re-encoding only rows whose embed_text is new or
+    changed. Unchanged rows reuse their stored vectors and deleted rows are dropped.
+    Nothing is rewritten when the CSV content hash and model match the manifest.
+    force=True re-encodes every row. Returns counts: rows, encoded, reused, dropped.
+    """
+    csv_hash = file_sha256(csv_path)
+    manifest = read_manifest(persist_dir)
+    same_model = manifest is not None and manifest.get("model") == MODEL_NAME
+    if not force and same_model and manifest.get("csv_sha256") == csv_hash:
+        return {"status": "up-to-date", "rows": manifest.get("count", 0), "encoded": 0, "reused": manifest.get("count", 0), "dropped": 0}
+
+    df = load_symbol_csv(csv_path)
+    table = SymbolTable.from_dataframe(df)
+    texts = table.column("embed_text")
+    hashes = row_hashes(texts)
+
+    old_vectors, old_pos = None, {}
+    old_dir = index_dir(persist_dir, manifest)
+    hashes_path = os.path.join(old_dir, ROW_HASHES_FILE)
+    if not force and same_model and os.path.exists(hashes_path):
+        old_hashes = np.load(hashes_path)
+        old_vectors = np.load(os.path.join(old_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        old_pos = {h.tobytes(): i for i, h in enumerate(old_hashes)}
+
+    keys = [h.tobytes() for h in hashes]
+    todo = {}
+    for i, k in enumerate(keys):
+        if k not in old_pos:
+            todo.setdefault(k, []).append(i)
+
+    dim = old_vectors.shape[1] if old_vectors is not None else None
+    new_vecs = _encode([texts[rows[0]] for rows in todo.values()]) if todo else None
+    if dim is None:
+        dim = new_vecs.shape[1] if new_vecs is not None else get_sbert().get_sentence_embedding_dimension()
+    vectors = np.empty((len(keys), dim), dtype=np.float32)
+    for i, k in enumerate(keys):
+        if k in old_pos:
+            vectors[i] = old_vectors[old_pos[k]]
+    for vec, rows in zip(new_vecs if new_vecs is not None else [], todo.values()):
+        vectors[rows] = vec
+
+    kept = set(keys)
+    dropped = sum(1 for k in old_pos if k not in kept)
+    encoded = sum(len(rows) for rows in todo.values())
+    del old_vectors
+    write_symbol_index(persist_dir, table, vectors, csv_hash=csv_hash, hashes=hashes, extra=_csv_stat(csv_path))
+    return {"status": "rebuilt", "rows": len(keys), "encoded": encoded, "reused": len(keys) - encoded, "dropped": dropped}
+
+def build_symbol_index(df: "pd.DataFrame", persist_dir="models/symbol_index", index_type=None, csv_hash=None) -> Tuple[SymbolTable, np.ndarray, object]:
+    table = SymbolTable.from_dataframe(df)
+    write_symbol_index(persist_dir, table, _encode(table.column("embed_text")), csv_hash=csv_hash)
+    return load_symbol_index(persist_dir, index_type=index_type)
+
+def _load_legacy(persist_dir):
+    import joblib
+    df, embeddings, index = joblib.load(os.path.join(persist_dir, LEGACY_FILE))
+    # older artifacts pickled an sklearn NearestNeighbors; only the embeddings are reused
+    vectors = index.vectors if isinstance(index, ExactVectorIndex) else ExactVectorIndex(embeddings).vectors
+    return SymbolTable.from_dataframe(df), vectors
+
+def load_symbol_index(persist_dir="models/symbol_index", index_type=None, manifest: dict = None):
+    """
+    Open the index as (SymbolTable, vectors, vector index). Format-2 builds are
+    memory-mapped read-only, so worker processes share pages through the OS cache and
+    opening cost does not grow with dictionary size. `manifest` pins the build to
+    open (default: the current one). A legacy symbol_index.joblib is still readable
+    (fully loaded); convert it with scripts/convert_symbol_index.py.
+    """
+    manifest = manifest or read_manifest(persist_dir)
+    if manifest is not None:
+        directory = index_dir(persist_dir, manifest)
+        table = SymbolTable.open(directory)
+        vectors = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+        return table, vectors, _vector_index(directory, vectors, index_type)
+    if os.path.exists(os.path.join(persist_dir, LEGACY_FILE)):
+        print("[symbol_index] loading legacy joblib index; run scripts/convert_symbol_index.py to convert it")
+        table, vectors = _load_legacy(persist_dir)
+        return table, vectors, _vector_index(persist_dir, vectors, index_type)
+    raise FileNotFoundError("No symbol index found. Run build_symbol_index first.")
+
+def convert_legacy_index(persist_dir="models/symbol_index", csv_path=None, model_name=None) -> dict:
+    """Rewrite an existing symbol_index.joblib in the memory-mapped format (same directory)."""
+    table, vectors = _load_legacy(persist_dir)
+    csv_hash = file_sha256(csv_path) if csv_path else None
+    return write_symbol_index(persist_dir, table, vectors, csv_hash=csv_hash, model_name=model_name)
+
+def index_is_stale(csv_path, persist_dir="models/symbol_index") -> bool:
+    """True when the manifest's model or CSV content hash no longer matches (size/mtime checked first)."""
+    manifest = read_manifest(persist_dir)
+    if manifest is None or manifest.get("model") != MODEL_NAME:
+        return True
+    if not csv_path or not os.path.exists(csv_path):
+        return False
+    stat = _csv_stat(csv_path)
+    if all(manifest.get(k) == v for k, v in stat.items()):
+        return False
+    return manifest.get("csv_sha256") != file_sha256(csv_path)
+
+def refresh_index(csv_path, persist_dir="models/symbol_index"):
+    """Build the index from the CSV when missing, or incrementally when the CSV content or SBERT_MODEL changed."""
+    csv_available = bool(csv_path) and os.path.exists(csv_path)
+    if csv_available and (read_manifest(persist_dir) is not None or not os.path.exists(os.path.join(persist_dir, LEGACY_FILE))):
+        if index_is_stale(csv_path, persist_dir):
+            stats = update_symbol_index(csv_path, persist_dir)
+            print(f"[symbol_index] rebuilt: {stats['encoded']} rows encoded, {stats['reused']} reused, {stats['dropped']} dropped")
+
+def ensure_index(csv_path, persist_dir="models/symbol_index"):
+    """Load the index, building or refreshing it from the CSV first (see refresh_index)."""
+    refresh_index(csv_path, persist_dir)
+    return load_symbol_index(persist_dir)
+
+class SymbolIndexSnapshot:
+    """
+    One immutable, fully loaded version of the symbol index: text table, vectors,
+    vector index and (built on first use) the exact-match automaton. Callers keep a
+    reference for the whole request, so a reload never changes data under them.
+    """
+    def __init__(self, table: SymbolTable, vectors, index, manifest: Optional[dict] = None):
+        self.table = table
+        self.vectors = vectors
+        self.index = index
+        self.manifest = manifest or {}
+        self.version = self.manifest.get("version") or self.manifest.get("created") or "legacy"
+        self._matcher = None
+        self._matcher_lock = threading.Lock()
+
+    @property
+    def matcher(self) -> SymbolMatcher:
+        if self._matcher is None:
+            with self._matcher_lock:
+                if self._matcher is None:
+                    self._matcher = SymbolMatcher([w or None for w in self.table.column('word_clean')], plural_s=True)
+        return self._matcher
+
+class SymbolIndexHolder:
+    """
+    Process-wide reference to the current SymbolIndexSnapshot.
+
+    reload() rebuilds (incrementally, if the CSV or model changed) and opens the new
+    index off to the side, then swaps a single reference. In-flight analyses finish
+    on the snapshot they already hold. start_auto_reload() polls for changes from a
+    daemon thread.
+    """
+    def __init__(self, csv_path, persist_dir="models/symbol_index"):
+        self.csv_path = csv_path
+        self.persist_dir = persist_dir
+        self._current = None
+        self._load_attempted = False
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def current(self) -> Optional[SymbolIndexSnapshot]:
+        """The serving snapshot; the first call loads it (None if that fails, until reload())."""
+        snap = self._current
+        if snap is None and not self._load_attempted:
+            with self._reload_lock:
+                if self._current is None and not self._load_attempted:
+                    self._load_attempted = True
+                    try:
+                        self._current = self._open(rebuild=True)
+                        print(f"[symbol_index] serving version {self._current.version} ({len(self._current.table)} symbols)")
+                    except Exception as e:
+                        print("[symbol_index] symbol index not loaded:", e)
+            snap = self._current
+        return snap
+
+    @property
+    def version(self) -> Optional[str]:
+        snap = self._current
+        return snap.version if snap is not None else None
+
+    def _open(self, rebuild: bool) -> SymbolIndexSnapshot:
+        if rebuild:
+            refresh_index(self.csv_path, self.persist_dir)
+        # read once: the snapshot's files and its version come from the same manifest
+        manifest = read_manifest(self.persist_dir)
+        table, vectors, index = load_symbol_index(self.persist_dir, manifest=manifest)
+        return SymbolIndexSnapshot(table, vectors, index, manifest)
+
+    def reload(self, rebuild: bool = True) -> SymbolIndexSnapshot:
+        with self._reload_lock:
+            self._load_attempted = True
+            snapshot = self._open(rebuild)
+            self._current = snapshot
+        print(f"[symbol_index] serving version {snapshot.version} ({len(snapshot.table)} symbols)")
+        return snapshot
+
+    def needs_reload(self) -> bool:
+        """True when the CSV changed or another process wrote a newer manifest."""
+        if self.csv_path and os.path.exists(self.csv_path) and index_is_stale(self.csv_path, self.persist_dir):
+            return True
+        manifest = read_manifest(self.persist_dir)
+        return manifest is not None and manifest.get("version") != self.version
+
+    def start_auto_reload(self, interval: float = 60.0):
+        if self._watcher is not None:
+            return
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.needs_reload():
+                        self.reload()
+                except Exception as e:
+                    print("[symbol_index] auto reload failed:", e)
+        self._watcher = threading.Thread(target=watch, name="symbol-index-reload", daemon=True)
+        self._watcher.start()
@@ -0,0 +1,85 @@
+# utils/symbol_matcher.py
+import re
+from typing import Iterable, List
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _is_word_char(ch: str) -> bool:
+    return bool(_WORD_RE.match(ch))
+
+
+class SymbolMatcher:
+    """
+    Token-level trie over dictionary symbols, built once when the dictionary loads.
+
+    `find(text)` walks the text's word tokens in a single pass and returns the
+    positions of every symbol that occurs with the same semantics as
+    re.search(rf'\\b{re.escape(symbol)}\\b', text): the text span must equal the
+    symbol exactly and sit on word boundaries. Multi-word and hyphenated symbols
+    are supported. With plural_s=True a symbol not ending in 's' also matches
+    its plural (symbol + 's'), as exact_match_symbols always did. A None entry
+    keeps its position but never matches.
+
+    The caller is responsible for normalising the text the same way as before
+    (lowercasing, punctuation stripping).
+    """
+
+    def __init__(self, symbols: Iterable[str], plural_s: bool = False):
+        # node = [children: dict token -> node, outputs: list of (position, surface)]
+        self._root = [{}, []]
+        # symbols that don't start and end with a word character keep the regex path
+        self._fallback = []
+        self.size = 0
+        for pos, symbol in enumerate(symbols):
+            self.size += 1
+            if symbol is None:
+                continue
+            symbol = str(symbol)
+            surfaces = [symbol]
+            if plural_s and not symbol.endswith('s'):
+                surfaces.append(symbol + 's')
+            if not symbol or not _is_word_char(symbol[0]) or not _is_word_char(symbol[-1]):
+                patterns = [re.compile(rf'\b{re.escape(s)}\b') for s in surfaces]
+                self._fallback.append((pos, patterns))
+                continue
+            for surface in surfaces:
+                self._insert(_WORD_RE.findall(surface), pos, surface)
+
+    def _insert(self, tokens: List[str], pos: int, surface: str):
+        node = self._root
+        for tok in tokens:
+            children = node[0]
+            nxt = children.get(tok)
+            if nxt is None:
+                nxt = [{}, []]
+                children[tok] = nxt
+            node = nxt
+        node[1].append((pos, surface))
+
+    def find(self, text: str) -> List[int]:
+        """Return the sorted positions (in construction order) of all symbols found in `text`."""
+        found = set()
+        tokens = [(m.group(), m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+        root_children = self._root[0]
+        n = len(tokens)
+        for i in range(n):
+            node = root_children.get(tokens[i][0])
+            if node is None:
+                continue
+            start = tokens[i][1]
+            j = i
+            while True:
+                for pos, surface in node[1]:
+                    if pos not in found and text[start:tokens[j][2]] == surface:
+                        found.add(pos)
+                j += 1
+                if j >= n:
+                    break
+                node = node[0].get(tokens[j][0])
+                if node is None:
+                    break
+        for pos, patterns in self._fallback:
+            if pos not in found and any(p.search(text) for p in patterns):
+                found.add(pos)
+        return sorted(found)
@@ -0,0 +1,181 @@
+# utils/vector_index.py
+import os
+import numpy as np
+from typing import List, Tuple, Union
+
+
+def normalize_rows(mat) -> np.ndarray:
+    """Return a C-contiguous float32 copy of `mat` with every row scaled to unit L2 norm."""
+    mat = np.array(mat, dtype=np.float32, copy=True, ndmin=2)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    mat /= norms
+    return np.ascontiguousarray(mat)
+
+
+def _top_k(sims: np.ndarray, k: int, score_threshold=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k of one similarity row, best first, then thresholded (same order as kneighbors)."""
+    if k < len(sims):
+        idxs = np.argpartition(-sims, k - 1)[:k]
+    else:
+        idxs = np.arange(len(sims))
+    idxs = idxs[np.argsort(-sims[idxs], kind="stable")]
+    scores = sims[idxs]
+    if score_threshold is not None:
+        keep = scores >= score_threshold
+        idxs, scores = idxs[keep], scores[keep]
+    return scores, idxs
+
+
+class ExactVectorIndex:
+    """
+    Brute-force cosine similarity index over symbol embeddings.
+
+    Vectors are stored L2-normalised in one contiguous float32 matrix, so a query
+    is a single matrix-vector product followed by argpartition. Scores are cosine
+    similarities, i.e. 1 - the cosine distance sklearn's NearestNeighbors returned.
+    """
+    kind = "exact"
+
+    def __init__(self, embeddings, normalized: bool = False):
+        if normalized:
+            self.vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        else:
+            self.vectors = normalize_rows(embeddings)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def search(self, query, top_k: int = 12, score_threshold=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, row indices) of the best `top_k` rows for one query vector."""
+        return self.search_batch(np.asarray(query)[None, :], top_k, score_threshold)[0]
+
+    def search_batch(self, queries, top_k: int = 12, score_threshold=None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Like search() for many query vectors at once: one matrix-matrix product."""
+        if len(self) == 0:
+            return [(np.empty(0, np.float32), np.empty(0, np.int64)) for _ in range(len(queries))]
+        q = normalize_rows(queries)
+        sims = q @ self.vectors.T
+        k = max(1, min(top_k, len(self)))
+        return [_top_k(row, k, score_threshold) for row in sims]
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """Nearest centroid (max cosine) for every row, computed in chunks to bound memory."""
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        out[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 20, seed: int = 0) -> np.ndarray:
+    """Plain numpy k-means on unit vectors (cosine); returns normalised centroids."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    centroids = vectors[rng.choice(n, size=n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            # re-seed empty lists with random points so every list stays in use
+            sums[empty] = vectors[rng.choice(n, size=int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFVectorIndex:
+    """
+    Approximate cosine index: inverted file over a spherical k-means coarse quantiser.
+
+    Rows are stored grouped by list (one contiguous float32 block per list), so a
+    query scores the `n_lists` centroids, then scans only the `nprobe` closest lists.
+    Raising `nprobe` trades latency for recall; nprobe == n_lists is exact search.
+    Build-time knobs: n_lists (default ~sqrt(n)), n_iter, train_size, seed.
+    build() returns an ExactVectorIndex when there are no more rows than lists
+    (including an empty dictionary): a list per row is already brute force.
+    """
+    kind = "ivf"
+
+    def __init__(self, vectors: np.ndarray, ids: np.ndarray, offsets: np.ndarray,
+                 centroids: np.ndarray, nprobe: int = 8):
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+        self.centroids = centroids
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, embeddings, n_lists: int = None, n_iter: int = 20, train_size: int = None,
+              seed: int = 0, nprobe: int = 8, normalized: bool = False) -> Union["IVFVectorIndex", ExactVectorIndex]:
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32) if normalized else normalize_rows(embeddings)
+        n = len(vectors)
+        if n_lists is None:
+            n_lists = int(round(np.sqrt(n)))
+        if n <= max(n_lists, 1):
+            return ExactVectorIndex(vectors, normalized=True)
+        n_lists = max(1, n_lists)
+        rng = np.random.default_rng(seed)
+        train_size = min(n, train_size or max(64 * n_lists, 10000))
+        train = vectors[rng.choice(n, size=train_size, replace=False)] if train_size < n else vectors
+        centroids = spherical_kmeans(train, n_lists, n_iter=n_iter, seed=seed)
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_lists)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(np.ascontiguousarray(vectors[order]), order.astype(np.int64), offsets, centroids, nprobe)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    def search(self, query, top_k: int = 12, score_threshold=None, nprobe: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, original row indices) of the approximate best `top_k` rows."""
+        return self.search_batch(np.asarray(query)[None, :], top_k, score_threshold, nprobe)[0]
+
+    def search_batch(self, queries, top_k: int = 12, score_threshold=None, nprobe: int = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        q = normalize_rows(queries)
+        nprobe = max(1, min(nprobe or self.nprobe, self.n_lists))
+        coarse = q @ self.centroids.T
+        results = []
+        for qi, row in enumerate(coarse):
+            lists = np.argpartition(-row, nprobe - 1)[:nprobe] if nprobe < self.n_lists else np.arange(self.n_lists)
+            positions = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            if len(positions) == 0:
+                results.append((np.empty(0, np.float32), np.empty(0, np.int64)))
+                continue
+            sims = self.vectors[positions] @ q[qi]
+            scores, local = _top_k(sims, max(1, min(top_k, len(sims))), score_threshold)
+            results.append((scores, self.ids[positions[local]]))
+        return results
+
+    def save(self, path: str):
+        """Persist as a directory of plain .npy arrays (no pickle) that load() can memory-map."""
+        os.makedirs(path, exist_ok=True)
+        for name in ("vectors", "ids", "offsets", "centroids"):
+            np.save(os.path.join(path, name + ".npy"), getattr(self, name))
+        np.save(os.path.join(path, "nprobe.npy"), np.int64(self.nprobe))
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = None, mmap: bool = True) -> "IVFVectorIndex":
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mode, allow_pickle=False)
+                  for name in ("vectors", "ids", "offsets", "centroids")}
+        # centroids are small and scanned on every query; keep them in process memory
+        arrays["centroids"] = np.array(arrays["centroids"])
+        default_nprobe = int(np.load(os.path.join(path, "nprobe.npy")))
+        return cls(arrays["vectors"], arrays["ids"], arrays["offsets"], arrays["centroids"], nprobe or default_nprobe)